@@ -1,36 +1,81 @@
-from flask import Flask, jsonify, request
+from flask import Flask, jsonify
 from flask_cors import CORS
 from models import db
+from config import load_config, init_sqlite_pragmas
+from serialization import init_json
 from session_config import init_session
 from restaurant_reg import register_bp
 from restaurant_login import login_bp
 from customer_registration import customer_auth_bp
 from logout import logout_bp
-from flask_bcrypt import Bcrypt
-import logging	
+from passwords import init_passwords
+from audit_log import init_audit_log
+from logging_config import init_logging
+from metrics import init_metrics
 from menu import menu_bp
-from flask_migrate import Migrate   
+from menu_cache import init_menu_cache
+from price_cache import init_price_cache
+from restaurants import restaurants_bp
+from search import search_bp
+from images import images_bp, init_images
+from delivery_index import init_delivery_index
+from Res_orders import orders_bp
+from order_events import init_order_events
+from Res_balance import balance_bp
+from Res_analytics import analytics_bp
+from checkout import checkout_bp
+from archive import init_archiver
 import sys
 import os
 
 sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
 
 
-def create_app():
+def create_app(profile=None, with_cli=True):
+    """
+    :param profile: config profile; default APP_PROFILE, else development
+    :param with_cli: set up Flask-Migrate and the `flask` maintenance commands;
+                     wsgi.py leaves them out of the server processes
+    """
     app = Flask(__name__)
 
-    # 1. Configure the app
-    basedir = os.path.abspath(os.path.dirname(__file__))
-    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(basedir, 'database.db')}"
-    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-    app.secret_key = 'Hi'  # Use a fixed secret key for development
+    # 1. Configure the app from the selected profile (APP_PROFILE), APP_SETTINGS and APP_* overrides
+    load_config(app, profile)
+
+    # JSON provider with a fast encoder for projected rows (JSON_BACKEND: msgspec, orjson or stdlib)
+    init_json(app)
+
+    # Queue-backed structured logging with a sampled access log per request
+    init_logging(app)
+
+    # Per-route latency, status and SQL statistics served at /metrics
+    init_metrics(app)
 
     # 2. Initialize the database
     db.init_app(app)
+    init_sqlite_pragmas(app, db)
 
     # 3. Initialize session management with the db
     init_session(app, db)
 
+    # Size the per-restaurant menu snapshot cache
+    init_menu_cache(app)
+
+    # Short-lived menu prices behind cart quotes, and how long a quote stays valid
+    init_price_cache(app)
+
+    # Postal code -> restaurants index behind restaurant discovery
+    init_delivery_index(app)
+
+    # Content-addressed image files and the thumbnail worker pool
+    init_images(app)
+
+    # How long order streams stay open and how many threads they may hold
+    init_order_events(app)
+
+    # Optional background mover of old finished orders into the archive tables
+    init_archiver(app)
+
     # 4. Configure CORS to allow credentials and specify the correct origin
     # CORS(app)
     CORS(app, supports_credentials=True, origins=[
@@ -43,9 +88,16 @@ def create_app():
         "http://127.0.0.1:5173"
     ])  # Adjust origin as needed
 
-    # 5. Initialize Bcrypt
-    bcrypt = Bcrypt(app)
-    Migrate(app, db)
+    # 5. Initialize the shared bcrypt worker pool
+    init_passwords(app)
+
+    # Background writer for action_logs audit records
+    init_audit_log(app)
+
+    # Migrations and maintenance commands, imported only when asked for
+    if with_cli:
+        from cli import init_cli
+        init_cli(app)
 
     # 6. Register Blueprints
     app.register_blueprint(register_bp)
@@ -53,6 +105,13 @@ def create_app():
     app.register_blueprint(logout_bp)
     app.register_blueprint(menu_bp)
     app.register_blueprint(customer_auth_bp)
+    app.register_blueprint(orders_bp)
+    app.register_blueprint(balance_bp)
+    app.register_blueprint(analytics_bp)
+    app.register_blueprint(restaurants_bp)
+    app.register_blueprint(search_bp)
+    app.register_blueprint(images_bp)
+    app.register_blueprint(checkout_bp)
     
     # 7. Add utility route (optional)
     @app.route('/routes', methods=['GET'])
@@ -60,14 +119,6 @@ def create_app():
         routes = {rule.rule: list(rule.methods) for rule in app.url_map.iter_rules()}
         return jsonify(routes)
     
-     # 8. Log all incoming requests for debugging
-    @app.before_request
-    def log_request_info():
-        logging.info(f"Received {request.method} request to {request.url}")
-        logging.info(f"Headers: {dict(request.headers)}")
-        if request.method in ["POST", "PUT", "PATCH"]:
-            logging.info(f"Body: {request.get_json()}")
-
     return app
 
 if __name__ == "__main__":
@@ -0,0 +1,132 @@
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from flask import Blueprint, jsonify, request, session
+from models import db, MenuItem, SalesHourly, ItemSalesDaily
+import logging
+
+analytics_bp = Blueprint('analytics', __name__, url_prefix='/api')
+
+DEFAULT_RANGE_DAYS = 30
+MAX_RANGE_DAYS = 366
+DEFAULT_TOP_ITEMS = 10
+MAX_TOP_ITEMS = 100
+
+
+def average(revenue, orders):
+    return float(round(revenue / orders, 2)) if orders else None
+
+
+def hourly_statement(restaurant_id, first, last):
+    """The restaurant's hourly rollups from day first through day last."""
+    return (
+        db.select(SalesHourly.hour, SalesHourly.orders_completed, SalesHourly.orders_cancelled,
+                  SalesHourly.revenue, SalesHourly.payout)
+        .where(
+            SalesHourly.restaurant_id == restaurant_id,
+            SalesHourly.hour >= datetime.combine(first, datetime.min.time()),
+            SalesHourly.hour < datetime.combine(last + timedelta(days=1), datetime.min.time())
+        )
+    )
+
+
+def top_items_statement(restaurant_id, first, last, top):
+    """The restaurant's `top` menu items by revenue from day first through day last, with their names."""
+    quantity = db.func.sum(ItemSalesDaily.quantity).label('quantity')
+    revenue = db.func.sum(ItemSalesDaily.revenue).label('revenue')
+    best = (
+        db.select(ItemSalesDaily.menu_item_id, quantity, revenue)
+        .where(ItemSalesDaily.restaurant_id == restaurant_id,
+               ItemSalesDaily.day >= first, ItemSalesDaily.day <= last)
+        .group_by(ItemSalesDaily.menu_item_id)
+        .order_by(revenue.desc(), ItemSalesDaily.menu_item_id)
+        .limit(top)
+        .subquery()
+    )
+    return (
+        db.select(best.c.menu_item_id, MenuItem.name, best.c.quantity, best.c.revenue)
+        .join(MenuItem, MenuItem.id == best.c.menu_item_id)
+        .order_by(best.c.revenue.desc(), best.c.menu_item_id)
+    )
+
+
+@analytics_bp.route('/restaurant/analytics', methods=['GET'])
+def get_analytics():
+    """
+    Sales of the restaurant's completed orders, read from the rollup tables only.
+
+    Query parameters:
+      from / to -- ISO dates, both inclusive (default: the last 30 days); days are UTC
+      top       -- number of best-selling items to return (default 10)
+    """
+    restaurant_id = session.get('restaurant_id')
+    if not restaurant_id:
+        logging.warning('Unauthorized access: No restaurant_id in session')
+        return jsonify({'error': 'Unauthorized access'}), 401
+
+    try:
+        last = date.fromisoformat(request.args['to']) if request.args.get('to') else datetime.utcnow().date()
+        first = (date.fromisoformat(request.args['from']) if request.args.get('from')
+                 else last - timedelta(days=DEFAULT_RANGE_DAYS - 1))
+        top = request.args.get('top', DEFAULT_TOP_ITEMS, type=int)
+    except ValueError as e:
+        return jsonify({'error': f'Invalid query parameters: {str(e)}'}), 400
+    if first > last:
+        return jsonify({'error': 'from must not be after to'}), 400
+    if (last - first).days >= MAX_RANGE_DAYS:
+        return jsonify({'error': f'At most {MAX_RANGE_DAYS} days per request'}), 400
+    if top is None or not 0 <= top <= MAX_TOP_ITEMS:
+        return jsonify({'error': f'top must be between 0 and {MAX_TOP_ITEMS}'}), 400
+
+    try:
+        hours = db.session.execute(hourly_statement(restaurant_id, first, last)).all()
+
+        zero = Decimal('0')
+        days = {}
+        by_hour = [{'orders': 0, 'revenue': zero} for _ in range(24)]
+        totals = {'orders': 0, 'cancelled': 0, 'revenue': zero, 'payout': zero}
+        for row in hours:
+            revenue, payout = Decimal(row.revenue), Decimal(row.payout)
+            day = days.setdefault(row.hour.date(), {'orders': 0, 'cancelled': 0, 'revenue': zero})
+            day['orders'] += row.orders_completed
+            day['cancelled'] += row.orders_cancelled
+            day['revenue'] += revenue
+            by_hour[row.hour.hour]['orders'] += row.orders_completed
+            by_hour[row.hour.hour]['revenue'] += revenue
+            totals['orders'] += row.orders_completed
+            totals['cancelled'] += row.orders_cancelled
+            totals['revenue'] += revenue
+            totals['payout'] += payout
+
+        top_items = []
+        if top:
+            top_items = [
+                {'menu_item_id': row.menu_item_id, 'name': row.name, 'quantity': int(row.quantity),
+                 'revenue': float(round(Decimal(row.revenue), 2))}
+                for row in db.session.execute(top_items_statement(restaurant_id, first, last, top))
+            ]
+
+        return jsonify({
+            'from': first.isoformat(),
+            'to': last.isoformat(),
+            'totals': {
+                'orders': totals['orders'],
+                'cancelled': totals['cancelled'],
+                'revenue': float(totals['revenue']),
+                'payout': float(totals['payout']),
+                'average_ticket': average(totals['revenue'], totals['orders']),
+            },
+            'days': [
+                {'date': day.isoformat(), 'orders': values['orders'], 'cancelled': values['cancelled'],
+                 'revenue': float(values['revenue']), 'average_ticket': average(values['revenue'], values['orders'])}
+                for day, values in sorted(days.items())
+            ],
+            'hours': [
+                {'hour': hour, 'orders': values['orders'], 'revenue': float(values['revenue']),
+                 'average_ticket': average(values['revenue'], values['orders'])}
+                for hour, values in enumerate(by_hour)
+            ],
+            'top_items': top_items,
+        }), 200
+    except Exception as e:
+        logging.error('Failed to fetch analytics: %s', str(e))
+        return jsonify({'error': f'Failed to fetch analytics: {str(e)}'}), 500
@@ -1,8 +1,5 @@
 from flask import Blueprint, jsonify, session
-from models import Restaurant
-
-from flask import Blueprint, jsonify, session
-from models import db, Order  # Assuming Order model is imported correctly
+import ledger
 
 balance_bp = Blueprint('balance', __name__, url_prefix='/api')
 
@@ -14,16 +11,8 @@ def get_balance():
         return jsonify({'error': 'Unauthorized access'}), 401
 
     try:
-        # Query to calculate the balance dynamically
-        balance = db.session.query(
-            db.func.sum(Order.total_amount - Order.platform_fee)
-        ).filter(
-            Order.restaurant_id == restaurant_id,
-            Order.status == 'preparing'
-        ).scalar()
-
-        # Ensure balance is 0 if no orders are found
-        balance = balance or 0
+        # Read the running total kept by the ledger instead of summing orders
+        balance = ledger.get_balance(restaurant_id)
 
         return jsonify({'balance': float(balance)}), 200
 
@@ -1,14 +1,107 @@
-from flask import Blueprint, jsonify, session
+from flask import Blueprint, Response, current_app, jsonify, request, session, stream_with_context
+from sqlalchemy.orm import joinedload, selectinload
+from datetime import datetime
 import logging
-from models import db, Order, OrderItem, MenuItem, Customer
-
-# Set up logging
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+from models import db, Order, OrderItem, ArchivedOrder, ArchivedOrderItem
+from serialization import Projection
+import archive
+import order_events
+import order_status
 
 orders_bp = Blueprint('orders', __name__, url_prefix='/api/orders')
 
+MAX_PAGE_SIZE = 500
+STREAM_BATCH_SIZE = 200
+ORDER_STATUSES = ('processing', 'preparing', 'cancelled', 'completed')
+MAX_STATUS_CHANGES = 200
+ORDER_FIELDS = Projection((name, name) for name in (
+    'id', 'customer_id', 'restaurant_id', 'status', 'total_amount', 'platform_fee',
+    'restaurant_amount', 'notes', 'created_at', 'updated_at'
+))
+SORT_FIELDS = ('created_at', 'id')  # Always selected; the union is ordered by them
+
+
+def parse_cursor(value):
+    """
+    Parse an ``after`` cursor of the form ``<created_at>,<id>``.
+    :return: (created_at, id) tuple
+    :raises ValueError: if the cursor is malformed
+    """
+    created_at, _, order_id = value.rpartition(',')
+    return datetime.fromisoformat(created_at), int(order_id)
+
+
+def serialize_order(order):
+    return {
+        'id': order.id,
+        'customer_id': order.customer_id,
+        'restaurant_id': order.restaurant_id,
+        'status': order.status,
+        'total_amount': float(order.total_amount),
+        'platform_fee': float(order.platform_fee),
+        'restaurant_amount': float(order.restaurant_amount),
+        'notes': order.notes,
+        'created_at': order.created_at.isoformat(),
+        'updated_at': order.updated_at.isoformat()
+    }
+
+
+def filtered_orders(table, names, restaurant_id, statuses, created_from, created_to, after):
+    """Select one orders table's rows for the restaurant, in created_at, id order."""
+    statement = db.select(*ORDER_FIELDS.columns(table, names)).where(table.c.restaurant_id == restaurant_id)
+    if statuses:
+        statement = statement.where(table.c.status.in_(statuses))
+    if created_from:
+        statement = statement.where(table.c.created_at >= created_from)
+    if created_to:
+        statement = statement.where(table.c.created_at < created_to)
+    if after:
+        statement = statement.where(db.tuple_(table.c.created_at, table.c.id) > after)
+    return statement.order_by(table.c.created_at, table.c.id)
+
+
+def orders_statement(restaurant_id, statuses=None, created_from=None, created_to=None, after=None, limit=None,
+                     names=ORDER_FIELDS.default):
+    """
+    The restaurant's orders from the hot table and, when the filters can match
+    archived (finished) orders, from the archive as well. Each table is read in
+    index order and limited before the union, so a page never sorts more than
+    limit rows per table.
+    :param names: fields to select; created_at and id are appended when missing
+    """
+    names = tuple(names) + tuple(name for name in SORT_FIELDS if name not in names)
+    selects = [
+        filtered_orders(table, names, restaurant_id, statuses, created_from, created_to, after)
+        for table in archive.order_tables(statuses)
+    ]
+    if len(selects) == 1:
+        return selects[0].limit(limit)
+
+    if limit is not None:
+        # SQLite rejects ORDER BY/LIMIT directly inside a compound select
+        selects = [db.select(*select.limit(limit).subquery().c) for select in selects]
+    else:
+        selects = [select.order_by(None) for select in selects]
+    union = db.union_all(*selects)
+    return union.order_by(union.selected_columns.created_at, union.selected_columns.id).limit(limit)
+
+
 @orders_bp.route('/', methods=['GET'])
 def get_orders():
+    """
+    Stream the restaurant's orders as a JSON array, oldest first, including
+    archived ones.
+
+    Query parameters:
+      after  -- cursor ``<created_at>,<id>`` of the last order already seen
+      limit  -- page size (at most MAX_PAGE_SIZE); omit to stream every order
+      status -- comma-separated list of statuses to include
+      from / to -- ISO timestamps bounding created_at (from inclusive, to exclusive)
+      fields -- comma-separated subset of fields to return (default: all)
+
+    The cursor for the next page is the created_at and id of the last element,
+    so paging clients keep both in their fields.
+    """
     restaurant_id = session.get('restaurant_id')
     logging.info('Fetching orders. Session restaurant_id: %s', restaurant_id)
 
@@ -16,86 +109,245 @@ def get_orders():
         logging.warning('Unauthorized access: No restaurant_id in session')
         return jsonify({'error': 'Unauthorized access'}), 401
 
+    statuses = created_from = created_to = after = None
     try:
-        orders = Order.query.filter_by(restaurant_id=restaurant_id).all()
-        response = [
-            {
-                'id': order.id,
-                'customer_id': order.customer_id,
-                'restaurant_id': order.restaurant_id,
-                'status': order.status,
-                'total_amount': float(order.total_amount),
-                'platform_fee': float(order.platform_fee),
-                'restaurant_amount': float(order.restaurant_amount),
-                'notes': order.notes,
-                'created_at': order.created_at.isoformat(),
-                'updated_at': order.updated_at.isoformat()
-            }
-            for order in orders
-        ]
-        logging.info('Fetched orders: %s', response)
-        return jsonify(response), 200
-    except Exception as e:
-        logging.error('Failed to fetch orders: %s', str(e))
-        return jsonify({'error': f'Failed to fetch orders: {str(e)}'}), 500
-
+        names = ORDER_FIELDS.parse_fields(request.args.get('fields'))
+        if request.args.get('status'):
+            statuses = request.args['status'].split(',')
+            invalid = [status for status in statuses if status not in ORDER_STATUSES]
+            if invalid:
+                return jsonify({'error': f"Invalid status: {', '.join(invalid)}"}), 400
+
+        if request.args.get('from'):
+            created_from = datetime.fromisoformat(request.args['from'])
+        if request.args.get('to'):
+            created_to = datetime.fromisoformat(request.args['to'])
+        if request.args.get('after'):
+            after = parse_cursor(request.args['after'])
+
+        limit = request.args.get('limit', type=int)
+        if request.args.get('limit') is not None and (limit is None or limit < 1):
+            return jsonify({'error': 'limit must be a positive integer'}), 400
+    except ValueError as e:
+        logging.warning('Invalid order query parameters: %s', e)
+        return jsonify({'error': f'Invalid query parameters: {str(e)}'}), 400
+
+    if limit is not None:
+        limit = min(limit, MAX_PAGE_SIZE)
+    statement = orders_statement(restaurant_id, statuses, created_from, created_to, after, limit, names)
+    encode_rows = current_app.json.encode_rows
+    width = len(names)
+
+    def generate():
+        yield b'['
+        count = 0
+        try:
+            # One encoder call per batch; the slice drops sort keys that weren't asked for
+            for rows in db.session.execute(statement).yield_per(STREAM_BATCH_SIZE).partitions():
+                yield (b',' if count else b'') + encode_rows(names, [row[:width] for row in rows])[1:-1]
+                count += len(rows)
+        except Exception as e:
+            # Headers are already sent, so the client sees a truncated array
+            logging.error('Failed to stream orders: %s', str(e))
+            raise
+        yield b']'
+        logging.info('Streamed %d orders for restaurant_id: %s', count, restaurant_id)
+
+    return Response(stream_with_context(generate()), status=200, mimetype='application/json')
+
+
+@orders_bp.route('/stream', methods=['GET'])
+def stream_orders():
+    """
+    Push order-created and status-changed events as server-sent events.
+    Resumes after the Last-Event-ID header (or ?last_event_id= for the first
+    connection); without either, only events from now on are sent. Each stream
+    holds a server thread, so a process serves at most ORDER_STREAM_MAX_OPEN of
+    them (503 beyond that) and ends each after ORDER_STREAM_MAX_SECONDS.
+    """
+    restaurant_id = session.get('restaurant_id')
+    if not restaurant_id:
+        logging.warning('Unauthorized access: No restaurant_id in session')
+        return jsonify({'error': 'Unauthorized access'}), 401
 
-@orders_bp.route('/<int:order_id>/accept', methods=['POST'])
-def accept_order(order_id):
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+    try:
+        last_event_id = int(last_event_id) if last_event_id else order_events.latest_event_id(restaurant_id)
+    except ValueError:
+        return jsonify({'error': 'Last-Event-ID must be an integer'}), 400
+
+    release = order_events.open_stream()
+    if release is None:
+        logging.warning('No free order stream slot for restaurant_id: %s', restaurant_id)
+        response = jsonify({'error': 'Too many open order streams, try again shortly'})
+        response.headers['Retry-After'] = str(order_events.RETRY_MS // 1000)
+        return response, 503
+
+    logging.info('Opening order stream for restaurant_id: %s after event %d', restaurant_id, last_event_id)
+    app = current_app._get_current_object()
+    response = Response(
+        order_events.event_stream(app, restaurant_id, last_event_id),
+        status=200,
+        mimetype='text/event-stream'
+    )
+    response.call_on_close(release)  # Runs whether the stream ended, failed or the client left
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'  # Don't let a proxy buffer the stream
+    return response
+
+
+def change_order_status(order_id, target, action):
+    """Apply one transition through the state machine and answer like the old per-order endpoints."""
     restaurant_id = session.get('restaurant_id')
-    logging.info('Accepting order. Session restaurant_id: %s, Order ID: %d', restaurant_id, order_id)
+    logging.info('Moving order %d to %s. Session restaurant_id: %s', order_id, target, restaurant_id)
 
     if not restaurant_id:
         logging.warning('Unauthorized access: No restaurant_id in session')
         return jsonify({'error': 'Unauthorized access'}), 401
 
     try:
-        order = Order.query.filter_by(id=order_id, restaurant_id=restaurant_id).first()
-        if not order:
+        result, status = order_status.apply_status_changes(restaurant_id, {order_id: target})[order_id]
+        if result == order_status.NOT_FOUND:
             logging.warning('Order not found. Order ID: %d, Restaurant ID: %s', order_id, restaurant_id)
             return jsonify({'error': 'Order not found'}), 404
+        if result == order_status.INVALID_TRANSITION:
+            return jsonify({'error': f"Order is {status} and can't be moved to {target}"}), 409
+        if result == order_status.CONFLICT:
+            db.session.rollback()
+            return jsonify({'error': 'Order was changed by another request, please reload'}), 409
 
-        order.status = 'preparing'
         db.session.commit()
-        logging.info('Order accepted successfully. Order ID: %d', order_id)
-        return jsonify({'message': 'Order accepted successfully'}), 200
+        logging.info('Order %s successfully. Order ID: %d', action, order_id)
+        return jsonify({'message': f'Order {action} successfully'}), 200
     except Exception as e:
         db.session.rollback()
-        logging.error('Failed to accept order: %s', str(e))
-        return jsonify({'error': f'Failed to accept order: {str(e)}'}), 500
+        logging.error('Failed to update order %d: %s', order_id, str(e))
+        return jsonify({'error': f'Failed to update order: {str(e)}'}), 500
+
+
+@orders_bp.route('/<int:order_id>/accept', methods=['POST'])
+def accept_order(order_id):
+    return change_order_status(order_id, 'preparing', 'accepted')
 
 
 @orders_bp.route('/<int:order_id>/reject', methods=['POST'])
 def reject_order(order_id):
-    logging.info('Rejecting order. Session restaurant_id: %s, Order ID: %d', session.get('restaurant_id'), order_id)
+    return change_order_status(order_id, 'cancelled', 'rejected')
+
+
+@orders_bp.route('/<int:order_id>/complete', methods=['POST'])
+def mark_order_completed(order_id):
+    return change_order_status(order_id, 'completed', 'marked as completed')
+
 
+@orders_bp.route('/status', methods=['POST'])
+def change_order_statuses():
+    """
+    Apply several status changes with one commit.
+    Body: {"changes": [{"order_id": 1, "status": "preparing"}, ...]}
+    Each order gets its own result: updated, unchanged, not_found,
+    invalid_transition or conflict; the others are applied regardless.
+    """
     restaurant_id = session.get('restaurant_id')
     if not restaurant_id:
         logging.warning('Unauthorized access: No restaurant_id in session')
         return jsonify({'error': 'Unauthorized access'}), 401
 
+    data = request.get_json(silent=True)
+    changes = data.get('changes') if isinstance(data, dict) else None
+    if not isinstance(changes, list) or not changes:
+        return jsonify({'error': 'changes must be a non-empty list'}), 400
+    if len(changes) > MAX_STATUS_CHANGES:
+        return jsonify({'error': f'At most {MAX_STATUS_CHANGES} changes per request'}), 400
+
+    requested = {}
     try:
-        order = Order.query.filter_by(id=order_id, restaurant_id=restaurant_id).first()
-        if not order:
-            logging.warning('Order not found. Order ID: %d, Restaurant ID: %s', order_id, restaurant_id)
-            return jsonify({'error': 'Order not found'}), 404
+        for change in changes:
+            order_id, target = int(change['order_id']), change['status']
+            if target not in ORDER_STATUSES:
+                return jsonify({'error': f'Invalid status: {target}'}), 400
+            if order_id in requested:
+                return jsonify({'error': f'Order {order_id} appears more than once'}), 400
+            requested[order_id] = target
+    except (KeyError, TypeError, ValueError):
+        return jsonify({'error': 'Each change needs an integer order_id and a status'}), 400
 
-        order.status = 'cancelled'  # Use the correct value as per the database constraint
+    try:
+        results = order_status.apply_status_changes(restaurant_id, requested)
         db.session.commit()
-        logging.info('Order rejected successfully. Order ID: %d', order_id)
-        return jsonify({'message': 'Order rejected successfully'}), 200
     except Exception as e:
         db.session.rollback()
-        logging.error('Failed to reject order: %s', str(e))
-        return jsonify({'error': f'Failed to reject order: {str(e)}'}), 500
+        logging.error('Failed to apply status changes: %s', str(e))
+        return jsonify({'error': f'Failed to update orders: {str(e)}'}), 500
+
+    updated = sum(1 for result, _ in results.values() if result == order_status.UPDATED)
+    logging.info('Applied %d of %d status changes for restaurant_id: %s', updated, len(requested), restaurant_id)
+    return jsonify({
+        'updated': updated,
+        'results': [
+            {'order_id': order_id, 'requested': target, 'result': results[order_id][0], 'status': results[order_id][1]}
+            for order_id, target in requested.items()
+        ]
+    }), 200
+
 
+MAX_BATCH_DETAILS = 100
 
 
+def load_order_details(restaurant_id, order_ids, items_loader):
+    """
+    Load orders with their customer and items, looking in the archive for the ids
+    that aren't in the hot table.
+    :param items_loader: joinedload or selectinload, used for the items relationship
+    :return: dict of order_id -> Order or ArchivedOrder
+    """
+    found = {}
+    for model, item_model in ((Order, OrderItem), (ArchivedOrder, ArchivedOrderItem)):
+        missing = [order_id for order_id in order_ids if order_id not in found]
+        if not missing:
+            break
+        orders = (
+            model.query
+            .options(
+                joinedload(model.customer),
+                items_loader(model.items).joinedload(item_model.menu_item)
+            )
+            .filter(model.restaurant_id == restaurant_id, model.id.in_(missing))
+            .all()
+        )
+        found.update((order.id, order) for order in orders)
+    return found
+
+
+def serialize_order_details(order):
+    return {
+        'id': order.id,
+        'status': order.status,
+        'total_amount': float(order.total_amount),
+        'notes': order.notes,
+        'created_at': order.created_at.isoformat(),
+        'customer': {
+            'first_name': order.customer.first_name,
+            'last_name': order.customer.last_name,
+            'address': f"{order.customer.street}, {order.customer.postal_code}",
+        },
+        'items': [
+            {
+                'name': item.menu_item.name,
+                'quantity': item.quantity,
+                'price_at_order': float(item.price_at_order),
+            }
+            for item in order.items
+        ],
+    }
+
 
 @orders_bp.route('/<int:order_id>/details', methods=['GET'])
 def get_order_details(order_id):
     """
     Fetch detailed information for a specific order, including items and customer details.
+    The order, its customer and its items are loaded in a single joined query
+    (a second one for archived orders).
     """
     restaurant_id = session.get('restaurant_id')
     logging.info('Fetching order details. Session restaurant_id: %s, Order ID: %d', restaurant_id, order_id)
@@ -105,75 +357,52 @@ def get_order_details(order_id):
         return jsonify({'error': 'Unauthorized access'}), 401
 
     try:
-        # Fetch the order
-        order = Order.query.filter_by(id=order_id, restaurant_id=restaurant_id).first()
+        order = load_order_details(restaurant_id, [order_id], joinedload).get(order_id)
         logging.debug('Order fetched from database: %s', order)
 
         if not order:
             logging.warning('Order not found. Order ID: %d, Restaurant ID: %s', order_id, restaurant_id)
             return jsonify({'error': 'Order not found'}), 404
 
-        # Fetch the customer
-        customer = Customer.query.get(order.customer_id)
-        logging.debug('Customer fetched from database: %s', customer)
-
-        if not customer:
+        if not order.customer:
             logging.warning('Customer not found for Order ID: %d', order_id)
             return jsonify({'error': 'Customer not found'}), 404
 
-        # Fetch the items in the order
-        items = (
-            db.session.query(OrderItem, MenuItem)
-            .join(MenuItem, MenuItem.id == OrderItem.menu_item_id)
-            .filter(OrderItem.order_id == order_id)
-            .all()
-        )
-        logging.debug('Order items fetched from database: %s', items)
-
-        # Format the response
-        order_details = {
-            'id': order.id,
-            'status': order.status,
-            'total_amount': float(order.total_amount),
-            'notes': order.notes,
-            'created_at': order.created_at.isoformat(),
-            'customer': {
-                'first_name': customer.first_name,
-                'last_name': customer.last_name,
-                'address': f"{customer.street}, {customer.postal_code}",
-            },
-            'items': [
-                {
-                    'name': item.MenuItem.name,
-                    'quantity': item.OrderItem.quantity,
-                    'price_at_order': float(item.OrderItem.price_at_order),
-                }
-                for item in items
-            ],
-        }
-
         logging.info('Order details prepared successfully. Order ID: %d', order_id)
-        return jsonify(order_details), 200
+        return jsonify(serialize_order_details(order)), 200
     except Exception as e:
         logging.error('Failed to fetch order details: %s', str(e))
         return jsonify({'error': f'Failed to fetch order details: {str(e)}'}), 500
 
-       
 
+@orders_bp.route('/details', methods=['GET'])
+def get_orders_details():
+    """
+    Fetch details for several orders at once, e.g. ``?ids=1,2,3``.
+    Uses a constant number of queries regardless of how many ids are requested;
+    ids that don't belong to the restaurant are left out of the response.
+    """
+    restaurant_id = session.get('restaurant_id')
+    if not restaurant_id:
+        logging.warning('Unauthorized access: No restaurant_id in session')
+        return jsonify({'error': 'Unauthorized access'}), 401
 
-@orders_bp.route('/<int:order_id>/complete', methods=['POST'])
-def mark_order_completed(order_id):
     try:
-        # Fetch the order
-        order = Order.query.get(order_id)
-        if not order:
-            return jsonify({'error': 'Order not found'}), 404
+        order_ids = [int(order_id) for order_id in request.args.get('ids', '').split(',') if order_id]
+    except ValueError:
+        return jsonify({'error': 'ids must be a comma-separated list of integers'}), 400
+    if not order_ids:
+        return jsonify({'error': "'ids' is required."}), 400
+    if len(order_ids) > MAX_BATCH_DETAILS:
+        return jsonify({'error': f'At most {MAX_BATCH_DETAILS} ids per request'}), 400
 
-        # Update the status
-        order.status = 'completed'
-        db.session.commit()
+    try:
+        orders = load_order_details(restaurant_id, order_ids, selectinload)
+        by_id = {order_id: order for order_id, order in orders.items() if order.customer}
+        response = [serialize_order_details(by_id[order_id]) for order_id in dict.fromkeys(order_ids) if order_id in by_id]
 
-        return jsonify({'message': 'Order marked as completed successfully'}), 200
+        logging.info('Order details prepared for %d of %d orders', len(response), len(order_ids))
+        return jsonify(response), 200
     except Exception as e:
-        db.session.rollback()
-        return jsonify({'error': str(e)}), 500
\ No newline at end of file
+        logging.error('Failed to fetch order details: %s', str(e))
+        return jsonify({'error': f'Failed to fetch order details: {str(e)}'}), 500
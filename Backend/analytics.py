@@ -0,0 +1,194 @@
+from datetime import date, datetime
+from decimal import Decimal
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+from models import db, Order, OrderItem, ArchivedOrder, ArchivedOrderItem, SalesHourly, ItemSalesDaily
+from archive import FINAL_STATUSES
+
+# Upserts add to an existing bucket; both backends spell it INSERT ... ON CONFLICT DO UPDATE
+DIALECT_INSERTS = {'sqlite': sqlite.insert, 'postgresql': postgresql.insert}
+HOURLY_KEYS = ('restaurant_id', 'hour')
+ITEM_KEYS = ('restaurant_id', 'day', 'menu_item_id')
+ORDER_SOURCES = ((Order, OrderItem), (ArchivedOrder, ArchivedOrderItem))
+# Start of the hour or day of a timestamp, so backfill can group and insert in one statement
+BUCKET_FUNCTIONS = {
+    'sqlite': {
+        'hour': lambda column: db.func.strftime('%Y-%m-%d %H:00:00', column),
+        'day': lambda column: db.func.date(column),
+    },
+    'postgresql': {
+        'hour': lambda column: db.func.date_trunc('hour', column),
+        'day': lambda column: db.cast(column, db.Date),
+    },
+}
+# Elsewhere backfill groups by the standard EXTRACT fields and builds the bucket itself
+BUCKET_FIELDS = {'hour': (('year', 'month', 'day', 'hour'), datetime), 'day': (('year', 'month', 'day'), date)}
+
+
+def hour_of(created_at):
+    return created_at.replace(minute=0, second=0, microsecond=0)
+
+
+def counter_increments(table, keys, new_value):
+    """column -> column + new_value(column name) for every counter column of a rollup table."""
+    increments = {}
+    for column in table.columns:
+        if column.name in keys:
+            continue
+        total = column + new_value(column.name)
+        # Rounded in SQL since SQLite stores NUMERIC as floating point
+        increments[column.name] = db.func.round(total, 2) if isinstance(column.type, db.Numeric) else total
+    return increments
+
+
+def upsert(table, keys, rows):
+    """Add each row's counters to its bucket, creating missing buckets, with one executemany."""
+    if not rows:
+        return
+    insert = DIALECT_INSERTS.get(db.engine.dialect.name)
+    if insert is None:
+        return update_or_insert(table, keys, rows)
+    statement = insert(table)
+    increments = counter_increments(table, keys, lambda name: statement.excluded[name])
+    db.session.execute(statement.on_conflict_do_update(index_elements=list(keys), set_=increments), rows)
+
+
+def update_or_insert(table, keys, rows):
+    """
+    upsert for databases without ON CONFLICT: an UPDATE per bucket, and an INSERT
+    in a savepoint where none matched. If another transaction inserted the bucket
+    first, the INSERT fails and the UPDATE is repeated.
+    """
+    statement = db.update(table).where(*(table.c[key] == db.bindparam(f'key_{key}') for key in keys)).values(
+        counter_increments(table, keys, lambda name: db.bindparam(f'add_{name}', type_=table.c[name].type))
+    )
+    for row in rows:
+        params = {f'key_{key}' if key in keys else f'add_{key}': value for key, value in row.items()}
+        if db.session.execute(statement, params).rowcount:
+            continue
+        try:
+            with db.session.begin_nested():
+                db.session.execute(db.insert(table).values(row))
+        except IntegrityError:
+            db.session.execute(statement, params)
+
+
+def record_finished_orders(restaurant_id, finished):
+    """
+    Add orders that just became completed or cancelled to the rollups, in the
+    caller's transaction. Both statuses are final, so a bucket only ever grows.
+    :param finished: list of (order_id, status, created_at, total_amount, restaurant_amount) tuples
+    """
+    if not finished:
+        return
+    hourly = {}
+    placed = {}
+    for order_id, status, created_at, total_amount, restaurant_amount in finished:
+        bucket = hourly.setdefault(hour_of(created_at), {
+            'orders_completed': 0, 'orders_cancelled': 0, 'revenue': Decimal('0'), 'payout': Decimal('0')
+        })
+        if status == 'completed':
+            bucket['orders_completed'] += 1
+            bucket['revenue'] += Decimal(total_amount)
+            bucket['payout'] += Decimal(restaurant_amount)
+            placed[order_id] = created_at.date()
+        else:
+            bucket['orders_cancelled'] += 1
+    upsert(SalesHourly.__table__, HOURLY_KEYS, [
+        dict(bucket, restaurant_id=restaurant_id, hour=hour) for hour, bucket in hourly.items()
+    ])
+
+    if not placed:
+        return
+    items = {}
+    for order_id, menu_item_id, quantity, price in db.session.execute(
+        db.select(OrderItem.order_id, OrderItem.menu_item_id, OrderItem.quantity, OrderItem.price_at_order)
+        .where(OrderItem.order_id.in_(placed))
+    ):
+        line = items.setdefault((placed[order_id], menu_item_id), {'quantity': 0, 'revenue': Decimal('0')})
+        line['quantity'] += quantity
+        line['revenue'] += quantity * Decimal(price)
+    upsert(ItemSalesDaily.__table__, ITEM_KEYS, [
+        dict(line, restaurant_id=restaurant_id, day=day, menu_item_id=menu_item_id)
+        for (day, menu_item_id), line in items.items()
+    ])
+
+
+def insert_buckets(conn, table, keys, created_at, unit, aggregates):
+    """
+    Insert aggregates grouped by the key columns and the hour or day of created_at.
+    :param keys: dict of target column -> source column
+    :param unit: 'hour' or 'day', also the name of the target column for the bucket
+    :param aggregates: dict of target column -> aggregate expression
+    :return: rows inserted
+    """
+    columns = list(keys) + [unit] + list(aggregates)
+    functions = BUCKET_FUNCTIONS.get(conn.dialect.name)
+    if functions is not None:
+        start = functions[unit](created_at)
+        return conn.execute(table.insert().from_select(
+            columns, db.select(*keys.values(), start, *aggregates.values()).group_by(*keys.values(), start)
+        )).rowcount
+
+    fields, make_bucket = BUCKET_FIELDS[unit]
+    parts = [db.extract(field, created_at) for field in fields]
+    rows = []
+    for row in conn.execute(db.select(*keys.values(), *parts, *aggregates.values()).group_by(*keys.values(), *parts)):
+        key_values, rest = list(row[:len(keys)]), row[len(keys):]
+        start = make_bucket(*(int(part) for part in rest[:len(parts)]))
+        rows.append(dict(zip(columns, key_values + [start] + list(rest[len(parts):]))))
+    if rows:
+        conn.execute(table.insert(), rows)
+    return len(rows)
+
+
+def backfill(conn, restaurant_ids=None):
+    """
+    Rebuild the rollups from orders and orders_archive with two INSERT ... SELECT
+    aggregates (a GROUP BY and an executemany on other databases), for every
+    restaurant or only restaurant_ids. Commits once.
+    :return: (hourly rows, item rows) written
+    """
+    hourly, items = SalesHourly.__table__, ItemSalesDaily.__table__
+    for table in (hourly, items):
+        statement = table.delete()
+        if restaurant_ids is not None:
+            statement = statement.where(table.c.restaurant_id.in_(restaurant_ids))
+        conn.execute(statement)
+
+    def scoped(statement, order):
+        if restaurant_ids is not None:
+            statement = statement.where(order.restaurant_id.in_(restaurant_ids))
+        return statement
+
+    orders = db.union_all(*(
+        scoped(db.select(
+            order.restaurant_id, order.status, order.total_amount, order.restaurant_amount, order.created_at
+        ).where(order.status.in_(FINAL_STATUSES)), order)
+        for order, _ in ORDER_SOURCES
+    )).subquery()
+    completed = orders.c.status == 'completed'
+    hourly_rows = insert_buckets(
+        conn, hourly, {'restaurant_id': orders.c.restaurant_id}, orders.c.created_at, 'hour', {
+            'orders_completed': db.func.sum(db.case((completed, 1), else_=0)),
+            'orders_cancelled': db.func.sum(db.case((completed, 0), else_=1)),
+            'revenue': db.func.round(db.func.sum(db.case((completed, orders.c.total_amount), else_=0)), 2),
+            'payout': db.func.round(db.func.sum(db.case((completed, orders.c.restaurant_amount), else_=0)), 2),
+        }
+    )
+
+    lines = db.union_all(*(
+        scoped(db.select(
+            order.restaurant_id, order.created_at, item.menu_item_id, item.quantity, item.price_at_order
+        ).join(item, item.order_id == order.id).where(order.status == 'completed'), order)
+        for order, item in ORDER_SOURCES
+    )).subquery()
+    item_rows = insert_buckets(
+        conn, items, {'restaurant_id': lines.c.restaurant_id, 'menu_item_id': lines.c.menu_item_id},
+        lines.c.created_at, 'day', {
+            'quantity': db.func.sum(lines.c.quantity),
+            'revenue': db.func.round(db.func.sum(lines.c.quantity * lines.c.price_at_order), 2),
+        }
+    )
+    conn.commit()
+    return hourly_rows, item_rows
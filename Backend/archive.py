@@ -0,0 +1,163 @@
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+from sqlalchemy.exc import IntegrityError
+from models import db, Order, OrderItem, ArchivedOrder, ArchivedOrderItem, OrderEvent, IdempotencyKey
+
+# Orders can't leave these statuses, so moving them out of the hot table never races a status change
+FINAL_STATUSES = ('completed', 'cancelled')
+
+DEFAULT_ARCHIVE_DAYS = 30
+DEFAULT_CHUNK_SIZE = 500  # orders per transaction; keeps each write lock short
+DEFAULT_PAUSE = 0.05  # seconds between chunks so request writers get the lock
+# Stream events and stored checkout responses newer than this keep their order in the
+# hot table, so streams can still resume and retries replay; older ones go with the order
+DEFAULT_REFERENCE_HOURS = 24
+
+
+def includes_archive(statuses=None):
+    """Whether an orders query filtered to `statuses` (None for all) can match archived rows."""
+    return statuses is None or any(status in FINAL_STATUSES for status in statuses)
+
+
+def order_tables(statuses=None):
+    """Tables to read orders from: the hot table, plus the archive when it can match."""
+    if includes_archive(statuses):
+        return [Order.__table__, ArchivedOrder.__table__]
+    return [Order.__table__]
+
+
+def archive_chunk(cutoff, chunk_size=DEFAULT_CHUNK_SIZE, after_id=0, references_before=None):
+    """
+    Move up to chunk_size finished orders created before cutoff, and their items,
+    into the archive tables in one short transaction. Their stream events and
+    stored checkout responses are deleted with them; orders with any of those
+    from references_before on stay until a later run.
+    :param after_id: only consider orders with a larger id (the previous chunk's last)
+    :param references_before: default DEFAULT_REFERENCE_HOURS ago
+    :return: ids of the orders moved, in ascending order
+    """
+    if references_before is None:
+        references_before = datetime.utcnow() - timedelta(hours=DEFAULT_REFERENCE_HOURS)
+    orders, items = Order.__table__, OrderItem.__table__
+    order_columns = [column.name for column in orders.columns]
+    item_columns = [column.name for column in items.columns]
+
+    with db.engine.begin() as conn:
+        order_ids = list(conn.execute(
+            db.select(orders.c.id)
+            .where(
+                orders.c.id > after_id,
+                orders.c.status.in_(FINAL_STATUSES),
+                orders.c.created_at < cutoff,
+                ~db.exists().where(OrderEvent.order_id == orders.c.id, OrderEvent.created_at >= references_before),
+                ~db.exists().where(IdempotencyKey.order_id == orders.c.id,
+                                   IdempotencyKey.created_at >= references_before)
+            )
+            .order_by(orders.c.id)
+            .limit(chunk_size)
+        ).scalars())
+        if not order_ids:
+            return []
+
+        conn.execute(db.insert(ArchivedOrder.__table__).from_select(
+            order_columns,
+            db.select(*orders.c).where(orders.c.id.in_(order_ids))
+        ))
+        conn.execute(db.insert(ArchivedOrderItem.__table__).from_select(
+            item_columns,
+            db.select(*items.c).where(items.c.order_id.in_(order_ids))
+        ))
+        # Both reference orders.id; a finished order gets no new events or keys
+        conn.execute(db.delete(OrderEvent.__table__).where(OrderEvent.order_id.in_(order_ids)))
+        conn.execute(db.delete(IdempotencyKey.__table__).where(IdempotencyKey.order_id.in_(order_ids)))
+        conn.execute(db.delete(items).where(items.c.order_id.in_(order_ids)))
+        conn.execute(db.delete(orders).where(orders.c.id.in_(order_ids)))
+    return order_ids
+
+
+def archive_orders(days=DEFAULT_ARCHIVE_DAYS, chunk_size=DEFAULT_CHUNK_SIZE, pause=DEFAULT_PAUSE, stop=None,
+                   reference_hours=DEFAULT_REFERENCE_HOURS):
+    """
+    Archive every finished order older than `days`, one chunk per transaction.
+    :param stop: optional threading.Event that ends the run between chunks
+    :param reference_hours: keep orders with stream events or checkout responses newer than this
+    :return: number of orders archived
+    """
+    now = datetime.utcnow()
+    cutoff = now - timedelta(days=days)
+    references_before = now - timedelta(hours=reference_hours)
+    archived, after_id = 0, 0
+    while not (stop and stop.is_set()):
+        try:
+            order_ids = archive_chunk(cutoff, chunk_size, after_id, references_before)
+        except IntegrityError:
+            # Another archiver committed the same rows first; they're gone from the hot
+            # table now, so the retry picks the next ones. A second conflict is a real error.
+            logging.warning('Order archive chunk after id %d conflicted, retrying', after_id)
+            order_ids = archive_chunk(cutoff, chunk_size, after_id, references_before)
+        archived += len(order_ids)
+        if len(order_ids) < chunk_size:
+            break
+        after_id = order_ids[-1]
+        if pause:
+            time.sleep(pause)
+    return archived
+
+
+class OrderArchiver:
+    """
+    Background thread that runs archive_orders every ORDER_ARCHIVE_INTERVAL seconds.
+    Disabled while the interval is 0; started by the first request so CLI commands
+    and migrations never spawn it.
+    """
+
+    def __init__(self):
+        self.interval = 0
+        self.days = DEFAULT_ARCHIVE_DAYS
+        self.chunk_size = DEFAULT_CHUNK_SIZE
+        self.pause = DEFAULT_PAUSE
+        self._app = None
+        self._thread = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.interval = app.config.setdefault('ORDER_ARCHIVE_INTERVAL', 0)
+        self.days = app.config.setdefault('ORDER_ARCHIVE_DAYS', DEFAULT_ARCHIVE_DAYS)
+        self.chunk_size = app.config.setdefault('ORDER_ARCHIVE_CHUNK_SIZE', DEFAULT_CHUNK_SIZE)
+        self.pause = app.config.setdefault('ORDER_ARCHIVE_PAUSE', DEFAULT_PAUSE)
+        self.stop()
+        self._app = app
+
+    def start(self):
+        with self._lock:
+            if not self.interval or (self._thread is not None and self._thread.is_alive()):
+                return
+            self._stop = threading.Event()
+            self._thread = threading.Thread(target=self._run, args=(self._stop,), name='order-archiver', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        with self._lock:
+            self._stop.set()
+            self._thread = None
+
+    def _run(self, stop):
+        while not stop.wait(self.interval):
+            try:
+                with self._app.app_context():
+                    archived = archive_orders(self.days, self.chunk_size, self.pause, stop)
+                if archived:
+                    logging.info('Archived %d orders older than %d days', archived, self.days)
+            except Exception as e:
+                logging.error('Order archiver run failed: %s', str(e))
+
+
+archiver = OrderArchiver()
+
+
+def init_archiver(app):
+    archiver.init_app(app)
+    app.before_request(archiver.start)
@@ -0,0 +1,140 @@
+import atexit
+import logging
+import queue
+import threading
+import time
+from datetime import datetime
+from models import db, ActionLog
+
+DEFAULT_QUEUE_SIZE = 10000
+DEFAULT_BATCH_SIZE = 200  # records per INSERT
+DEFAULT_FLUSH_INTERVAL = 0.25  # seconds a record may wait for a fuller batch
+DEFAULT_SHUTDOWN_TIMEOUT = 5.0
+
+
+class AuditLogWriter:
+    """
+    Write-behind buffer for action_logs. Requests only put a record on a bounded
+    queue; a background thread writes batches with one executemany per batch.
+    When the queue is full the record is dropped and counted instead of making
+    the request wait.
+    """
+
+    def __init__(self):
+        self.batch_size = DEFAULT_BATCH_SIZE
+        self.flush_interval = DEFAULT_FLUSH_INTERVAL
+        self.shutdown_timeout = DEFAULT_SHUTDOWN_TIMEOUT
+        self._queue = queue.Queue(DEFAULT_QUEUE_SIZE)
+        self._app = None
+        self._thread = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._stats = {
+            'queued': 0,
+            'written': 0,
+            'dropped': 0,  # queue was full
+            'failed': 0,  # lost to a failed insert
+        }
+
+    def init_app(self, app):
+        queue_size = app.config.setdefault('AUDIT_LOG_QUEUE_SIZE', DEFAULT_QUEUE_SIZE)
+        self.batch_size = app.config.setdefault('AUDIT_LOG_BATCH_SIZE', DEFAULT_BATCH_SIZE)
+        self.flush_interval = app.config.setdefault('AUDIT_LOG_FLUSH_INTERVAL', DEFAULT_FLUSH_INTERVAL)
+        self.shutdown_timeout = app.config.setdefault('AUDIT_LOG_SHUTDOWN_TIMEOUT', DEFAULT_SHUTDOWN_TIMEOUT)
+        self.stop()
+        self._queue = queue.Queue(queue_size)
+        self._app = app
+
+    def record(self, action, description=None):
+        """Queue an action_logs row; never blocks. Call it after the change it describes is committed."""
+        entry = {'action': action, 'description': description, 'timestamp': datetime.utcnow()}
+        try:
+            self._queue.put_nowait(entry)
+        except queue.Full:
+            with self._lock:
+                self._stats['dropped'] += 1
+            return False
+        with self._lock:
+            self._stats['queued'] += 1
+        self._ensure_started()
+        return True
+
+    def _ensure_started(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stop = threading.Event()
+                self._thread = threading.Thread(target=self._run, args=(self._stop,), name='audit-log', daemon=True)
+                self._thread.start()
+
+    def _next_batch(self, stop):
+        """Wait for a first record, then collect more until the batch is full or flush_interval passes."""
+        batch = []
+        deadline = None
+        while len(batch) < self.batch_size:
+            if deadline is None:
+                timeout = self.flush_interval
+            else:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+            try:
+                batch.append(self._queue.get(timeout=timeout))
+            except queue.Empty:
+                if batch or stop.is_set():
+                    break
+                continue
+            if deadline is None:
+                deadline = time.monotonic() + self.flush_interval
+        return batch
+
+    def _write(self, batch):
+        try:
+            with self._app.app_context():
+                with db.engine.begin() as conn:
+                    conn.execute(db.insert(ActionLog), batch)
+        except Exception as e:
+            logging.error('Failed to write %d audit log records: %s', len(batch), str(e))
+            with self._lock:
+                self._stats['failed'] += len(batch)
+            return
+        with self._lock:
+            self._stats['written'] += len(batch)
+
+    def _run(self, stop):
+        while True:
+            batch = self._next_batch(stop)
+            if batch:
+                self._write(batch)
+            elif stop.is_set():
+                return
+
+    def stop(self):
+        """Flush what is queued and stop the thread; registered with atexit."""
+        with self._lock:
+            thread, self._thread = self._thread, None
+            self._stop.set()
+        if thread is not None:
+            thread.join(self.shutdown_timeout)
+            if thread.is_alive():
+                logging.warning('Audit log flush timed out with %d records queued', self._queue.qsize())
+
+    def after_fork(self):
+        """In a forked worker: start over with an empty queue; the parent's thread didn't come along."""
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._queue = queue.Queue(self._queue.maxsize)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        stats['pending'] = self._queue.qsize()
+        return stats
+
+
+audit_log = AuditLogWriter()
+atexit.register(audit_log.stop)
+
+
+def init_audit_log(app):
+    audit_log.init_app(app)
@@ -0,0 +1,5 @@
+"""
+HTTP benchmarks for the API: seed a dataset, serve create_app() from a local
+WSGI server and drive every blueprint with concurrent clients.
+Run from the Backend directory with ``python -m benchmarks --help``.
+"""
@@ -0,0 +1,127 @@
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+from datetime import datetime
+import click
+from benchmarks.dataset import DEFAULT_SIZES, seed_dataset
+from benchmarks.runner import LocalServer, Runner
+from benchmarks.scenarios import select
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(baseline, results, max_regression):
+    """
+    :return: (report lines, names of scenarios whose p95 latency or throughput got
+             worse by more than max_regression, or that started returning errors)
+    """
+    lines, regressed = [], []
+    for name, current in results.items():
+        before = baseline.get('scenarios', {}).get(name)
+        if not before:
+            lines.append(f'{name:32} new')
+            continue
+        p95_before, p95_now = before['latency_ms']['p95'], current['latency_ms']['p95']
+        rps_before, rps_now = before['throughput_rps'], current['throughput_rps']
+        p95_change = (p95_now - p95_before) / p95_before if p95_before else 0.0
+        rps_change = (rps_now - rps_before) / rps_before if rps_before else 0.0
+        lines.append(f'{name:32} p95 {p95_before:9.2f} -> {p95_now:9.2f} ms ({p95_change:+.0%})   '
+                     f'{rps_before:8.1f} -> {rps_now:8.1f} req/s ({rps_change:+.0%})')
+        if p95_change > max_regression or -rps_change > max_regression or current['errors'] > before['errors']:
+            regressed.append(name)
+    return lines, regressed
+
+
+@click.command()
+@click.option('--clients', default=8, show_default=True, help='Concurrent clients per scenario.')
+@click.option('--requests', 'requests_per_scenario', default=400, show_default=True, help='Timed requests per scenario.')
+@click.option('--warmup', default=5, show_default=True, help='Untimed requests per client before timing starts.')
+@click.option('--scenario', 'scenario_names', multiple=True, help='Scenario or group (e.g. menu) to run; repeatable.')
+@click.option('--size', 'size_overrides', multiple=True, metavar='NAME=N',
+              help=f"Dataset size override; names: {', '.join(DEFAULT_SIZES)}.")
+@click.option('--seed', default=0, show_default=True, help='Seed for the dataset and the request mix.')
+@click.option('--database-url', default=None, help='Empty database to benchmark instead of a temporary SQLite file.')
+@click.option('--profile', default='development', show_default=True, help='Config profile for create_app.')
+@click.option('--out', 'out_path', default='benchmark-results.json', show_default=True, type=click.Path(dir_okay=False))
+@click.option('--baseline', type=click.Path(exists=True, dir_okay=False), help='Earlier results to compare against.')
+@click.option('--max-regression', default=0.25, show_default=True,
+              help='Exit with status 1 if p95 or throughput is worse than the baseline by more than this fraction.')
+def main(clients, requests_per_scenario, warmup, scenario_names, size_overrides, seed, database_url,
+         profile, out_path, baseline, max_regression):
+    """Seed a dataset, serve the app locally and benchmark the API endpoints."""
+    sizes = dict(DEFAULT_SIZES)
+    for override in size_overrides:
+        name, _, value = override.partition('=')
+        if name not in sizes or not value.isdigit():
+            raise click.BadParameter(f'expected NAME=N with NAME in {", ".join(sizes)}', param_hint='--size')
+        sizes[name] = int(value)
+    try:
+        scenarios = select(scenario_names)
+    except ValueError as e:
+        raise click.BadParameter(str(e), param_hint='--scenario')
+
+    workdir = tempfile.mkdtemp(prefix='lieferspatz-bench-')
+    os.environ['DATABASE_URL'] = database_url or f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    os.environ['APP_SESSION_FILE_DIR'] = os.path.join(workdir, 'sessions')
+    os.environ.setdefault('APP_LOG_LEVEL', 'WARNING')  # Keep access logs off the console
+
+    from FLASK_APP import create_app
+    try:
+        app = create_app(profile)
+        with app.app_context():
+            click.echo(f'Seeding {sizes} ...', err=True)
+            data = seed_dataset(sizes, seed)
+
+        with LocalServer(app) as server:
+            runner = Runner(server.base_url, data, clients, requests_per_scenario, warmup, seed)
+            results = runner.run(scenarios, progress=lambda name, result: click.echo(
+                f"{name:32} {result['throughput_rps']:8.1f} req/s  p50 {result['latency_ms']['p50']:8.2f}  "
+                f"p95 {result['latency_ms']['p95']:8.2f}  p99 {result['latency_ms']['p99']:8.2f} ms  "
+                f"errors {result['errors']}", err=True))
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        'meta': {
+            'commit': git_commit(),
+            'started_at': datetime.utcnow().isoformat(timespec='seconds') + 'Z',
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'profile': profile,
+            'database': app.config['SQLALCHEMY_DATABASE_URI'].split(':', 1)[0],
+            'clients': clients,
+            'requests_per_scenario': requests_per_scenario,
+            'warmup': warmup,
+            'seed': seed,
+            'sizes': sizes,
+        },
+        'scenarios': results,
+    }
+    with open(out_path, 'w') as f:
+        json.dump(report, f, indent=2, sort_keys=True)
+        f.write('\n')
+    click.echo(f'Wrote {out_path}', err=True)
+
+    if baseline:
+        with open(baseline) as f:
+            lines, regressed = compare(json.load(f), results, max_regression)
+        click.echo('\n'.join(lines))
+        if regressed:
+            click.echo(f"Regressed: {', '.join(regressed)}", err=True)
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
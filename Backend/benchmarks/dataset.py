@@ -0,0 +1,58 @@
+from models import db, DeliveryArea, MenuItem, Order
+from seed import seed_database
+
+PASSWORD = 'bench-password'
+
+DEFAULT_SIZES = {
+    'restaurants': 50,
+    'menu_items': 30,  # per restaurant
+    'customers': 200,
+    'orders': 10000,
+    'items_per_order': 4,
+    'postal_codes': 20,
+    'areas': 3,  # postal codes each restaurant delivers to
+}
+
+
+class Dataset:
+    """Ids and credentials of the seeded rows, handed to the scenarios."""
+
+    def __init__(self, sizes):
+        self.sizes = sizes
+        self.password = PASSWORD
+        self.restaurants = []  # usernames, index i has id restaurant_ids[i]
+        self.restaurant_ids = []
+        self.customers = []
+        self.customer_ids = []
+        self.postal_codes = []
+        self.menu_item_ids = {}  # restaurant_id -> [available menu_item_id]
+        self.order_ids = {}  # restaurant_id -> [order_id]
+
+
+def seed_dataset(sizes, seed=0):
+    """
+    Create the schema and load a deterministic dataset with the `flask seed` loader.
+    Restaurants are open around the clock so discovery always has results.
+    :return: Dataset
+    """
+    db.create_all()
+    with db.engine.connect() as conn:
+        seed_database(conn, sizes, seed, PASSWORD, days=30, always_open=True, customer_balance=1000000)
+
+    data = Dataset(sizes)
+    data.restaurant_ids = list(range(1, sizes['restaurants'] + 1))
+    data.restaurants = [f'restaurant{restaurant_id}' for restaurant_id in data.restaurant_ids]
+    data.customer_ids = list(range(1, sizes['customers'] + 1))
+    data.customers = [f'customer{customer_id}' for customer_id in data.customer_ids]
+    data.postal_codes = sorted(db.session.execute(db.select(DeliveryArea.postal_code).distinct()).scalars())
+
+    data.menu_item_ids = {restaurant_id: [] for restaurant_id in data.restaurant_ids}
+    for item_id, restaurant_id in db.session.execute(
+        db.select(MenuItem.id, MenuItem.restaurant_id).where(MenuItem.is_available.is_(True))
+    ):
+        data.menu_item_ids[restaurant_id].append(item_id)
+
+    data.order_ids = {restaurant_id: [] for restaurant_id in data.restaurant_ids}
+    for order_id, restaurant_id in db.session.execute(db.select(Order.id, Order.restaurant_id)):
+        data.order_ids[restaurant_id].append(order_id)
+    return data
@@ -0,0 +1,150 @@
+import math
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import requests
+from werkzeug.serving import WSGIRequestHandler, make_server
+from benchmarks.scenarios import CUSTOMER, RESTAURANT, Client
+
+
+class QuietRequestHandler(WSGIRequestHandler):
+    def log_request(self, code='-', size='-'):
+        pass  # The app's own access log already covers requests
+
+
+class LocalServer:
+    """Serve the app on a free localhost port from a background thread."""
+
+    def __init__(self, app):
+        self.server = make_server('127.0.0.1', 0, app, threaded=True, request_handler=QuietRequestHandler)
+        self.base_url = f'http://127.0.0.1:{self.server.server_port}'
+        self.thread = threading.Thread(target=self.server.serve_forever, name='bench-server', daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.thread.join()
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    rank = max(1, math.ceil(fraction * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def summarize(latencies, statuses, errors, elapsed):
+    latencies = sorted(latencies)
+    count = len(latencies)
+    ms = lambda seconds: round(seconds * 1000, 3) if seconds is not None else None
+    return {
+        'requests': count,
+        'errors': errors,
+        'status_codes': {str(code): statuses.count(code) for code in sorted(set(statuses))},
+        'throughput_rps': round(count / elapsed, 1) if elapsed else None,
+        'latency_ms': {
+            'p50': ms(percentile(latencies, 0.50)),
+            'p95': ms(percentile(latencies, 0.95)),
+            'p99': ms(percentile(latencies, 0.99)),
+            'mean': ms(sum(latencies) / count) if count else None,
+            'max': ms(latencies[-1]) if count else None,
+        },
+    }
+
+
+class Runner:
+    def __init__(self, base_url, data, clients, requests_per_scenario, warmup, seed):
+        self.base_url = base_url
+        self.data = data
+        self.clients = clients
+        self.requests_per_scenario = requests_per_scenario
+        self.warmup = warmup
+        self.seed = seed
+
+    def login(self, client, role):
+        """Log the client in over HTTP as its restaurant or customer; not timed."""
+        if role == RESTAURANT:
+            username = self.data.restaurants[client.index % len(self.data.restaurants)]
+            path = '/api/login'
+        elif role == CUSTOMER:
+            username = self.data.customers[client.index % len(self.data.customers)]
+            path = '/api/customer/login'
+        else:
+            return
+        response = client.http.post(self.base_url + path, json={'username': username, 'password': self.data.password})
+        response.raise_for_status()
+        if role == RESTAURANT:
+            client.menu_etag = client.http.get(self.base_url + '/api/menu/').headers.get('ETag', '').strip('"') or None
+
+    def make_clients(self, role):
+        clients = []
+        for index in range(self.clients):
+            client = Client(requests.Session(), self.data, index)
+            self.login(client, role)
+            clients.append(client)
+        return clients
+
+    def send(self, client, scenario, rng):
+        method, path, body, headers = scenario.build(client, rng)
+        started = time.perf_counter()
+        response = client.http.request(method, self.base_url + path, json=body, headers=headers)
+        response.content  # Include reading the (possibly streamed) body
+        return time.perf_counter() - started, response.status_code
+
+    def run_scenario(self, scenario):
+        """Spread requests_per_scenario requests over the clients, each on its own thread."""
+        clients = self.make_clients(scenario.role)
+        per_client = [self.requests_per_scenario // self.clients] * self.clients
+        for index in range(self.requests_per_scenario % self.clients):
+            per_client[index] += 1
+
+        def drive(index):
+            client = clients[index]
+            rng = random.Random(f'{self.seed}-{scenario.name}-{index}')
+            try:
+                for _ in range(self.warmup):
+                    self.send(client, scenario, rng)
+            except Exception:
+                start_barrier.abort()
+                raise
+            start_barrier.wait()
+            results = []
+            for _ in range(per_client[index]):
+                try:
+                    results.append(self.send(client, scenario, rng))
+                except requests.RequestException:
+                    results.append((None, 0))
+            return results
+
+        start_barrier = threading.Barrier(self.clients + 1)
+        with ThreadPoolExecutor(max_workers=self.clients) as pool:
+            futures = [pool.submit(drive, index) for index in range(self.clients)]
+            try:
+                start_barrier.wait()
+            except threading.BrokenBarrierError:
+                for future in futures:
+                    future.result()  # Re-raise the failing client's error
+                raise
+            started = time.perf_counter()
+            results = [result for future in futures for result in future.result()]
+            elapsed = time.perf_counter() - started
+
+        for client in clients:
+            client.http.close()
+        latencies = [latency for latency, status in results if latency is not None]
+        statuses = [status for latency, status in results]
+        errors = sum(1 for status in statuses if status not in scenario.expected)
+        return summarize(latencies, statuses, errors, elapsed)
+
+    def run(self, scenarios, progress=None):
+        results = {}
+        for scenario in scenarios:
+            results[scenario.name] = self.run_scenario(scenario)
+            if progress:
+                progress(scenario.name, results[scenario.name])
+        return results
@@ -0,0 +1,121 @@
+import uuid
+from collections import namedtuple
+from seed import DISHES
+
+ANONYMOUS = 'anonymous'
+RESTAURANT = 'restaurant'
+CUSTOMER = 'customer'
+
+# build(client, rng) returns (method, path, json body or None, headers or None)
+Scenario = namedtuple('Scenario', 'name role build expected')
+
+
+class Client:
+    """One simulated user: an HTTP session plus the account it is logged in as."""
+
+    def __init__(self, http, data, index):
+        self.http = http
+        self.data = data
+        self.index = index
+        self.restaurant_id = data.restaurant_ids[index % len(data.restaurant_ids)]
+        self.customer_id = data.customer_ids[index % len(data.customer_ids)]
+        self.menu_etag = None
+
+
+def restaurant_login(client, rng):
+    username = client.data.restaurants[rng.randrange(len(client.data.restaurants))]
+    return 'POST', '/api/login', {'username': username, 'password': client.data.password}, None
+
+
+def customer_login(client, rng):
+    username = client.data.customers[rng.randrange(len(client.data.customers))]
+    return 'POST', '/api/customer/login', {'username': username, 'password': client.data.password}, None
+
+
+def check_session(client, rng):
+    return 'GET', '/api/session', None, None
+
+
+def get_menu(client, rng):
+    return 'GET', '/api/menu/', None, None
+
+
+def get_menu_conditional(client, rng):
+    return 'GET', '/api/menu/', None, {'If-None-Match': f'"{client.menu_etag}"'} if client.menu_etag else None
+
+
+def update_menu_item(client, rng):
+    item_id = rng.choice(client.data.menu_item_ids[client.restaurant_id])
+    body = {'name': f'Dish {item_id}', 'description': 'Tasty', 'price': rng.randrange(299, 2999) / 100, 'category': 'Mains'}
+    return 'PUT', f'/api/menu/{item_id}', body, None
+
+
+def find_restaurants(client, rng):
+    return 'GET', f'/api/restaurants?postal_code={rng.choice(client.data.postal_codes)}', None, None
+
+
+def search_menu(client, rng):
+    word = rng.choice(rng.choice(list(DISHES.values()))).split()[0].lower()
+    return 'GET', f'/api/search?q={word}&postal_code={rng.choice(client.data.postal_codes)}&include_closed=true', None, None
+
+
+def list_orders(client, rng):
+    return 'GET', '/api/orders/?limit=50', None, None
+
+
+def order_details(client, rng):
+    return 'GET', f'/api/orders/{rng.choice(client.data.order_ids[client.restaurant_id])}/details', None, None
+
+
+def get_balance(client, rng):
+    return 'GET', '/api/restaurant/balance', None, None
+
+
+def get_analytics(client, rng):
+    return 'GET', '/api/restaurant/analytics', None, None
+
+
+def random_cart(client, rng):
+    restaurant_id = rng.choice(client.data.restaurant_ids)
+    items = [
+        {'menu_item_id': item_id, 'quantity': rng.randint(1, 3)}
+        for item_id in rng.sample(client.data.menu_item_ids[restaurant_id], 2)
+    ]
+    return {'restaurant_id': restaurant_id, 'items': items}
+
+
+def quote_cart(client, rng):
+    return 'POST', '/api/cart/quote', random_cart(client, rng), None
+
+
+def place_order(client, rng):
+    headers = {'Idempotency-Key': uuid.UUID(int=rng.getrandbits(128)).hex}
+    return 'POST', '/api/orders', random_cart(client, rng), headers
+
+
+SCENARIOS = [
+    Scenario('auth.restaurant_login', ANONYMOUS, restaurant_login, (200,)),
+    Scenario('auth.customer_login', ANONYMOUS, customer_login, (200,)),
+    Scenario('session.check', RESTAURANT, check_session, (200,)),
+    Scenario('menu.get', RESTAURANT, get_menu, (200,)),
+    Scenario('menu.get_not_modified', RESTAURANT, get_menu_conditional, (200, 304)),
+    Scenario('menu.update', RESTAURANT, update_menu_item, (200,)),
+    Scenario('restaurants.by_postal_code', ANONYMOUS, find_restaurants, (200,)),
+    Scenario('search.menu', ANONYMOUS, search_menu, (200,)),
+    Scenario('orders.list', RESTAURANT, list_orders, (200,)),
+    Scenario('orders.details', RESTAURANT, order_details, (200,)),
+    Scenario('balance.get', RESTAURANT, get_balance, (200,)),
+    Scenario('analytics.get', RESTAURANT, get_analytics, (200,)),
+    Scenario('checkout.quote', ANONYMOUS, quote_cart, (200,)),
+    Scenario('checkout.place_order', CUSTOMER, place_order, (201,)),
+]
+
+
+def select(names):
+    """:return: scenarios whose name equals or starts with one of names (all if names is empty)"""
+    if not names:
+        return list(SCENARIOS)
+    chosen = [s for s in SCENARIOS if any(s.name == n or s.name.startswith(n + '.') for n in names)]
+    if not chosen:
+        raise ValueError(f"No scenarios match {', '.join(names)}")
+    return chosen
@@ -0,0 +1,128 @@
+"""
+Startup-time benchmark. Each run starts a fresh interpreter and times the
+import and create_app() of the `flask` CLI app and of the production entry
+point (wsgi.py); --server also times gunicorn from launch to the first answered
+request and from SIGTERM to exit.
+
+    python -m benchmarks.startup --runs 10
+    python -m benchmarks.startup --server --workers 4
+"""
+import json
+import os
+import secrets
+import shutil
+import signal
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import click
+import requests
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Timed inside the child, so interpreter start-up itself is reported separately
+PROBE = """
+import json, sys, time
+started = time.perf_counter()
+{body}
+print(json.dumps({{'seconds': time.perf_counter() - started, 'modules': len(sys.modules)}}))
+"""
+TARGETS = {
+    'cli': 'from FLASK_APP import create_app\napp = create_app()',
+    'wsgi': 'import wsgi',
+}
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def probe(body, env):
+    """:return: (seconds to import and build the app, modules loaded, wall seconds for the whole process)"""
+    started = time.perf_counter()
+    output = subprocess.run(
+        [sys.executable, '-c', PROBE.format(body=body)], cwd=BACKEND_DIR, env=env,
+        capture_output=True, text=True, check=True
+    ).stdout
+    result = json.loads(output.strip().splitlines()[-1])
+    return result['seconds'], result['modules'], time.perf_counter() - started
+
+
+def time_server(env, workers, timeout=60.0):
+    """:return: (seconds until the first 200 from /routes, seconds from SIGTERM to exit)"""
+    port = free_port()
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', '--workers', str(workers),
+         '--bind', f'127.0.0.1:{port}', 'wsgi:app'],
+        cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        while True:
+            if server.poll() is not None:
+                raise click.ClickException(f'gunicorn exited with status {server.returncode}')
+            if time.perf_counter() - started > timeout:
+                raise click.ClickException(f'gunicorn did not answer within {timeout:.0f}s')
+            try:
+                if requests.get(f'http://127.0.0.1:{port}/routes', timeout=1).status_code == 200:
+                    break
+            except requests.ConnectionError:
+                time.sleep(0.02)
+        ready = time.perf_counter() - started
+
+        stopping = time.perf_counter()
+        server.send_signal(signal.SIGTERM)
+        server.wait(timeout)
+        return ready, time.perf_counter() - stopping
+    finally:
+        if server.poll() is None:
+            server.kill()
+            server.wait()
+
+
+def describe(name, values, unit='ms', scale=1000):
+    return (f'{name:28} median {statistics.median(values) * scale:8.1f} {unit}   '
+            f'min {min(values) * scale:8.1f} {unit}   max {max(values) * scale:8.1f} {unit}')
+
+
+@click.command()
+@click.option('--runs', default=5, show_default=True, help='Fresh interpreters per measurement.')
+@click.option('--server', is_flag=True, help='Also time gunicorn start-up and graceful shutdown.')
+@click.option('--workers', default=2, show_default=True, help='gunicorn workers for --server.')
+@click.option('--profile', default='production', show_default=True, help='Config profile for both entry points.')
+def main(runs, server, workers, profile):
+    """Measure how long the app takes to start."""
+    workdir = tempfile.mkdtemp(prefix='lieferspatz-startup-')
+    env = dict(
+        os.environ,
+        APP_PROFILE=profile,
+        DATABASE_URL=os.environ.get('DATABASE_URL', f"sqlite:///{os.path.join(workdir, 'startup.db')}"),
+        APP_SESSION_FILE_DIR=os.path.join(workdir, 'sessions'),
+        APP_LOG_LEVEL='WARNING',
+        SECRET_KEY=os.environ.get('SECRET_KEY') or secrets.token_hex(32),
+    )
+    try:
+        baseline = [
+            probe('pass', env)[2] for _ in range(runs)
+        ]
+        click.echo(describe('interpreter', baseline))
+        for name, body in TARGETS.items():
+            samples = [probe(body, env) for _ in range(runs)]
+            click.echo(describe(f'{name} import + create_app', [s[0] for s in samples])
+                       + f'   {samples[-1][1]} modules')
+            click.echo(describe(f'{name} process', [s[2] for s in samples]))
+        if server:
+            samples = [time_server(env, workers) for _ in range(runs)]
+            click.echo(describe(f'gunicorn x{workers} first response', [s[0] for s in samples]))
+            click.echo(describe(f'gunicorn x{workers} shutdown', [s[1] for s in samples]))
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
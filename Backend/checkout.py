@@ -0,0 +1,322 @@
+import hashlib
+import json
+import logging
+from datetime import datetime, timedelta
+from decimal import Decimal, ROUND_HALF_UP
+from flask import Blueprint, current_app, jsonify, request, session
+from itsdangerous import BadSignature, SignatureExpired, URLSafeTimedSerializer
+from sqlalchemy.exc import IntegrityError
+from models import db, IdempotencyKey, MenuItem, Order, OrderItem, Restaurant
+from payments import charge
+from price_cache import price_cache
+from Res_orders import serialize_order
+import order_events
+
+checkout_bp = Blueprint('checkout', __name__)
+
+CENT = Decimal('0.01')
+PLATFORM_FEE_RATE = Decimal('0.15')
+MAX_CART_LINES = 100
+MAX_QUANTITY = 99
+MAX_KEY_LENGTH = 255
+QUOTE_SALT = 'cart-quote'
+
+
+class QuoteStale(Exception):
+    """Raised when a quote has expired or the menu changed after it was made; the client re-quotes."""
+
+
+def split_total(total):
+    """
+    :return: (platform_fee, restaurant_amount) for an order total; the two always add up to total
+    """
+    platform_fee = (total * PLATFORM_FEE_RATE).quantize(CENT, rounding=ROUND_HALF_UP)
+    return platform_fee, total - platform_fee
+
+
+def read_cart(data):
+    """
+    Validate a cart of the form {"restaurant_id": 1, "items": [{"menu_item_id": 3, "quantity": 2}]}.
+    Lines for the same item are merged.
+    :return: (restaurant_id, {menu_item_id: quantity})
+    :raises ValueError: with a message for the client
+    """
+    if not isinstance(data, dict):
+        raise ValueError('Request body must be a JSON object')
+    try:
+        restaurant_id = int(data['restaurant_id'])
+    except (KeyError, TypeError, ValueError):
+        raise ValueError('restaurant_id is required')
+
+    lines = data.get('items')
+    if not isinstance(lines, list) or not lines:
+        raise ValueError('items must be a non-empty list')
+    if len(lines) > MAX_CART_LINES:
+        raise ValueError(f'At most {MAX_CART_LINES} cart lines are allowed')
+
+    quantities = {}
+    for line in lines:
+        try:
+            menu_item_id = int(line.get('menu_item_id', line.get('id')))
+            quantity = int(line.get('quantity', 1))
+        except (AttributeError, TypeError, ValueError):
+            raise ValueError('Each item needs a menu_item_id and a quantity')
+        if quantity < 1:
+            raise ValueError('Quantities must be at least 1')
+        quantities[menu_item_id] = quantities.get(menu_item_id, 0) + quantity
+        if quantities[menu_item_id] > MAX_QUANTITY:
+            raise ValueError(f'At most {MAX_QUANTITY} of one item per order')
+    return restaurant_id, quantities
+
+
+def load_prices(restaurant_id, item_ids):
+    """:return: {menu_item_id: (unit_price, is_available)} for the restaurant's items among item_ids, in one query"""
+    rows = db.session.execute(
+        db.select(MenuItem.id, MenuItem.price, MenuItem.is_available)
+        .where(MenuItem.id.in_(item_ids), MenuItem.restaurant_id == restaurant_id)
+    ).all()
+    return {row.id: (Decimal(row.price).quantize(CENT), row.is_available is not False) for row in rows}
+
+
+def total_cart(quantities, menu):
+    """
+    :param menu: {menu_item_id: (unit_price, is_available)}
+    :return: (total, {menu_item_id: unit_price})
+    :raises ValueError: if an item is unknown, belongs to another restaurant or is unavailable
+    """
+    missing = sorted(set(quantities) - set(menu))
+    if missing:
+        raise ValueError(f'Menu items not found for this restaurant: {missing}')
+    unavailable = sorted(item_id for item_id in quantities if not menu[item_id][1])
+    if unavailable:
+        raise ValueError(f'Menu items are not available: {unavailable}')
+
+    prices = {item_id: menu[item_id][0] for item_id in quantities}
+    total = sum((prices[item_id] * quantity for item_id, quantity in quantities.items()), Decimal('0'))
+    return total, prices
+
+
+def price_cart(restaurant_id, quantities):
+    """
+    Price the cart from the menu in one query, ignoring any client-side prices.
+    :return: (total, {menu_item_id: unit_price})
+    :raises ValueError: if an item is unknown, belongs to another restaurant or is unavailable
+    """
+    return total_cart(quantities, load_prices(restaurant_id, quantities))
+
+
+def menu_version(restaurant_id):
+    """:return: the restaurant's menu_version, or None if there is no such restaurant"""
+    return db.session.execute(
+        db.select(Restaurant.menu_version).where(Restaurant.id == restaurant_id)
+    ).scalar()
+
+
+def quote_cart(restaurant_id, quantities, version):
+    """
+    Like price_cart, but items priced recently for this menu_version come from
+    the price cache; only the rest are queried, still in a single IN (...).
+    """
+    menu = price_cache.get(restaurant_id, version, quantities)
+    missing = [item_id for item_id in quantities if item_id not in menu]
+    if missing:
+        loaded = load_prices(restaurant_id, missing)
+        price_cache.put(restaurant_id, version, loaded)
+        menu.update(loaded)
+    return total_cart(quantities, menu)
+
+
+def quote_serializer():
+    return URLSafeTimedSerializer(current_app.secret_key, salt=QUOTE_SALT)
+
+
+def sign_quote(restaurant_id, version, quantities, prices):
+    """:return: a token holding the cart, its unit prices and the menu_version they were read at"""
+    return quote_serializer().dumps({
+        'restaurant_id': restaurant_id,
+        'menu_version': version,
+        'items': [[item_id, quantity, str(prices[item_id])] for item_id, quantity in sorted(quantities.items())],
+    })
+
+
+def read_quote(token, restaurant_id, quantities):
+    """
+    Check a quote against the cart being ordered and the current menu. The
+    signature alone is not trusted for prices: they are compared with quote_cart
+    for the same menu_version, which the price cache usually answers.
+    :return: (total, {menu_item_id: unit_price})
+    :raises ValueError: if the token is invalid, was made for a different cart or an item became unavailable
+    :raises QuoteStale: if it is older than CART_QUOTE_TTL or the menu or its prices changed since
+    """
+    try:
+        quote = quote_serializer().loads(token, max_age=current_app.config['CART_QUOTE_TTL'])
+    except SignatureExpired:
+        raise QuoteStale('Quote expired, request a new one')
+    except BadSignature:
+        raise ValueError('Invalid quote')
+
+    quoted = {item_id: quantity for item_id, quantity, _ in quote['items']}
+    if quote['restaurant_id'] != restaurant_id or quoted != quantities:
+        raise ValueError('Quote is for a different cart')
+    version = menu_version(restaurant_id)
+    if version != quote['menu_version']:
+        raise QuoteStale('The menu changed since the quote, request a new one')
+
+    total, prices = quote_cart(restaurant_id, quantities, version)
+    if any(prices[item_id] != Decimal(price) for item_id, _, price in quote['items']):
+        logging.warning('Quote prices for restaurant %s differ from the menu at version %s', restaurant_id, version)
+        raise QuoteStale('Prices changed since the quote, request a new one')
+    return total, prices
+
+
+@checkout_bp.route('/api/cart/quote', methods=['POST'])
+def quote():
+    """
+    Authoritative prices for a cart, in the same format checkout takes. The
+    response's signed quote can be sent along with the cart to POST /api/orders,
+    which then charges exactly these amounts unless the menu changed meanwhile.
+    """
+    try:
+        restaurant_id, quantities = read_cart(request.get_json(silent=True))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    try:
+        version = menu_version(restaurant_id)
+        if version is None:
+            return jsonify({'error': 'Restaurant not found'}), 404
+        try:
+            total, prices = quote_cart(restaurant_id, quantities, version)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        platform_fee, restaurant_amount = split_total(total)
+        ttl = current_app.config['CART_QUOTE_TTL']
+
+        return jsonify({
+            'restaurant_id': restaurant_id,
+            'items': [
+                {
+                    'menu_item_id': item_id,
+                    'quantity': quantity,
+                    'unit_price': float(prices[item_id]),
+                    'line_total': float(prices[item_id] * quantity),
+                }
+                for item_id, quantity in quantities.items()
+            ],
+            'total_amount': float(total),
+            'platform_fee': float(platform_fee),
+            'restaurant_amount': float(restaurant_amount),
+            'quote': sign_quote(restaurant_id, version, quantities, prices),
+            'expires_at': (datetime.utcnow() + timedelta(seconds=ttl)).isoformat(timespec='seconds') + 'Z',
+        }), 200
+
+    except Exception as e:
+        logging.error('Error quoting cart for restaurant %s: %s', restaurant_id, e)
+        return jsonify({'error': 'Failed to price cart'}), 500
+
+
+def request_fingerprint(data):
+    return hashlib.sha256(json.dumps(data, sort_keys=True, separators=(',', ':')).encode('utf-8')).hexdigest()
+
+
+def replay(customer_id, key, fingerprint):
+    """:return: the stored response for this key, an error if it was used for another cart, or None"""
+    stored = db.session.execute(
+        db.select(IdempotencyKey).where(IdempotencyKey.customer_id == customer_id, IdempotencyKey.key == key)
+    ).scalar()
+    if stored is None:
+        return None
+    if stored.request_hash != fingerprint:
+        return jsonify({'error': 'Idempotency-Key was already used for a different request'}), 422
+    return current_app.response_class(
+        stored.response_body, status=stored.response_code,
+        mimetype='application/json', headers={'Idempotent-Replayed': 'true'}
+    )
+
+
+@checkout_bp.route('/api/orders', methods=['POST'])
+def place_order():
+    """
+    Place an order for the logged-in customer in one short transaction.
+    With an Idempotency-Key header, retries of a successful request return the
+    original response instead of charging again. Failed attempts store nothing,
+    so they can be retried with the same key. With a "quote" from
+    POST /api/cart/quote the quoted prices are charged once they match the menu.
+    """
+    customer_id = session.get('customer_id')
+    if not customer_id:
+        return jsonify({'error': 'Unauthorized access'}), 401
+
+    key = request.headers.get('Idempotency-Key', '').strip() or None
+    if key and len(key) > MAX_KEY_LENGTH:
+        return jsonify({'error': f'Idempotency-Key must be at most {MAX_KEY_LENGTH} characters'}), 400
+
+    try:
+        data = request.get_json(silent=True)
+        try:
+            restaurant_id, quantities = read_cart(data)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+
+        fingerprint = request_fingerprint(data)
+        if key:
+            stored = replay(customer_id, key, fingerprint)
+            if stored is not None:
+                return stored
+
+        try:
+            if data.get('quote'):
+                total, prices = read_quote(data['quote'], restaurant_id, quantities)
+            else:
+                total, prices = price_cart(restaurant_id, quantities)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        except QuoteStale as e:
+            return jsonify({'error': str(e)}), 409
+        platform_fee, restaurant_amount = split_total(total)
+
+        if key:
+            # Claim the key first: a concurrent duplicate blocks on the unique index here, before any money moves
+            claim = IdempotencyKey(customer_id=customer_id, key=key, request_hash=fingerprint)
+            db.session.add(claim)
+            try:
+                db.session.flush()
+            except IntegrityError:
+                db.session.rollback()
+                return replay(customer_id, key, fingerprint) or (
+                    jsonify({'error': 'A request with this Idempotency-Key is in progress'}), 409)
+
+        order = Order(
+            customer_id=customer_id,
+            restaurant_id=restaurant_id,
+            status='processing',
+            total_amount=total,
+            platform_fee=platform_fee,
+            restaurant_amount=restaurant_amount,
+            notes=(data.get('notes') or None)
+        )
+        db.session.add(order)
+        db.session.flush()
+        if not charge(order):
+            db.session.rollback()
+            return jsonify({'error': 'Insufficient balance'}), 402
+        db.session.add_all([
+            OrderItem(order_id=order.id, menu_item_id=item_id, quantity=quantity, price_at_order=prices[item_id])
+            for item_id, quantity in quantities.items()
+        ])
+        order_events.record_order_created(order)
+
+        body = {'message': 'Order placed successfully', 'order': serialize_order(order)}
+        if key:
+            claim.order_id = order.id
+            claim.response_code = 201
+            claim.response_body = current_app.json.dumps(body)
+        db.session.commit()
+
+        logging.info('Order %d placed by customer %s at restaurant %s for %s', order.id, customer_id, restaurant_id, total)
+        return jsonify(body), 201
+
+    except Exception as e:
+        db.session.rollback()
+        logging.error('Error placing order for customer %s: %s', customer_id, e)
+        return jsonify({'error': 'Failed to place order'}), 500
@@ -0,0 +1,49 @@
+import importlib
+import click
+from flask_migrate import Migrate
+from models import db
+
+# name -> (module:attribute, one-line help). A command's module is only imported
+# when that command runs or shows its --help, so neither `flask run` nor the
+# command list pays for seed, query_plans or the maintenance commands.
+COMMANDS = {
+    'check-query-plans': ('query_plans:check_query_plans_command',
+                          'Fail if any endpoint query falls back to a full table scan.'),
+    'reconcile-ledger': ('maintenance:reconcile_ledger_command',
+                         'Check the balance ledger against a full recomputation from payments.'),
+    'prune-order-events': ('maintenance:prune_order_events_command',
+                           'Delete order stream events that are too old to be resumed from.'),
+    'prune-idempotency-keys': ('maintenance:prune_idempotency_keys_command',
+                               'Delete stored checkout responses that clients should no longer retry.'),
+    'archive-orders': ('maintenance:archive_orders_command',
+                       'Move old completed and cancelled orders into the archive tables.'),
+    'backfill-analytics': ('maintenance:backfill_analytics_command',
+                           'Rebuild the sales rollups from order history (hot and archived).'),
+    'seed': ('seed:seed_command', 'Bulk-load deterministic synthetic data for local load testing.'),
+}
+
+
+class LazyCommand(click.Command):
+    """Stands in for the command at import_path until it is used."""
+
+    def __init__(self, name, import_path, help_text):
+        super().__init__(name, help=help_text)
+        self.import_path = import_path
+
+    def load(self):
+        module_name, attribute = self.import_path.split(':')
+        return getattr(importlib.import_module(module_name), attribute)
+
+    def make_context(self, info_name, args, parent=None, **extra):
+        # The real command parses the arguments, so the context (and invoke) is its own
+        return self.load().make_context(info_name, args, parent=parent, **extra)
+
+
+def init_cli(app):
+    """
+    Flask-Migrate and the maintenance commands. Only the `flask` command needs
+    them, so the production entry point (wsgi.py) never imports this module.
+    """
+    Migrate(app, db)
+    for name, (import_path, help_text) in COMMANDS.items():
+        app.cli.add_command(LazyCommand(name, import_path, help_text))
@@ -0,0 +1,119 @@
+import os
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+
+basedir = os.path.abspath(os.path.dirname(__file__))
+DEV_SECRET_KEY = 'Hi'  # Signs sessions and cart quotes on development machines only
+
+
+class Config:
+    """Settings shared by every profile."""
+    SQLALCHEMY_DATABASE_URI = f"sqlite:///{os.path.join(basedir, 'database.db')}"
+    SQLALCHEMY_TRACK_MODIFICATIONS = False
+    SECRET_KEY = os.environ.get('SECRET_KEY', DEV_SECRET_KEY)
+    REQUIRE_SECRET_KEY = False  # Refuse to start with the development key
+
+    # Applied to every new SQLite connection
+    SQLITE_PRAGMAS = {
+        'journal_mode': 'WAL',  # Readers no longer block on the writer
+        'synchronous': 'NORMAL',  # Safe with WAL, fsyncs only at checkpoints
+        'busy_timeout': 5000,  # ms to wait for the write lock instead of failing
+        'cache_size': -64000,  # Negative means KiB, so 64 MB of page cache
+        'mmap_size': 268435456,  # 256 MB memory-mapped reads
+        'temp_store': 'MEMORY',
+    }
+    SQLITE_ENGINE_OPTIONS = {
+        'pool_size': 10,
+        'max_overflow': 10,
+        'pool_timeout': 10,
+    }
+    POSTGRES_ENGINE_OPTIONS = {
+        'pool_size': 10,
+        'max_overflow': 20,
+        'pool_timeout': 10,
+        'pool_recycle': 1800,  # Stay under server and proxy idle timeouts
+        'pool_pre_ping': True,
+        'pool_use_lifo': True,  # Lets surplus connections idle out after a burst
+        'connect_args': {'connect_timeout': 5},
+    }
+
+
+class DevelopmentConfig(Config):
+    DEBUG = True
+
+
+class ProductionConfig(Config):
+    REQUIRE_SECRET_KEY = True
+    LOG_SAMPLE_RATE = 0.1
+    SESSION_COOKIE_SECURE = True
+    POSTGRES_ENGINE_OPTIONS = dict(Config.POSTGRES_ENGINE_OPTIONS, pool_size=20, max_overflow=30)
+
+
+PROFILES = {
+    'development': DevelopmentConfig,
+    'production': ProductionConfig,
+}
+
+
+def engine_options(config):
+    """Pool settings for the configured database unless set explicitly."""
+    if 'SQLALCHEMY_ENGINE_OPTIONS' in config:
+        return config['SQLALCHEMY_ENGINE_OPTIONS']
+    backend = make_url(config['SQLALCHEMY_DATABASE_URI']).get_backend_name()
+    if backend == 'postgresql':
+        return dict(config['POSTGRES_ENGINE_OPTIONS'])
+    if backend == 'sqlite' and ':memory:' not in config['SQLALCHEMY_DATABASE_URI']:
+        return dict(config['SQLITE_ENGINE_OPTIONS'])
+    return {}
+
+
+def check_secret_key(config):
+    """
+    Anyone who knows SECRET_KEY can forge sessions and cart quotes.
+    :raises ValueError: if it is unset or still the development key
+    """
+    if not config.get('SECRET_KEY') or config['SECRET_KEY'] == DEV_SECRET_KEY:
+        raise ValueError('SECRET_KEY must be set to a random value, e.g. python -c "import secrets; print(secrets.token_hex(32))"')
+
+
+def load_config(app, profile=None):
+    """
+    Load settings in increasing priority:
+    the profile class (APP_PROFILE, default development), the Python file named
+    by APP_SETTINGS, APP_* environment variables (e.g. APP_LOG_SAMPLE_RATE=0.5)
+    and finally DATABASE_URL.
+    :raises ValueError: for an unknown profile, or without a real SECRET_KEY where the profile requires one
+    """
+    profile = profile or os.environ.get('APP_PROFILE', 'development')
+    if profile not in PROFILES:
+        raise ValueError(f"Unknown APP_PROFILE '{profile}', expected one of {', '.join(PROFILES)}")
+
+    app.config.from_object(PROFILES[profile])
+    app.config.from_envvar('APP_SETTINGS', silent=True)
+    app.config.from_prefixed_env('APP')
+
+    database_url = os.environ.get('DATABASE_URL')
+    if database_url:
+        # Heroku-style URLs use the scheme SQLAlchemy dropped
+        app.config['SQLALCHEMY_DATABASE_URI'] = database_url.replace('postgres://', 'postgresql://', 1)
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(app.config)
+    app.config['PROFILE'] = profile
+    if app.config['REQUIRE_SECRET_KEY']:
+        check_secret_key(app.config)
+
+
+def init_sqlite_pragmas(app, db):
+    """Apply SQLITE_PRAGMAS on every connection the pool opens."""
+    with app.app_context():
+        engine = db.engine
+    if engine.dialect.name != 'sqlite':
+        return
+
+    pragmas = app.config['SQLITE_PRAGMAS']
+
+    @event.listens_for(engine, 'connect')
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f'PRAGMA {name}={value}')
+        cursor.close()
@@ -1,9 +1,9 @@
 import logging
 from flask import Blueprint, request, jsonify, session
-from flask_bcrypt import Bcrypt
-from models import ActionLog, db, Restaurant, Customer  # Ensure correct imports for models and db
+from models import db, Restaurant, Customer  # Ensure correct imports for models and db
+from audit_log import audit_log
+from passwords import hasher, PasswordServiceBusy
 
-bcrypt = Bcrypt()
 #blueprint for customer
 customer_auth_bp = Blueprint('customer_auth', __name__)
 
@@ -19,7 +19,6 @@ def validate_input(data, fields):
 def register():
     try:
         data = request.get_json()
-        print("Received registration data:", data)
         #to keep the consistency with the formData obeject for restaurants
         normalized_data = {
             "username": data.get("username"),
@@ -40,7 +39,7 @@ def register():
             return jsonify({'error': 'Username already exists'}), 400
 
         #password hash
-        hashed_password = bcrypt.generate_password_hash(data['password']).decode('utf-8')
+        hashed_password = hasher.generate_password_hash(data['password'])
 
         # Create and save the new customer
         new_customer = Customer(
@@ -53,24 +52,21 @@ def register():
             balance=100.00  # Default balance
         )
         db.session.add(new_customer)
-
-        # Log the registration action
-        log = ActionLog(
-            action="registration",
-            description=f"Registered customer: {new_customer.first_name} (username: {new_customer.username})"
-        )
-        db.session.add(log)
         db.session.commit()
-        print("New customer added to the database:", new_customer)
 
+        # Audit record is written in the background, outside the registration transaction
+        audit_log.record("registration", f"Registered customer: {normalized_data['first_name']} (username: {normalized_data['username']})")
 
         session['username'] = new_customer.username
         session['customer_id'] = new_customer.id
-        logging.info(f"Session data: {dict(session)}")
+        logging.info('Registered customer: %s', new_customer.username)
         return jsonify({'message': 'User registered successfully'}), 201
 
+    except PasswordServiceBusy:
+        logging.warning("Password hashing pool is saturated")
+        return jsonify({'error': 'Server busy, please try again'}), 503, {'Retry-After': '1'}
     except Exception as e:
-        print("Error:", str(e))
+        logging.error('Customer auth error: %s', e)
         return jsonify({'error': 'Something went wrong'}), 500
 
 #route for logging in a customer
@@ -78,7 +74,6 @@ def register():
 def login():
     try:
         data = request.get_json()
-        print("Received login data:", data)
 
         # Validate required fields
         is_valid, error_message = validate_input(data, ['username', 'password'])
@@ -88,13 +83,19 @@ def login():
         # Query for the user by username
         customer = Customer.query.filter_by(username=data['username']).first()
         #verify password
-        if customer and bcrypt.check_password_hash(customer.password_hash, data['password']):
+        if customer and hasher.check_password_hash(customer.password_hash, data['password']):
+            # Upgrade hashes made with an outdated cost factor
+            if hasher.rehash_if_needed(customer, data['password']):
+                db.session.commit()
             session['username'] = customer.username
             session['customer_id'] = customer.id
             return jsonify({'message': 'Login successful', 'restaurant_id': customer.id}), 200
         else:
             return jsonify({'error': 'Invalid username or password'}), 401
 
+    except PasswordServiceBusy:
+        logging.warning("Password hashing pool is saturated")
+        return jsonify({'error': 'Server busy, please try again'}), 503, {'Retry-After': '1'}
     except Exception as e:
-        print("Error:", str(e))
+        logging.error('Customer auth error: %s', e)
         return jsonify({'error': 'Something went wrong'}), 500
\ No newline at end of file
@@ -0,0 +1,260 @@
+import logging
+import time
+from threading import Lock
+from sqlalchemy import event, inspect
+from models import db, Restaurant, DeliveryArea, OpeningHour
+
+DEFAULT_MAX_AGE = 60  # seconds before a full reload picks up changes made by other processes
+SUMMARY_FIELDS = ('name', 'street', 'postal_code', 'description', 'image_url')
+
+
+def parse_time(value):
+    """Normalize 'H:MM' / 'HH:MM[:SS]' to 'HH:MM' so times compare as strings."""
+    hours, minutes = value.split(':')[:2]
+    return f'{int(hours):02d}:{int(minutes):02d}'
+
+
+def open_window(hours, now):
+    """
+    :param hours: {day_of_week: (open_time, close_time)}, 0 = Sunday as in opening_hours
+    :param now: local datetime
+    :return: the (open_time, close_time) window now falls in, or None if closed
+    """
+    today = (now.weekday() + 1) % 7
+    current = now.strftime('%H:%M')
+
+    window = hours.get(today)
+    if window:
+        open_time, close_time = window
+        # A close time at or before the open time runs past midnight
+        if open_time <= current and (current < close_time or close_time <= open_time):
+            return window
+
+    window = hours.get((today - 1) % 7)
+    if window:
+        open_time, close_time = window
+        if close_time <= open_time and current < close_time:
+            return window
+    return None
+
+
+def load_delivery_data(conn, restaurant_ids=None):
+    """
+    Read summaries, delivery areas and opening hours, for all restaurants or only restaurant_ids.
+    :return: (summaries, postal codes per restaurant, hours per restaurant)
+    """
+    def restrict(query, column):
+        return query if restaurant_ids is None else query.where(column.in_(restaurant_ids))
+
+    summaries = {
+        row.id: {
+            'id': row.id,
+            'name': row.name,
+            'street': row.street,
+            'postalCode': row.postal_code,
+            'description': row.description,
+            'imageUrl': row.image_url,
+        }
+        for row in conn.execute(restrict(
+            db.select(Restaurant.id, *(getattr(Restaurant, field) for field in SUMMARY_FIELDS)),
+            Restaurant.id
+        ))
+    }
+
+    areas = {restaurant_id: set() for restaurant_id in summaries}
+    for restaurant_id, postal_code in conn.execute(restrict(
+        db.select(DeliveryArea.restaurant_id, DeliveryArea.postal_code), DeliveryArea.restaurant_id
+    )):
+        if restaurant_id in areas:
+            areas[restaurant_id].add(postal_code.strip())
+
+    hours = {restaurant_id: {} for restaurant_id in summaries}
+    for row in conn.execute(restrict(
+        db.select(OpeningHour.restaurant_id, OpeningHour.day_of_week, OpeningHour.open_time, OpeningHour.close_time),
+        OpeningHour.restaurant_id
+    )):
+        if row.restaurant_id not in hours:
+            continue
+        try:
+            hours[row.restaurant_id][row.day_of_week] = (parse_time(row.open_time), parse_time(row.close_time))
+        except ValueError:
+            logging.warning('Ignoring malformed opening hours for restaurant %s: %s-%s',
+                            row.restaurant_id, row.open_time, row.close_time)
+
+    return summaries, areas, hours
+
+
+class IndexData:
+    """The maps behind a DeliveryIndex. A full reload builds a new one and swaps it in."""
+
+    def __init__(self):
+        self.restaurant_ids = {}  # postal_code -> set of restaurant ids
+        self.postal_codes = {}  # restaurant_id -> set of postal codes
+        self.hours = {}  # restaurant_id -> {day_of_week: (open_time, close_time)}
+        self.summaries = {}  # restaurant_id -> summary dict
+
+    def remove(self, restaurant_id):
+        for postal_code in self.postal_codes.pop(restaurant_id, ()):
+            ids = self.restaurant_ids.get(postal_code)
+            if ids is not None:
+                ids.discard(restaurant_id)
+                if not ids:
+                    del self.restaurant_ids[postal_code]
+        self.hours.pop(restaurant_id, None)
+        self.summaries.pop(restaurant_id, None)
+
+    def add(self, restaurant_id, summary, postal_codes, hours):
+        self.summaries[restaurant_id] = summary
+        self.postal_codes[restaurant_id] = postal_codes
+        self.hours[restaurant_id] = hours
+        for postal_code in postal_codes:
+            self.restaurant_ids.setdefault(postal_code, set()).add(restaurant_id)
+
+
+class DeliveryIndex:
+    """
+    In-memory postal_code -> restaurant ids index with each restaurant's opening
+    hours and a ready-to-serve summary.
+    Commits that touch restaurants, delivery areas or opening hours mark those
+    restaurants stale, and only they are reloaded on the next lookup. The whole
+    index is reloaded every max_age seconds to pick up other processes' writes;
+    that reload is built aside and swapped in, and lookups meanwhile answer from
+    the current index instead of waiting for it.
+    """
+
+    def __init__(self, max_age=DEFAULT_MAX_AGE):
+        self.max_age = max_age
+        self._data = None  # IndexData once the first load has finished
+        self._stale = set()
+        self._loaded_at = None
+        self._lock = Lock()
+        self._load_lock = Lock()  # One reload at a time
+
+    def mark_stale(self, restaurant_ids):
+        with self._lock:
+            self._stale.update(restaurant_ids)
+
+    def invalidate(self):
+        with self._lock:
+            self._loaded_at = None
+
+    def rebuild(self):
+        loaded_at = time.monotonic()
+        with db.engine.connect() as conn:
+            summaries, areas, hours = load_delivery_data(conn)
+        data = IndexData()
+        for restaurant_id, summary in summaries.items():
+            data.add(restaurant_id, summary, areas[restaurant_id], hours[restaurant_id])
+        with self._lock:
+            self._data = data
+            self._loaded_at = loaded_at
+        logging.info('Delivery index rebuilt: %d restaurants, %d postal codes',
+                     len(summaries), len(data.restaurant_ids))
+
+    def refresh(self, restaurant_ids):
+        with db.engine.connect() as conn:
+            summaries, areas, hours = load_delivery_data(conn, restaurant_ids)
+        with self._lock:
+            for restaurant_id in restaurant_ids:
+                self._data.remove(restaurant_id)
+                if restaurant_id in summaries:
+                    self._data.add(restaurant_id, summaries[restaurant_id], areas[restaurant_id], hours[restaurant_id])
+
+    def ensure_fresh(self):
+        """
+        Reload what is out of date. A lookup only waits for another thread's reload
+        when there is no index yet or restaurants changed by a commit are pending;
+        an index that has merely aged is served until the new one is swapped in.
+        """
+        with self._lock:
+            expired = self._loaded_at is None or time.monotonic() - self._loaded_at >= self.max_age
+            must_wait = self._data is None or bool(self._stale)
+        if not (expired or must_wait):
+            return
+        if not self._load_lock.acquire(blocking=must_wait):
+            return
+        try:
+            with self._lock:
+                expired = self._loaded_at is None or time.monotonic() - self._loaded_at >= self.max_age
+                stale, self._stale = self._stale, set()
+            if expired or self._data is None:
+                self.rebuild()
+            elif stale:
+                self.refresh(stale)
+        finally:
+            self._load_lock.release()
+
+    def lookup(self, postal_code, now, include_closed=False):
+        """
+        :return: summaries of restaurants delivering to postal_code, sorted by name.
+                 Closed ones are left out unless include_closed, in which case each
+                 summary carries an isOpen flag.
+        """
+        self.ensure_fresh()
+        results = []
+        with self._lock:
+            data = self._data
+            for restaurant_id in data.restaurant_ids.get(postal_code.strip(), ()):
+                window = open_window(data.hours[restaurant_id], now)
+                if window:
+                    results.append(dict(data.summaries[restaurant_id], isOpen=True, closesAt=window[1]))
+                elif include_closed:
+                    results.append(dict(data.summaries[restaurant_id], isOpen=False))
+        results.sort(key=lambda summary: (summary['name'], summary['id']))
+        return results
+
+
+delivery_index = DeliveryIndex()
+
+
+def init_delivery_index(app):
+    delivery_index.max_age = app.config.setdefault('DELIVERY_INDEX_MAX_AGE', DEFAULT_MAX_AGE)
+    delivery_index.invalidate()
+
+
+def _changed_restaurant_ids(session):
+    """Restaurants whose summary, delivery areas or opening hours this flush changes."""
+    changed = set()
+    for obj in list(session.new) + list(session.deleted):
+        if isinstance(obj, Restaurant):
+            changed.add(obj.id)
+        elif isinstance(obj, (DeliveryArea, OpeningHour)):
+            changed.add(obj.restaurant_id)
+    for obj in session.dirty:
+        if isinstance(obj, Restaurant):
+            state = inspect(obj)
+            if any(state.attrs[field].history.has_changes() for field in SUMMARY_FIELDS):
+                changed.add(obj.id)
+        elif isinstance(obj, (DeliveryArea, OpeningHour)):
+            history = inspect(obj).attrs.restaurant_id.history
+            changed.update(history.deleted or ())
+            changed.add(obj.restaurant_id)
+    changed.discard(None)
+    return changed
+
+
+@event.listens_for(db.session, 'before_flush')
+def _collect_changes(session, flush_context, instances):
+    changed = _changed_restaurant_ids(session)
+    if changed:
+        session.info.setdefault('delivery_index_changes', set()).update(changed)
+
+
+@event.listens_for(db.session, 'after_flush')
+def _collect_new_ids(session, flush_context):
+    # Restaurants created in this flush only have their id now
+    new_ids = {obj.id for obj in session.new if isinstance(obj, Restaurant)}
+    if new_ids:
+        session.info.setdefault('delivery_index_changes', set()).update(new_ids)
+
+
+@event.listens_for(db.session, 'after_commit')
+def _apply_changes(session):
+    changed = session.info.pop('delivery_index_changes', None)
+    if changed:
+        delivery_index.mark_stale(changed)
+
+
+@event.listens_for(db.session, 'after_rollback')
+def _discard_changes(session):
+    session.info.pop('delivery_index_changes', None)
@@ -0,0 +1,52 @@
+"""
+gunicorn settings for wsgi:app. Any of them can be overridden on the command
+line or in GUNICORN_CMD_ARGS, e.g. GUNICORN_CMD_ARGS="--workers 8 --max-requests 5000".
+"""
+import os
+
+bind = os.environ.get('BIND', '0.0.0.0:5050')
+workers = int(os.environ.get('WEB_CONCURRENCY', (os.cpu_count() or 1) + 1))
+
+# Threads keep SSE order streams (/api/orders/stream) from tying up a whole
+# worker; bcrypt and thumbnails already run in their own process pools.
+# A stream holds its thread while it is open, so each worker allows only
+# ORDER_STREAM_MAX_OPEN of them (default 4 of the 8) and ends each after
+# ORDER_STREAM_MAX_SECONDS; keep the limit below threads.
+worker_class = 'gthread'
+threads = 8
+
+# Build the app once in the master; workers are forked from it
+preload_app = True
+
+# Each worker only counts its own requests; with a shared directory /metrics
+# reports the whole server (APP_METRICS_DIR, see metrics.ProcessMetricsFiles)
+os.environ.setdefault('APP_METRICS_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'instance', 'metrics'))
+
+# Replace each worker after this many requests to cap slow leaks; the jitter
+# keeps workers from all restarting at the same moment
+max_requests = 2000
+max_requests_jitter = 200
+
+timeout = 60
+graceful_timeout = 30  # SIGTERM: finish in-flight requests for up to this long
+keepalive = 5
+
+
+def on_starting(server):
+    from wsgi import before_start
+    before_start()
+
+
+def post_fork(server, worker):
+    from wsgi import after_fork
+    after_fork()
+
+
+def worker_exit(server, worker):
+    from wsgi import before_exit
+    before_exit()
+
+
+def child_exit(server, worker):
+    from wsgi import worker_exited
+    worker_exited(worker.pid)
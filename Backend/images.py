@@ -0,0 +1,357 @@
+import hashlib
+import logging
+import os
+import re
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from threading import Lock
+from flask import Blueprint, jsonify, redirect, request, send_from_directory, session, url_for
+from PIL import Image, ImageOps
+from werkzeug.exceptions import RequestEntityTooLarge
+from passwords import POOL_CONTEXT
+
+images_bp = Blueprint('images', __name__, url_prefix='/api/images')
+
+DEFAULT_MAX_BYTES = 10 * 1024 * 1024
+DEFAULT_MAX_PIXELS = 40_000_000  # width * height; a small file can still decode to gigabytes
+DEFAULT_THUMBNAIL_WIDTHS = (160, 320, 640)
+DEFAULT_THUMBNAIL_QUALITY = 80
+DEFAULT_THUMBNAIL_WAIT = 2.0  # seconds a thumbnail request waits for a job that is still running
+MULTIPART_OVERHEAD = 16 * 1024  # Boundaries and part headers around the file
+CHUNK_SIZE = 64 * 1024
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600  # The bytes behind a content-addressed name never change
+
+FORMATS = {'JPEG': 'jpg', 'PNG': 'png', 'WEBP': 'webp'}  # Accepted uploads and their extension
+THUMBNAIL_EXTENSION = 'webp'
+IMAGE_NAME = re.compile(r'^([0-9a-f]{64})(?:-(\d+))?\.(jpg|png|webp)$')  # <sha256>[-<width>].<ext>
+
+
+def thumbnail_name(digest, width):
+    return f'{digest}-{width}.{THUMBNAIL_EXTENSION}'
+
+
+def _save_atomically(image, path, **params):
+    """Write to a temporary file next to path and rename it, so readers never see half a file."""
+    handle, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    try:
+        with os.fdopen(handle, 'wb') as temp:
+            image.save(temp, **params)
+        os.replace(temp_path, path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+
+
+def _make_thumbnails(original, widths, quality, max_pixels=DEFAULT_MAX_PIXELS):
+    """
+    Runs in a pool process: write <digest>-<width>.webp next to the original for
+    every width, scaling down step by step from the largest. Never upscales.
+    """
+    started = time.time()
+    directory, filename = os.path.split(original)
+    digest = filename.split('.')[0]
+    with Image.open(original) as source:
+        if source.width * source.height > max_pixels:
+            raise ValueError(f'{filename} has more than {max_pixels} pixels')
+        largest = max(widths)
+        source.draft('RGB', (largest, largest))  # JPEG only: decode at a reduced scale
+        image = ImageOps.exif_transpose(source)
+        image = image.convert('RGBA' if image.has_transparency_data else 'RGB')
+        for width in sorted(widths, reverse=True):
+            if width < image.width:
+                height = max(round(image.height * width / image.width), 1)
+                image = image.resize((width, height), Image.Resampling.LANCZOS, reducing_gap=3.0)
+            _save_atomically(image, os.path.join(directory, thumbnail_name(digest, width)),
+                             format='WEBP', quality=quality, method=4)
+    return digest, started
+
+
+def identify(path, max_pixels=DEFAULT_MAX_PIXELS):
+    """
+    Read only the image header.
+    :return: (extension, width, height)
+    :raises ValueError: if the file isn't a JPEG, PNG or WebP image, or has more than max_pixels pixels
+    """
+    try:
+        with Image.open(path) as image:
+            format, width, height = image.format, image.width, image.height
+    except Image.DecompressionBombError as e:
+        raise ValueError(f'Images may be at most {max_pixels // 1_000_000} megapixels.') from e
+    except OSError as e:
+        raise ValueError('Expected a JPEG, PNG or WebP image.') from e
+    if format not in FORMATS:
+        raise ValueError('Expected a JPEG, PNG or WebP image.')
+    # Pillow only warns between MAX_IMAGE_PIXELS and twice that; refuse those images too
+    if width * height > min(max_pixels, Image.MAX_IMAGE_PIXELS or max_pixels):
+        raise ValueError(f'Images may be at most {max_pixels // 1_000_000} megapixels.')
+    return FORMATS[format], width, height
+
+
+class ImageStore:
+    """
+    Content-addressed image files: an upload is stored once under the SHA-256 of
+    its bytes, whoever uploads it. Thumbnails are made in a shared process pool
+    after the upload has been answered; at most one job per image is in flight.
+    """
+
+    def __init__(self):
+        self.root = None
+        self.max_bytes = DEFAULT_MAX_BYTES
+        self.max_pixels = DEFAULT_MAX_PIXELS
+        self.widths = DEFAULT_THUMBNAIL_WIDTHS
+        self.quality = DEFAULT_THUMBNAIL_QUALITY
+        self.thumbnail_wait = DEFAULT_THUMBNAIL_WAIT
+        self.workers = 1
+        self._executor = None
+        self._pending = {}  # digest -> Future of its thumbnail job
+        self._lock = Lock()
+        self._stats = {
+            'uploads': 0,
+            'duplicates': 0,
+            'thumbnailed': 0,
+            'failed': 0,
+            'thumbnail_seconds_total': 0.0,
+        }
+
+    def init_app(self, app):
+        self.root = app.config.setdefault('IMAGE_STORAGE_DIR', os.path.join(app.instance_path, 'images'))
+        self.max_bytes = app.config.setdefault('IMAGE_MAX_BYTES', DEFAULT_MAX_BYTES)
+        self.max_pixels = app.config.setdefault('IMAGE_MAX_PIXELS', DEFAULT_MAX_PIXELS)
+        self.widths = tuple(app.config.setdefault('IMAGE_THUMBNAIL_WIDTHS', DEFAULT_THUMBNAIL_WIDTHS))
+        self.quality = app.config.setdefault('IMAGE_THUMBNAIL_QUALITY', DEFAULT_THUMBNAIL_QUALITY)
+        self.thumbnail_wait = app.config.setdefault('IMAGE_THUMBNAIL_WAIT', DEFAULT_THUMBNAIL_WAIT)
+        # Half the cores by default, leaving the rest to requests and bcrypt; 0 thumbnails inline
+        self.workers = app.config.setdefault('IMAGE_WORKERS', max((os.cpu_count() or 1) // 2, 1))
+        self.shutdown()
+
+    def path(self, name):
+        """Files are spread over 256 directories by the first two hex digits of their hash."""
+        return os.path.join(self.root, name[:2], name)
+
+    def find_original(self, digest):
+        """:return: file name of the original with this hash, or None"""
+        for extension in FORMATS.values():
+            name = f'{digest}.{extension}'
+            if os.path.exists(self.path(name)):
+                return name
+        return None
+
+    def thumbnails_ready(self, digest):
+        return all(os.path.exists(self.path(thumbnail_name(digest, width))) for width in self.widths)
+
+    def store(self, stream):
+        """
+        Save an upload under its hash and queue its thumbnails.
+        :return: (digest, file name, width, height, created); created is False for a duplicate
+        :raises ValueError: if the upload is too large or not an image
+        """
+        os.makedirs(self.root, exist_ok=True)
+        hasher = hashlib.sha256()
+        size = 0
+        handle, temp_path = tempfile.mkstemp(dir=self.root, prefix='upload-', suffix='.tmp')
+        try:
+            with os.fdopen(handle, 'wb') as temp:
+                for chunk in iter(lambda: stream.read(CHUNK_SIZE), b''):
+                    size += len(chunk)
+                    if size > self.max_bytes:
+                        raise ValueError(f'Images may be at most {self.max_bytes // (1024 * 1024)} MB.')
+                    hasher.update(chunk)
+                    temp.write(chunk)
+            extension, width, height = identify(temp_path, self.max_pixels)
+
+            digest = hasher.hexdigest()
+            name = f'{digest}.{extension}'
+            target = self.path(name)
+            created = not os.path.exists(target)
+            if created:
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                os.replace(temp_path, target)
+        finally:
+            if os.path.exists(temp_path):
+                os.unlink(temp_path)
+
+        with self._lock:
+            self._stats['uploads' if created else 'duplicates'] += 1
+        self.queue_thumbnails(digest, name)
+        return digest, name, width, height, created
+
+    def _get_executor(self):
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=POOL_CONTEXT)
+        return self._executor
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+            self._pending.clear()
+        # Outside the lock: cancelling queued jobs runs their callbacks in this thread
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def after_fork(self):
+        """In a forked worker: forget the parent's pool and jobs without touching them."""
+        self._lock = Lock()
+        self._executor = None
+        self._pending = {}
+
+    def queue_thumbnails(self, digest, name):
+        """
+        Start the thumbnail job for an original unless its thumbnails exist or a
+        job is already running. With IMAGE_WORKERS = 0 the job runs right here.
+        :return: the job's Future, or None if there is nothing to wait for
+        """
+        if not self.workers:
+            if not self.thumbnails_ready(digest):
+                self._thumbnail_inline(digest, self.path(name))
+            return None
+
+        with self._lock:
+            future = self._pending.get(digest)
+            if future is not None:
+                return future
+            if self.thumbnails_ready(digest):
+                return None
+            submitted = time.time()
+            future = self._get_executor().submit(
+                _make_thumbnails, self.path(name), self.widths, self.quality, self.max_pixels
+            )
+            self._pending[digest] = future
+        # Outside the lock: the callback runs at once if the job has already finished
+        future.add_done_callback(lambda done: self._finished(digest, done, submitted))
+        return future
+
+    def _thumbnail_inline(self, digest, original):
+        started = time.time()
+        try:
+            _make_thumbnails(original, self.widths, self.quality, self.max_pixels)
+        except Exception as e:
+            logging.error('Thumbnails for image %s failed: %s', digest, e)
+            with self._lock:
+                self._stats['failed'] += 1
+            return
+        with self._lock:
+            self._stats['thumbnailed'] += 1
+            self._stats['thumbnail_seconds_total'] += time.time() - started
+
+    def _finished(self, digest, future, submitted):
+        with self._lock:
+            if self._pending.get(digest) is future:
+                del self._pending[digest]
+        if future.cancelled():
+            return
+        error = future.exception()
+        if error is not None:
+            logging.error('Thumbnails for image %s failed: %s', digest, error)
+            with self._lock:
+                self._stats['failed'] += 1
+            if isinstance(error, BrokenProcessPool):
+                logging.warning('Image worker pool broke, restarting it')
+                self.shutdown()
+            return
+        _, started = future.result()
+        with self._lock:
+            self._stats['thumbnailed'] += 1
+            self._stats['thumbnail_seconds_total'] += time.time() - max(started, submitted)
+
+    def wait_for_thumbnails(self, digest, name):
+        """Give a running (or restarted) thumbnail job up to IMAGE_THUMBNAIL_WAIT seconds."""
+        future = self.queue_thumbnails(digest, name)
+        if future is None:
+            return
+        try:
+            future.result(timeout=self.thumbnail_wait)
+        except Exception:
+            pass  # Still running, or failed and logged by _finished
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats, pending=len(self._pending))
+
+
+image_store = ImageStore()
+
+
+def init_images(app):
+    image_store.init_app(app)
+
+
+def image_urls(digest, name):
+    return {
+        'url': url_for('images.get_image', name=name),
+        'thumbnails': {
+            str(width): url_for('images.get_image', name=thumbnail_name(digest, width))
+            for width in image_store.widths
+        },
+    }
+
+
+def upload_too_large():
+    return jsonify({'error': f'Images may be at most {image_store.max_bytes // (1024 * 1024)} MB.'}), 413
+
+
+@images_bp.route('/', methods=['POST'])
+def upload_image():
+    """
+    Store a JPEG, PNG or WebP image sent as the multipart field 'file'.
+    Returns its URL and one thumbnail URL per IMAGE_THUMBNAIL_WIDTHS entry; put
+    either into a menu item's or the restaurant's image_url.
+    """
+    restaurant_id = session.get('restaurant_id')
+    if not restaurant_id:
+        logging.warning('Unauthorized access: No restaurant_id in session')
+        return jsonify({'error': 'Unauthorized access'}), 401
+
+    # Refuse oversized bodies before they are parsed and spooled to disk. A chunked
+    # body has no Content-Length, so the limit also stops the parser mid-stream.
+    request.max_content_length = image_store.max_bytes + MULTIPART_OVERHEAD
+    if (request.content_length or 0) > request.max_content_length:
+        return upload_too_large()
+    try:
+        upload = request.files.get('file')
+    except RequestEntityTooLarge:
+        return upload_too_large()
+    if upload is None:
+        return jsonify({'error': "Expected an image file in the 'file' field."}), 400
+
+    try:
+        digest, name, width, height, created = image_store.store(upload.stream)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        logging.error('Image upload by restaurant %s failed: %s', restaurant_id, e)
+        return jsonify({'error': 'Failed to store image'}), 500
+
+    logging.info('Restaurant %s uploaded image %s (%s)', restaurant_id, name, 'new' if created else 'duplicate')
+    return jsonify(dict(image_urls(digest, name), hash=digest, width=width, height=height)), 201 if created else 200
+
+
+@images_bp.route('/<name>', methods=['GET'])
+def get_image(name):
+    """
+    Serve an original or thumbnail with a one-year immutable cache lifetime;
+    send_file hands the open file to the server, which can use sendfile.
+    A thumbnail that isn't ready yet waits briefly, then redirects to the original.
+    """
+    match = IMAGE_NAME.match(name)
+    if not match:
+        return jsonify({'error': 'Image not found'}), 404
+    digest, width, extension = match.groups()
+
+    if width and not os.path.exists(image_store.path(name)):
+        original = image_store.find_original(digest)
+        if extension != THUMBNAIL_EXTENSION or int(width) not in image_store.widths or original is None:
+            return jsonify({'error': 'Image not found'}), 404
+        image_store.wait_for_thumbnails(digest, original)
+        if not os.path.exists(image_store.path(name)):
+            response = redirect(url_for('images.get_image', name=original))
+            response.cache_control.no_store = True
+            return response
+    elif not os.path.exists(image_store.path(name)):
+        return jsonify({'error': 'Image not found'}), 404
+
+    response = send_from_directory(os.path.dirname(image_store.path(name)), name, max_age=IMMUTABLE_MAX_AGE)
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
@@ -0,0 +1,88 @@
+from decimal import Decimal
+from models import db, Payment, RestaurantBalance, BalanceLedgerEntry
+
+# A restaurant is credited its share of an order when checkout charges the
+# customer, and debited again only if the order is cancelled (see payments)
+CENT = Decimal('0.01')
+ADJUSTMENT = 'adjustment'  # to_status of entries written by reconciliation
+
+
+def record_entries(restaurant_id, entries):
+    """
+    Append ledger entries for one restaurant with one executemany and move its
+    running total with one UPDATE, in the caller's transaction.
+    :param entries: list of (order_id, amount, from_status, to_status) tuples
+    """
+    if not entries:
+        return
+    db.session.execute(db.insert(BalanceLedgerEntry), [
+        {
+            'restaurant_id': restaurant_id,
+            'order_id': order_id,
+            'amount': amount,
+            'from_status': from_status,
+            'to_status': to_status
+        }
+        for order_id, amount, from_status, to_status in entries
+    ])
+    total = sum((amount for _, amount, _, _ in entries), Decimal('0'))
+    if total != 0:
+        apply_delta(restaurant_id, total)
+
+
+def apply_delta(restaurant_id, delta):
+    """Add delta to the restaurant's running total with a single UPDATE."""
+    # Rounded in SQL since SQLite stores NUMERIC as floating point
+    updated = db.session.execute(
+        db.update(RestaurantBalance)
+        .where(RestaurantBalance.restaurant_id == restaurant_id)
+        .values(balance=db.func.round(RestaurantBalance.balance + delta, 2))
+    ).rowcount
+    if not updated:
+        db.session.add(RestaurantBalance(restaurant_id=restaurant_id, balance=delta))
+
+
+def get_balance(restaurant_id):
+    total = db.session.get(RestaurantBalance, restaurant_id)
+    return Decimal(total.balance).quantize(CENT) if total else Decimal('0.00')
+
+
+def recompute_balances():
+    """Full recomputation from the payments that weren't refunded, keyed by restaurant_id."""
+    rows = db.session.query(
+        Payment.restaurant_id,
+        db.func.sum(Payment.restaurant_amount)
+    ).filter(
+        Payment.refunded_at.is_(None)
+    ).group_by(Payment.restaurant_id).all()
+    return {restaurant_id: Decimal(total or 0).quantize(CENT) for restaurant_id, total in rows}
+
+
+def find_mismatches():
+    """
+    Compare running totals and ledger sums against a full recomputation.
+    :return: list of (restaurant_id, running_total, ledger_sum, expected) tuples that disagree
+    """
+    expected = recompute_balances()
+    totals = {
+        row.restaurant_id: Decimal(row.balance).quantize(CENT)
+        for row in RestaurantBalance.query.all()
+    }
+    ledger = {
+        restaurant_id: Decimal(total or 0).quantize(CENT)
+        for restaurant_id, total in db.session.query(
+            BalanceLedgerEntry.restaurant_id, db.func.sum(BalanceLedgerEntry.amount)
+        ).group_by(BalanceLedgerEntry.restaurant_id)
+    }
+
+    mismatches = []
+    zero = Decimal('0.00')
+    for restaurant_id in sorted(set(expected) | set(totals) | set(ledger)):
+        row = (
+            totals.get(restaurant_id, zero),
+            ledger.get(restaurant_id, zero),
+            expected.get(restaurant_id, zero)
+        )
+        if row[0] != row[2] or row[1] != row[2]:
+            mismatches.append((restaurant_id,) + row)
+    return mismatches
@@ -0,0 +1,139 @@
+import atexit
+import json
+import logging
+import queue
+import random
+import sys
+import time
+import uuid
+from logging.handlers import QueueHandler, QueueListener
+from flask import g, has_request_context, request
+
+DEFAULT_REDACT = ('password', 'password_hash', 'token')
+REDACTED = '***'
+RECORD_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', None, None))) | {'message', 'asctime', 'request_id'}
+
+_listener = None
+
+
+class RequestIdFilter(logging.Filter):
+    """Tag records with the current request id; runs on the request thread."""
+
+    def filter(self, record):
+        record.request_id = g.get('request_id') if has_request_context() else None
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line; `extra=` fields are included as top-level keys."""
+
+    def format(self, record):
+        entry = {
+            'ts': self.formatTime(record, '%Y-%m-%dT%H:%M:%S') + f'.{int(record.msecs):03d}',
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+        }
+        if getattr(record, 'request_id', None):
+            entry['request_id'] = record.request_id
+        for key, value in vars(record).items():
+            if key not in RECORD_ATTRS:
+                entry[key] = value
+        if record.exc_info:
+            entry['exc_info'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+def redact(data, keys):
+    if isinstance(data, dict):
+        return {key: REDACTED if key in keys else redact(value, keys) for key, value in data.items()}
+    if isinstance(data, list):
+        return [redact(item, keys) for item in data]
+    return data
+
+
+def route_rules(app):
+    """Per-endpoint overrides of sample_rate, log_body and redact."""
+    rules = app.config['LOG_ROUTES'].get(request.endpoint, {})
+    return (
+        rules.get('sample_rate', app.config['LOG_SAMPLE_RATE']),
+        rules.get('log_body', app.config['LOG_BODIES']),
+        set(rules.get('redact', ())) | set(app.config['LOG_REDACT'])
+    )
+
+
+def start_listener(app):
+    """Route every record through a queue; a background thread does the I/O."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+
+    stream = logging.StreamHandler(sys.stderr)
+    if app.config['LOG_FORMAT'] == 'json':
+        stream.setFormatter(JsonFormatter())
+    else:
+        stream.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - [%(request_id)s] %(message)s'))
+
+    log_queue = queue.SimpleQueue()
+    queue_handler = QueueHandler(log_queue)
+    queue_handler.addFilter(RequestIdFilter())
+
+    root = logging.getLogger()
+    root.handlers[:] = [queue_handler]
+    root.setLevel(app.config['LOG_LEVEL'])
+
+    _listener = QueueListener(log_queue, stream, respect_handler_level=True)
+    _listener.start()
+
+
+def stop_listener():
+    """Flush queued records; registered with atexit."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+atexit.register(stop_listener)
+
+
+def init_logging(app):
+    app.config.setdefault('LOG_LEVEL', 'INFO')
+    app.config.setdefault('LOG_FORMAT', 'json')  # or 'text'
+    app.config.setdefault('LOG_SAMPLE_RATE', 1.0)  # Fraction of successful requests that get an access log line
+    app.config.setdefault('LOG_SLOW_REQUEST_MS', 500)  # Always logged, like errors
+    app.config.setdefault('LOG_BODIES', False)
+    app.config.setdefault('LOG_REDACT', DEFAULT_REDACT)
+    app.config.setdefault('LOG_ROUTES', {})  # e.g. {'menu.bulk_upsert_menu_items': {'sample_rate': 0.1}}
+    start_listener(app)
+
+    access_log = logging.getLogger('access')
+
+    @app.before_request
+    def start_request_timer():
+        g.request_id = request.headers.get('X-Request-ID') or uuid.uuid4().hex
+        g.request_started = time.perf_counter()
+
+    @app.after_request
+    def log_request(response):
+        response.headers['X-Request-ID'] = g.get('request_id', '')
+        if 'request_started' not in g:
+            return response
+        duration_ms = (time.perf_counter() - g.request_started) * 1000
+
+        sample_rate, log_body, redact_keys = route_rules(app)
+        important = response.status_code >= 500 or duration_ms >= app.config['LOG_SLOW_REQUEST_MS']
+        if not important and random.random() >= sample_rate:
+            return response
+
+        fields = {
+            'method': request.method,
+            'path': request.path,
+            'endpoint': request.endpoint,
+            'status': response.status_code,
+            'duration_ms': round(duration_ms, 3),
+        }
+        if log_body and request.method in ('POST', 'PUT', 'PATCH'):
+            fields['body'] = redact(request.get_json(silent=True), redact_keys)
+        access_log.info('%s %s %d', request.method, request.path, response.status_code, extra=fields)
+        return response
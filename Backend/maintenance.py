@@ -0,0 +1,89 @@
+"""
+Maintenance commands for the tables the server writes to. They live here, not
+next to the code they call, so server processes never define them; cli.py
+imports this module only when one of them runs.
+"""
+import time
+from datetime import datetime, timedelta
+import click
+from flask.cli import with_appcontext
+from models import db, BalanceLedgerEntry, IdempotencyKey, OrderEvent
+from ledger import ADJUSTMENT, apply_delta, find_mismatches
+from archive import DEFAULT_ARCHIVE_DAYS, DEFAULT_CHUNK_SIZE, DEFAULT_PAUSE, archive_orders
+from analytics import backfill
+
+
+@click.command('reconcile-ledger')
+@click.option('--fix', is_flag=True, help='Append adjustment entries and reset running totals.')
+@with_appcontext
+def reconcile_ledger_command(fix):
+    """Check the balance ledger against a full recomputation from payments."""
+    mismatches = find_mismatches()
+    for restaurant_id, running, ledger_sum, expected in mismatches:
+        click.echo(
+            f'restaurant {restaurant_id}: running total {running}, '
+            f'ledger sum {ledger_sum}, recomputed {expected}',
+            err=True
+        )
+
+    if not mismatches:
+        click.echo('Ledger is consistent with payments.')
+        return
+    if not fix:
+        raise click.ClickException(f'{len(mismatches)} restaurant balances are out of sync')
+
+    for restaurant_id, running, ledger_sum, expected in mismatches:
+        if ledger_sum != expected:
+            db.session.add(BalanceLedgerEntry(
+                restaurant_id=restaurant_id,
+                order_id=None,
+                amount=expected - ledger_sum,
+                to_status=ADJUSTMENT
+            ))
+        apply_delta(restaurant_id, expected - running)
+    db.session.commit()
+    click.echo(f'Reconciled {len(mismatches)} restaurant balances.')
+
+
+@click.command('prune-order-events')
+@click.option('--hours', default=24, show_default=True, help='Keep events newer than this.')
+@with_appcontext
+def prune_order_events_command(hours):
+    """Delete order stream events that are too old to be resumed from."""
+    cutoff = datetime.utcnow() - timedelta(hours=hours)
+    deleted = db.session.execute(db.delete(OrderEvent).where(OrderEvent.created_at < cutoff)).rowcount
+    db.session.commit()
+    click.echo(f'Deleted {deleted} order events.')
+
+
+@click.command('prune-idempotency-keys')
+@click.option('--hours', default=24, show_default=True, help='Keep keys newer than this.')
+@with_appcontext
+def prune_idempotency_keys_command(hours):
+    """Delete stored checkout responses that clients should no longer retry."""
+    cutoff = datetime.utcnow() - timedelta(hours=hours)
+    deleted = db.session.execute(db.delete(IdempotencyKey).where(IdempotencyKey.created_at < cutoff)).rowcount
+    db.session.commit()
+    click.echo(f'Deleted {deleted} idempotency keys.')
+
+
+@click.command('archive-orders')
+@click.option('--days', default=DEFAULT_ARCHIVE_DAYS, show_default=True, help='Archive finished orders older than this.')
+@click.option('--chunk-size', default=DEFAULT_CHUNK_SIZE, show_default=True, help='Orders moved per transaction.')
+@click.option('--pause', default=DEFAULT_PAUSE, show_default=True, help='Seconds to sleep between chunks.')
+@with_appcontext
+def archive_orders_command(days, chunk_size, pause):
+    """Move old completed and cancelled orders into the archive tables."""
+    archived = archive_orders(days, chunk_size, pause)
+    click.echo(f'Archived {archived} orders.')
+
+
+@click.command('backfill-analytics')
+@click.option('--restaurant', 'restaurant_ids', type=int, multiple=True, help='Only rebuild this restaurant; repeatable.')
+@with_appcontext
+def backfill_analytics_command(restaurant_ids):
+    """Rebuild the sales rollups from order history (hot and archived)."""
+    started = time.perf_counter()
+    with db.engine.connect() as conn:
+        hourly_rows, item_rows = backfill(conn, list(restaurant_ids) or None)
+    click.echo(f'Wrote {hourly_rows} hourly and {item_rows} item rollup rows in {time.perf_counter() - started:.1f}s.')
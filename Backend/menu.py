@@ -1,36 +1,50 @@
-from flask import Blueprint, jsonify, session, request
+from flask import Blueprint, Response, current_app, jsonify, session, request
 from models import db, MenuItem, Restaurant
-from flask_bcrypt import Bcrypt
+from menu_cache import get_menu_snapshot, bump_menu_version
+from serialization import Projection
 from sqlalchemy.exc import IntegrityError
+from decimal import Decimal, InvalidOperation
+import csv
+import io
 import logging
 
 menu_bp = Blueprint('menu', __name__, url_prefix='/api/menu')
-bcrypt = Bcrypt()
+
+MENU_FIELDS = Projection((name, name) for name in (
+    'id', 'name', 'description', 'price', 'category', 'image_url', 'is_available'
+))
 
 @menu_bp.route('/', methods=['GET'])
 def get_menu_items():
+    """The restaurant's menu; ``?fields=id,name,price`` returns only those fields."""
     restaurant_id = session.get('restaurant_id')
     if not restaurant_id:
         return jsonify({'error': 'Unauthorized access'}), 401
 
+    try:
+        names = MENU_FIELDS.parse_fields(request.args.get('fields'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
     restaurant = Restaurant.query.get(restaurant_id)
     if not restaurant:
         return jsonify({'error': 'Restaurant not found'}), 404
 
-    menu_items = MenuItem.query.filter_by(restaurant_id=restaurant.id).all()
-    items = [
-        {
-            'id': item.id,
-            'name': item.name,
-            'description': item.description,
-            'price': float(item.price),
-            'category': item.category,
-            'image_url': item.image_url,
-            'is_available': item.is_available
-        }
-        for item in menu_items
-    ]
-    return jsonify(items), 200
+    def load_items():
+        # Only the requested columns, encoded straight from the rows
+        items = MenuItem.__table__
+        rows = db.session.execute(
+            db.select(*MENU_FIELDS.columns(items, names)).where(items.c.restaurant_id == restaurant.id)
+        ).all()
+        return current_app.json.encode_rows(names, rows)
+
+    # Serve the pre-serialized snapshot; answers If-None-Match with a 304
+    etag, body = get_menu_snapshot(restaurant, load_items, names if names != MENU_FIELDS.default else None)
+    response = Response(body, status=200, mimetype='application/json')
+    response.set_etag(etag)
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
 
 @menu_bp.route('/', methods=['POST'])
 def add_menu_item():
@@ -40,13 +54,12 @@ def add_menu_item():
         return jsonify({'error': 'Unauthorized access'}), 401
 
     data = request.get_json()
-    logging.info(f"Received POST request to /api/menu with data: {data}")
 
     # Validate required fields
     required_fields = ['name', 'description', 'price', 'category']
     for field in required_fields:
         if field not in data:
-            logging.warning(f"Missing field: {field}")
+            logging.warning('Missing field: %s', field)
             return jsonify({'error': f"'{field}' is required."}), 400
 
     try:
@@ -58,7 +71,7 @@ def add_menu_item():
         image_url = data.get('image_url', '')
         is_available = bool(data.get('is_available', True))
 
-        logging.info(f"Validated data: name={name}, description={description}, price={price}, category={category}")
+        logging.debug('Validated menu item: name=%s, price=%s, category=%s', name, price, category)
 
         # Create a new MenuItem instance
         new_item = MenuItem(
@@ -73,6 +86,7 @@ def add_menu_item():
 
         # Add to the database
         db.session.add(new_item)
+        bump_menu_version(restaurant_id)
         db.session.commit()
 
         item_data = {
@@ -88,15 +102,15 @@ def add_menu_item():
         return jsonify(item_data), 201
 
     except (ValueError, TypeError) as e:
-        logging.error(f"Data validation error: {str(e)}")
+        logging.error('Data validation error: %s', e)
         return jsonify({'error': 'Invalid data format.'}), 400
     except IntegrityError as e:
         db.session.rollback()
-        logging.error(f"Database integrity error: {str(e)}")
+        logging.error('Database integrity error: %s', e)
         return jsonify({'error': 'Database integrity error.'}), 500
     except Exception as e:
         db.session.rollback()
-        logging.error(f"Unexpected error: {str(e)}")
+        logging.error('Unexpected error: %s', e)
         return jsonify({'error': f'An unexpected error occurred: {str(e)}'}), 500
 
 
@@ -110,17 +124,16 @@ def update_menu_item(item_id):
 
     menu_item = MenuItem.query.filter_by(id=item_id, restaurant_id=restaurant_id).first()
     if not menu_item:
-        logging.warning(f"Menu item not found: id={item_id}")
+        logging.warning('Menu item not found: id=%s', item_id)
         return jsonify({'error': 'Menu item not found'}), 404
 
     data = request.get_json()
-    logging.info(f"Received PUT request to /api/menu/{item_id} with data: {data}")
 
     # Validate required fields
     required_fields = ['name', 'description', 'price', 'category']
     for field in required_fields:
         if field not in data:
-            logging.warning(f"Missing field: {field}")
+            logging.warning('Missing field: %s', field)
             return jsonify({'error': f"'{field}' is required."}), 400
 
     try:
@@ -132,6 +145,7 @@ def update_menu_item(item_id):
         menu_item.image_url = data.get('image_url', menu_item.image_url)
         menu_item.is_available = bool(data.get('is_available', menu_item.is_available))
 
+        bump_menu_version(restaurant_id)
         db.session.commit()
 
         item_data = {
@@ -147,15 +161,15 @@ def update_menu_item(item_id):
         return jsonify(item_data), 200
 
     except (ValueError, TypeError) as e:
-        logging.error(f"Data validation error: {str(e)}")
+        logging.error('Data validation error: %s', e)
         return jsonify({'error': 'Invalid data format.'}), 400
     except IntegrityError as e:
         db.session.rollback()
-        logging.error(f"Database integrity error: {str(e)}")
+        logging.error('Database integrity error: %s', e)
         return jsonify({'error': 'Database integrity error.'}), 500
     except Exception as e:
         db.session.rollback()
-        logging.error(f"Unexpected error: {str(e)}")
+        logging.error('Unexpected error: %s', e)
         return jsonify({'error': f'An unexpected error occurred: {str(e)}'}), 500
 
 
@@ -171,19 +185,167 @@ def delete_menu_item(item_id):
 
     menu_item = MenuItem.query.filter_by(id=item_id, restaurant_id=restaurant_id).first()
     if not menu_item:
-        logging.warning(f"Menu item not found: id={item_id}")
+        logging.warning('Menu item not found: id=%s', item_id)
         return jsonify({'error': 'Menu item not found'}), 404
 
     try:
         db.session.delete(menu_item)
+        bump_menu_version(restaurant_id)
         db.session.commit()
-        logging.info(f"Deleted menu item: id={item_id}")
+        logging.info('Deleted menu item: id=%s', item_id)
         return jsonify({'message': 'Menu item deleted successfully'}), 200
     except IntegrityError as e:
         db.session.rollback()
-        logging.error(f"Database integrity error: {str(e)}")
+        logging.error('Database integrity error: %s', e)
         return jsonify({'error': 'Database integrity error.'}), 500
     except Exception as e:
         db.session.rollback()
-        logging.error(f"Unexpected error: {str(e)}")
-        return jsonify({'error': f'An unexpected error occurred: {str(e)}'}), 500
\ No newline at end of file
+        logging.error('Unexpected error: %s', e)
+        return jsonify({'error': f'An unexpected error occurred: {str(e)}'}), 500
+
+
+MAX_BULK_ROWS = 5000
+BULK_REQUIRED_FIELDS = ['name', 'description', 'price', 'category']
+TRUE_VALUES = {'1', 'true', 'yes', 'y', 'on'}
+FALSE_VALUES = {'0', 'false', 'no', 'n', 'off', ''}
+
+
+def read_bulk_rows():
+    """
+    Read the bulk payload: a JSON array, a text/csv body or a CSV file upload ('file').
+    :return: list of row dicts
+    :raises ValueError: if the payload can't be parsed
+    """
+    if 'file' in request.files:
+        text = request.files['file'].read().decode('utf-8-sig')
+        return list(csv.DictReader(io.StringIO(text)))
+    if request.mimetype == 'text/csv':
+        return list(csv.DictReader(io.StringIO(request.get_data(as_text=True))))
+
+    data = request.get_json(silent=True)
+    if not isinstance(data, list):
+        raise ValueError('Expected a JSON array of menu items or a CSV upload.')
+    return data
+
+
+def parse_bool(value):
+    if isinstance(value, bool):
+        return value
+    value = str(value).strip().lower()
+    if value in TRUE_VALUES:
+        return True
+    if value in FALSE_VALUES:
+        return False
+    raise ValueError(f"invalid boolean '{value}'")
+
+
+def validate_bulk_row(row):
+    """
+    Validate and normalize one bulk row.
+    :return: (values, errors) where values is None if the row is invalid
+    """
+    if not isinstance(row, dict):
+        return None, ['row must be an object']
+
+    errors = [f"'{field}' is required." for field in BULK_REQUIRED_FIELDS if row.get(field) in (None, '')]
+    values = {}
+    try:
+        values['price'] = Decimal(str(row.get('price'))).quantize(Decimal('0.01'))
+        if values['price'] < 0:
+            errors.append("'price' must not be negative.")
+    except (InvalidOperation, ValueError):
+        if row.get('price') not in (None, ''):
+            errors.append("'price' must be a number.")
+    try:
+        values['is_available'] = parse_bool(row.get('is_available', True))
+    except ValueError as e:
+        errors.append(f"'is_available': {e}")
+    try:
+        values['id'] = int(row['id']) if row.get('id') not in (None, '') else None
+    except (TypeError, ValueError):
+        errors.append("'id' must be an integer.")
+
+    if errors:
+        return None, errors
+    values.update(
+        name=str(row['name']).strip(),
+        description=str(row['description']),
+        category=str(row['category']),
+        image_url=row.get('image_url') or ''
+    )
+    return values, []
+
+
+@menu_bp.route('/bulk', methods=['POST'])
+def bulk_upsert_menu_items():
+    """
+    Insert or update many menu items in one transaction.
+    Rows with an 'id' update that item; other rows update the item with the same
+    name or insert a new one. Nothing is written unless every row is valid.
+    """
+    restaurant_id = session.get('restaurant_id')
+    if not restaurant_id:
+        logging.warning('Unauthorized access: No restaurant_id in session')
+        return jsonify({'error': 'Unauthorized access'}), 401
+
+    try:
+        rows = read_bulk_rows()
+    except (ValueError, UnicodeDecodeError, csv.Error) as e:
+        return jsonify({'error': str(e)}), 400
+    if not rows:
+        return jsonify({'error': 'No menu items supplied.'}), 400
+    if len(rows) > MAX_BULK_ROWS:
+        return jsonify({'error': f'At most {MAX_BULK_ROWS} menu items per request.'}), 400
+
+    # One query for the restaurant's existing items, keyed both ways for matching
+    existing = db.session.query(MenuItem.id, MenuItem.name).filter_by(restaurant_id=restaurant_id).all()
+    existing_ids = {item_id for item_id, _ in existing}
+    ids_by_name = {name: item_id for item_id, name in existing}
+
+    inserts, updates, report, errors = [], [], [], []
+    seen = set()
+    for number, row in enumerate(rows, start=1):
+        values, row_errors = validate_bulk_row(row)
+        if values:
+            explicit_id = values.pop('id')
+            item_id = explicit_id or ids_by_name.get(values['name'])
+            key = item_id or values['name']
+            if explicit_id is not None and explicit_id not in existing_ids:
+                row_errors.append(f'Menu item {explicit_id} not found.')
+            elif key in seen:
+                row_errors.append('Duplicate menu item in upload.')
+            else:
+                seen.add(key)
+        if row_errors:
+            errors.append({'row': number, 'errors': row_errors})
+            continue
+
+        if item_id:
+            updates.append(dict(values, id=item_id))
+            report.append({'row': number, 'id': item_id, 'action': 'updated'})
+        else:
+            inserts.append(dict(values, restaurant_id=restaurant_id))
+            report.append({'row': number, 'action': 'inserted'})
+
+    if errors:
+        logging.warning('Bulk menu upload rejected: %d of %d rows invalid', len(errors), len(rows))
+        return jsonify({'error': 'Invalid rows, nothing was saved.', 'rows': errors}), 400
+
+    try:
+        # executemany-style statements, committed together
+        if inserts:
+            db.session.execute(db.insert(MenuItem), inserts)
+        if updates:
+            db.session.execute(db.update(MenuItem), updates)
+        bump_menu_version(restaurant_id)
+        db.session.commit()
+        logging.info('Bulk menu upload: %d inserted, %d updated', len(inserts), len(updates))
+        return jsonify({'inserted': len(inserts), 'updated': len(updates), 'rows': report}), 200
+    except IntegrityError as e:
+        db.session.rollback()
+        logging.error('Database integrity error: %s', str(e))
+        return jsonify({'error': 'Database integrity error.'}), 500
+    except Exception as e:
+        db.session.rollback()
+        logging.error('Unexpected error: %s', str(e))
+        return jsonify({'error': f'An unexpected error occurred: {str(e)}'}), 500
@@ -0,0 +1,82 @@
+from collections import OrderedDict
+from threading import Lock
+from models import db, Restaurant
+
+DEFAULT_MAX_ENTRIES = 1024
+
+
+class MenuSnapshotCache:
+    """
+    Bounded LRU of serialized menus, one entry per restaurant (and per sparse fieldset).
+    Each entry is tagged with the restaurant's menu_version, so a bump in any
+    worker process invalidates the snapshot everywhere on the next read.
+    """
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, restaurant_id, version):
+        """:return: (etag, body) for this version, or None if it isn't cached"""
+        with self._lock:
+            entry = self._entries.get(restaurant_id)
+            if entry is None or entry[0] != version:
+                return None
+            self._entries.move_to_end(restaurant_id)
+            return entry[1], entry[2]
+
+    def put(self, restaurant_id, version, etag, body):
+        with self._lock:
+            self._entries[restaurant_id] = (version, etag, body)
+            self._entries.move_to_end(restaurant_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+menu_cache = MenuSnapshotCache()
+
+
+def init_menu_cache(app):
+    menu_cache.max_entries = app.config.setdefault('MENU_CACHE_MAX_ENTRIES', DEFAULT_MAX_ENTRIES)
+
+
+def menu_etag(restaurant_id, version, fields=None):
+    if fields:
+        return f"menu-{restaurant_id}-{version}-{'.'.join(fields)}"
+    return f'menu-{restaurant_id}-{version}'
+
+
+def get_menu_snapshot(restaurant, load_items, fields=None):
+    """
+    Return (etag, body) for the restaurant's current menu, encoding it with
+    load_items() only when the cached snapshot is missing or stale.
+    :param load_items: returns the encoded JSON body as bytes
+    :param fields: sparse fieldset, cached separately from the full menu (None)
+    """
+    key = (restaurant.id, fields) if fields else restaurant.id
+    version = restaurant.menu_version
+    cached = menu_cache.get(key, version)
+    if cached:
+        return cached
+
+    etag = menu_etag(restaurant.id, version, fields)
+    body = load_items()
+    menu_cache.put(key, version, etag, body)
+    return etag, body
+
+
+def bump_menu_version(restaurant_id):
+    """Invalidate cached menus; runs inside the caller's transaction."""
+    db.session.execute(
+        db.update(Restaurant)
+        .where(Restaurant.id == restaurant_id)
+        .values(menu_version=Restaurant.menu_version + 1)
+    )
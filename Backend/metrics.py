@@ -0,0 +1,390 @@
+import json
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from threading import Lock
+from flask import Blueprint, Response, g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from passwords import hasher
+from audit_log import audit_log
+from images import image_store
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+DEFAULT_WRITE_INTERVAL = 1.0  # seconds between a worker's snapshots in METRICS_DIR
+GAUGES = ('pending',)  # stats that describe a live process; dropped once it exits
+
+metrics_bp = Blueprint('metrics', __name__)
+
+
+def format_labels(names, values):
+    return ','.join(f'{name}="{value}"' for name, value in zip(names, values))
+
+
+class Counter:
+    def __init__(self, name, help_text, label_names):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self._values = {}
+        self._lock = Lock()
+
+    def inc(self, labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def values(self):
+        with self._lock:
+            return dict(self._values)
+
+    def reset(self):
+        with self._lock:
+            self._values = {}
+
+    def render(self, values=None):
+        """:param values: labels -> value to render instead of this process's own"""
+        values = self.values() if values is None else values
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} counter']
+        for labels, value in sorted(values.items()):
+            lines.append(f'{self.name}{{{format_labels(self.label_names, labels)}}} {value}')
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help_text, label_names, buckets):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self.buckets = buckets
+        self._values = {}  # labels -> [per-bucket counts..., +Inf count, sum]
+        self._lock = Lock()
+
+    def observe(self, labels, value):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._values.get(labels)
+            if series is None:
+                series = self._values[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[index] += 1
+            series[-1] += value
+
+    def values(self):
+        with self._lock:
+            return {labels: list(series) for labels, series in self._values.items()}
+
+    def reset(self):
+        with self._lock:
+            self._values = {}
+
+    def render(self, values=None):
+        """:param values: labels -> series to render instead of this process's own"""
+        values = self.values() if values is None else values
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} histogram']
+        for labels, series in sorted(values.items()):
+            label_text = format_labels(self.label_names, labels)
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf',), series[:-1]):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{label_text},le="{bound}"}} {cumulative}')
+            lines.append(f'{self.name}_sum{{{label_text}}} {series[-1]}')
+            lines.append(f'{self.name}_count{{{label_text}}} {cumulative}')
+        return lines
+
+
+ROUTE_LABELS = ('endpoint', 'method')
+
+request_latency = Histogram(
+    'http_request_duration_seconds', 'Request latency by route.', ROUTE_LABELS, LATENCY_BUCKETS)
+request_status = Counter(
+    'http_requests_total', 'Responses by route and status code.', ROUTE_LABELS + ('status',))
+request_queries = Histogram(
+    'http_request_db_queries', 'SQL statements executed per request.', ROUTE_LABELS, QUERY_COUNT_BUCKETS)
+request_db_time = Histogram(
+    'http_request_db_seconds', 'Time spent in SQL statements per request.', ROUTE_LABELS, LATENCY_BUCKETS)
+
+REGISTRY = (request_latency, request_status, request_queries, request_db_time)
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _start_query_timer(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _record_query(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info['query_started'].pop()
+    if has_request_context() and 'db_queries' in g:
+        g.db_queries += 1
+        g.db_seconds += elapsed
+
+
+def render_password_stats(stats):
+    return [
+        '# HELP password_operations_total Password hashes, checks, rehashes and rejections.',
+        '# TYPE password_operations_total counter',
+    ] + [
+        f'password_operations_total{{operation="{name}"}} {stats[name]}'
+        for name in ('hashes', 'checks', 'rehashes', 'rejected')
+    ] + [
+        '# HELP password_queue_seconds_total Time password operations waited for a worker.',
+        '# TYPE password_queue_seconds_total counter',
+        f"password_queue_seconds_total {stats['queue_seconds_total']}",
+    ]
+
+
+def render_audit_log_stats(stats):
+    return [
+        '# HELP audit_log_records_total Audit log records by outcome; dropped means the queue was full.',
+        '# TYPE audit_log_records_total counter',
+    ] + [
+        f'audit_log_records_total{{outcome="{name}"}} {stats[name]}'
+        for name in ('queued', 'written', 'dropped', 'failed')
+    ] + [
+        '# HELP audit_log_pending Audit log records waiting to be written.',
+        '# TYPE audit_log_pending gauge',
+        f"audit_log_pending {stats['pending']}",
+    ]
+
+
+def render_image_stats(stats):
+    return [
+        '# HELP images_uploaded_total Image uploads; duplicates matched an image already stored.',
+        '# TYPE images_uploaded_total counter',
+    ] + [
+        f'images_uploaded_total{{outcome="{name}"}} {stats[name]}'
+        for name in ('uploads', 'duplicates')
+    ] + [
+        '# HELP image_thumbnail_jobs_total Finished thumbnail jobs by outcome.',
+        '# TYPE image_thumbnail_jobs_total counter',
+    ] + [
+        f'image_thumbnail_jobs_total{{outcome="{outcome}"}} {stats[name]}'
+        for outcome, name in (('ok', 'thumbnailed'), ('failed', 'failed'))
+    ] + [
+        '# HELP image_thumbnail_seconds_total Time thumbnail jobs spent in a worker.',
+        '# TYPE image_thumbnail_seconds_total counter',
+        f"image_thumbnail_seconds_total {stats['thumbnail_seconds_total']}",
+        '# HELP image_thumbnail_jobs_pending Thumbnail jobs queued or running.',
+        '# TYPE image_thumbnail_jobs_pending gauge',
+        f"image_thumbnail_jobs_pending {stats['pending']}",
+    ]
+
+
+def snapshot():
+    """This process's metrics as plain data: {'registry': {name: {labels: value}}, 'stats': {source: stats}}."""
+    return {
+        'registry': {metric.name: metric.values() for metric in REGISTRY},
+        'stats': {'passwords': hasher.stats(), 'audit_log': audit_log.stats(), 'images': image_store.stats()},
+    }
+
+
+def add_values(total, value):
+    if isinstance(value, list):  # Histogram series
+        return [a + b for a, b in zip(total, value)] if total is not None else list(value)
+    return (total or 0) + value
+
+
+def merge_snapshots(snapshots, gauges=True):
+    """
+    Sum snapshots of several processes: counters and histograms add up, and so
+    do the gauges, which count pending work per process.
+    :param gauges: False to leave out GAUGES, e.g. for processes that have exited
+    """
+    merged = {'registry': {metric.name: {} for metric in REGISTRY}, 'stats': {}}
+    for data in snapshots:
+        for name, values in data['registry'].items():
+            series = merged['registry'].setdefault(name, {})
+            for labels, value in values.items():
+                series[labels] = add_values(series.get(labels), value)
+        for source, stats in data['stats'].items():
+            totals = merged['stats'].setdefault(source, {})
+            for name, value in stats.items():
+                if gauges or name not in GAUGES:
+                    totals[name] = add_values(totals.get(name), value)
+    return merged
+
+
+def dump_snapshot(data):
+    return json.dumps({
+        'registry': {name: [[list(labels), value] for labels, value in values.items()]
+                     for name, values in data['registry'].items()},
+        'stats': data['stats'],
+    })
+
+
+def load_snapshot(text):
+    data = json.loads(text)
+    return {
+        'registry': {name: {tuple(labels): value for labels, value in values}
+                     for name, values in data['registry'].items()},
+        'stats': data['stats'],
+    }
+
+
+class ProcessMetricsFiles:
+    """
+    Shares metrics between gunicorn workers, in the spirit of prometheus_client's
+    multiprocess mode: each worker rewrites its own snapshot in METRICS_DIR every
+    METRICS_WRITE_INTERVAL seconds and /metrics sums every file in the directory,
+    so any worker answers for the whole server. When a worker exits the master
+    folds its counters into retired.json and drops its gauges.
+    Without METRICS_DIR every process reports only its own metrics.
+    """
+
+    RETIRED = 'retired.json'
+
+    def __init__(self):
+        self.directory = None
+        self.write_interval = DEFAULT_WRITE_INTERVAL
+        self._lock = Lock()
+        self._thread = None
+        self._stop = threading.Event()
+
+    def init_app(self, app):
+        app.config.setdefault('METRICS_DIR', None)
+        app.config.setdefault('METRICS_WRITE_INTERVAL', DEFAULT_WRITE_INTERVAL)
+        self.directory = app.config['METRICS_DIR']
+        self.write_interval = float(app.config['METRICS_WRITE_INTERVAL'])
+        if self.directory:
+            os.makedirs(self.directory, exist_ok=True)
+
+    def worker_file(self, pid):
+        return os.path.join(self.directory, f'worker-{pid}.json')
+
+    @contextmanager
+    def _locked(self, shared):
+        """Keeps readers from seeing a retired worker both in its own file and in retired.json."""
+        import fcntl  # gunicorn, and so several workers, only run on Unix
+        with open(os.path.join(self.directory, '.lock'), 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _write_file(self, path, data):
+        temp_path = f'{path}.{os.getpid()}.tmp'
+        with open(temp_path, 'w') as f:
+            f.write(dump_snapshot(data))
+        os.replace(temp_path, path)  # Readers see the old snapshot or the new one, never half of one
+
+    def _read_file(self, path):
+        try:
+            with open(path) as f:
+                return load_snapshot(f.read())
+        except FileNotFoundError:
+            return None
+
+    def start(self):
+        """Start this process's snapshot writer if METRICS_DIR is set and it isn't running."""
+        if not self.directory or (self._thread is not None and self._thread.is_alive()):
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stop = threading.Event()
+                self._thread = threading.Thread(target=self._run, args=(self._stop,), name='metrics-writer', daemon=True)
+                self._thread.start()
+
+    def _run(self, stop):
+        while not stop.wait(self.write_interval):
+            self.write()
+
+    def write(self):
+        """Replace this process's snapshot file with its current metrics."""
+        try:
+            self._write_file(self.worker_file(os.getpid()), snapshot())
+        except OSError:
+            logging.exception('Could not write metrics to %s', self.directory)
+
+    def collect(self):
+        """This process's live metrics plus the latest snapshots of every other worker, past and present."""
+        own_file = os.path.basename(self.worker_file(os.getpid()))
+        snapshots = [snapshot()]
+        with self._locked(shared=True):
+            for name in os.listdir(self.directory):
+                if name.endswith('.json') and name != own_file:
+                    data = self._read_file(os.path.join(self.directory, name))
+                    if data is not None:
+                        snapshots.append(data)
+        return merge_snapshots(snapshots)
+
+    def retire(self, pid):
+        """Master side of a worker exit: keep its counters in retired.json, drop its gauges and its file."""
+        if not self.directory:
+            return
+        path = self.worker_file(pid)
+        with self._locked(shared=False):
+            data = self._read_file(path)
+            if data is None:
+                return
+            retired_path = os.path.join(self.directory, self.RETIRED)
+            retired = self._read_file(retired_path)
+            self._write_file(retired_path, merge_snapshots([data] + ([retired] if retired else []), gauges=False))
+            os.remove(path)
+
+    def clear(self):
+        """Remove snapshots left by a previous server run; call before the first worker starts."""
+        if not self.directory:
+            return
+        for name in os.listdir(self.directory):
+            if name.endswith(('.json', '.tmp')):
+                os.remove(os.path.join(self.directory, name))
+
+    def stop(self):
+        """Stop the writer and write a last snapshot, so nothing counted since the previous one is lost."""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._stop.set()
+            thread.join()
+            self.write()
+
+    def after_fork(self):
+        """A forked worker counts from zero and starts its own writer on its first request."""
+        for metric in REGISTRY:
+            metric.reset()
+        self._lock = Lock()
+        self._thread = None
+
+
+metrics_files = ProcessMetricsFiles()
+
+
+@metrics_bp.route('/metrics', methods=['GET'])
+def get_metrics():
+    """Prometheus text exposition for the whole server with METRICS_DIR, otherwise for this process."""
+    data = metrics_files.collect() if metrics_files.directory else snapshot()
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render(data['registry'].get(metric.name, {})))
+    lines.extend(render_password_stats(data['stats']['passwords']))
+    lines.extend(render_audit_log_stats(data['stats']['audit_log']))
+    lines.extend(render_image_stats(data['stats']['images']))
+    return Response('\n'.join(lines) + '\n', mimetype='text/plain; version=0.0.4')
+
+
+def init_metrics(app):
+    metrics_files.init_app(app)
+
+    @app.before_request
+    def start_request_metrics():
+        metrics_files.start()
+        g.metrics_started = time.perf_counter()
+        g.db_queries = 0
+        g.db_seconds = 0.0
+
+    @app.after_request
+    def record_request_metrics(response):
+        if 'metrics_started' not in g:
+            return response
+        labels = (request.endpoint or 'unmatched', request.method)
+        request_latency.observe(labels, time.perf_counter() - g.metrics_started)
+        request_status.inc(labels + (str(response.status_code),))
+        request_queries.observe(labels, g.db_queries)
+        request_db_time.observe(labels, g.db_seconds)
+        return response
+
+    app.register_blueprint(metrics_bp)
@@ -51,6 +51,9 @@ def get_metadata():
     return target_db.metadata
 
 
+SEARCH_OBJECTS = ('menu_items_fts', 'ix_menu_items_search')
+
+
 def run_migrations_offline():
     """Run migrations in 'offline' mode.
 
@@ -90,9 +93,16 @@ def run_migrations_online():
                 directives[:] = []
                 logger.info('No changes in schema detected.')
 
+    # The menu search index (FTS5 tables or a GIN expression index) is created with
+    # raw SQL in its migration; keep autogenerate from proposing to drop it
+    def include_object(object, name, type_, reflected, compare_to):
+        return not (reflected and compare_to is None and (name or '').startswith(SEARCH_OBJECTS))
+
     conf_args = current_app.extensions['migrate'].configure_args
     if conf_args.get("process_revision_directives") is None:
         conf_args["process_revision_directives"] = process_revision_directives
+    if conf_args.get("include_object") is None:
+        conf_args["include_object"] = include_object
 
     connectable = get_engine()
 
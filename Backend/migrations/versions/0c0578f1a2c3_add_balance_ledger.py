@@ -0,0 +1,59 @@
+"""Add balance ledger and running restaurant balances
+
+Revision ID: 0c0578f1a2c3
+Revises: 7e0ad24fad5e
+Create Date: 2026-10-18 10:52:40.113902
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0c0578f1a2c3'
+down_revision = '7e0ad24fad5e'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('restaurant_balances',
+    sa.Column('restaurant_id', sa.Integer(), nullable=False),
+    sa.Column('balance', sa.Numeric(precision=10, scale=2), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['restaurant_id'], ['restaurants.id'], ),
+    sa.PrimaryKeyConstraint('restaurant_id')
+    )
+    op.create_table('balance_ledger',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('restaurant_id', sa.Integer(), nullable=False),
+    sa.Column('order_id', sa.Integer(), nullable=True),
+    sa.Column('amount', sa.Numeric(precision=10, scale=2), nullable=False),
+    sa.Column('from_status', sa.String(), nullable=True),
+    sa.Column('to_status', sa.String(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['order_id'], ['orders.id'], ),
+    sa.ForeignKeyConstraint(['restaurant_id'], ['restaurants.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('balance_ledger', schema=None) as batch_op:
+        batch_op.create_index('ix_balance_ledger_restaurant_id', ['restaurant_id', 'id'], unique=False)
+
+    # Open the ledger with one entry per order that already counts towards the balance
+    op.execute(
+        "INSERT INTO balance_ledger (restaurant_id, order_id, amount, from_status, to_status, created_at) "
+        "SELECT restaurant_id, id, total_amount - platform_fee, NULL, status, CURRENT_TIMESTAMP "
+        "FROM orders WHERE status = 'preparing'"
+    )
+    op.execute(
+        "INSERT INTO restaurant_balances (restaurant_id, balance, updated_at) "
+        "SELECT restaurant_id, SUM(amount), CURRENT_TIMESTAMP FROM balance_ledger GROUP BY restaurant_id"
+    )
+
+
+def downgrade():
+    with op.batch_alter_table('balance_ledger', schema=None) as batch_op:
+        batch_op.drop_index('ix_balance_ledger_restaurant_id')
+
+    op.drop_table('balance_ledger')
+    op.drop_table('restaurant_balances')
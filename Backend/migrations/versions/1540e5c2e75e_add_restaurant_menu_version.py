@@ -0,0 +1,26 @@
+"""Add restaurants.menu_version
+
+Revision ID: 1540e5c2e75e
+Revises: 0c0578f1a2c3
+Create Date: 2026-10-18 11:14:05.720318
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '1540e5c2e75e'
+down_revision = '0c0578f1a2c3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('restaurants', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('menu_version', sa.Integer(), server_default='0', nullable=False))
+
+
+def downgrade():
+    with op.batch_alter_table('restaurants', schema=None) as batch_op:
+        batch_op.drop_column('menu_version')
@@ -0,0 +1,35 @@
+"""Create action_logs where the install is missing it
+
+Revision ID: 2b6f8e1d4c93
+Revises: 9c1d7e3a5b40
+Create Date: 2026-10-18 12:02:37.118204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '2b6f8e1d4c93'
+down_revision = '9c1d7e3a5b40'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Older databases got the table outside of init.sql and the migrations;
+    # new installs never had it, so every audit record failed to insert
+    if sa.inspect(op.get_bind()).has_table('action_logs'):
+        return
+    op.create_table('action_logs',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('action', sa.String(), nullable=False),
+    sa.Column('description', sa.String(), nullable=True),
+    sa.Column('timestamp', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+
+
+def downgrade():
+    # Not dropped: on older databases the table predates this migration
+    pass
@@ -0,0 +1,60 @@
+"""Add indexes for hot lookup paths
+
+Revision ID: 7e0ad24fad5e
+Revises: 7af4e43028cd
+Create Date: 2026-10-18 10:30:12.418305
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7e0ad24fad5e'
+down_revision = '7af4e43028cd'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('restaurants', schema=None) as batch_op:
+        batch_op.create_index('ix_restaurants_username', ['username'], unique=True)
+
+    with op.batch_alter_table('customers', schema=None) as batch_op:
+        batch_op.create_index('ix_customers_username', ['username'], unique=True)
+
+    with op.batch_alter_table('menu_items', schema=None) as batch_op:
+        batch_op.create_index('ix_menu_items_restaurant_id', ['restaurant_id'], unique=False)
+
+    with op.batch_alter_table('delivery_areas', schema=None) as batch_op:
+        batch_op.create_index('ix_delivery_areas_postal_code', ['postal_code', 'restaurant_id'], unique=False)
+
+    with op.batch_alter_table('orders', schema=None) as batch_op:
+        batch_op.create_index('ix_orders_restaurant_created', ['restaurant_id', 'created_at', 'id'], unique=False)
+        batch_op.create_index('ix_orders_restaurant_status', ['restaurant_id', 'status'], unique=False)
+        batch_op.create_index('ix_orders_status_created', ['status', 'created_at'], unique=False)
+
+    with op.batch_alter_table('order_items', schema=None) as batch_op:
+        batch_op.create_index('ix_order_items_order_id', ['order_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('order_items', schema=None) as batch_op:
+        batch_op.drop_index('ix_order_items_order_id')
+
+    with op.batch_alter_table('orders', schema=None) as batch_op:
+        batch_op.drop_index('ix_orders_status_created')
+        batch_op.drop_index('ix_orders_restaurant_status')
+        batch_op.drop_index('ix_orders_restaurant_created')
+
+    with op.batch_alter_table('delivery_areas', schema=None) as batch_op:
+        batch_op.drop_index('ix_delivery_areas_postal_code')
+
+    with op.batch_alter_table('menu_items', schema=None) as batch_op:
+        batch_op.drop_index('ix_menu_items_restaurant_id')
+
+    with op.batch_alter_table('customers', schema=None) as batch_op:
+        batch_op.drop_index('ix_customers_username')
+
+    with op.batch_alter_table('restaurants', schema=None) as batch_op:
+        batch_op.drop_index('ix_restaurants_username')
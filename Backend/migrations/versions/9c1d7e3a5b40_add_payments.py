@@ -0,0 +1,52 @@
+"""Add payments for checkout charges and keep earned money in the ledger
+
+Revision ID: 9c1d7e3a5b40
+Revises: f41c8e2d9a63
+Create Date: 2026-10-19 09:14:52.604117
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9c1d7e3a5b40'
+down_revision = 'f41c8e2d9a63'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('payments',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('order_id', sa.Integer(), nullable=False),
+    sa.Column('customer_id', sa.Integer(), nullable=False),
+    sa.Column('restaurant_id', sa.Integer(), nullable=False),
+    sa.Column('total_amount', sa.Numeric(precision=10, scale=2), nullable=False),
+    sa.Column('platform_fee', sa.Numeric(precision=10, scale=2), nullable=False),
+    sa.Column('restaurant_amount', sa.Numeric(precision=10, scale=2), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('refunded_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['customer_id'], ['customers.id'], ),
+    sa.ForeignKeyConstraint(['restaurant_id'], ['restaurants.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('payments', schema=None) as batch_op:
+        batch_op.create_index('ix_payments_order_id', ['order_id'], unique=True)
+
+    # The ledger used to hold the value of orders in preparation; it now holds what
+    # checkout paid the restaurants. No existing order was paid that way, so close
+    # the old totals with one adjustment entry each.
+    op.execute(
+        "INSERT INTO balance_ledger (restaurant_id, order_id, amount, from_status, to_status, created_at) "
+        "SELECT restaurant_id, NULL, -balance, NULL, 'adjustment', CURRENT_TIMESTAMP "
+        "FROM restaurant_balances WHERE balance <> 0"
+    )
+    op.execute("UPDATE restaurant_balances SET balance = 0, updated_at = CURRENT_TIMESTAMP WHERE balance <> 0")
+
+
+def downgrade():
+    with op.batch_alter_table('payments', schema=None) as batch_op:
+        batch_op.drop_index('ix_payments_order_id')
+
+    op.drop_table('payments')
@@ -0,0 +1,76 @@
+"""Add orders_archive and order_items_archive for old finished orders
+
+Revision ID: d62f0a8b15e3
+Revises: b3d91c4e07a2
+Create Date: 2026-10-18 13:05:37.520914
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd62f0a8b15e3'
+down_revision = 'b3d91c4e07a2'
+branch_labels = None
+depends_on = None
+
+
+def ledger_order_foreign_keys():
+    inspector = sa.inspect(op.get_bind())
+    return [fk['name'] for fk in inspector.get_foreign_keys('balance_ledger')
+            if fk['referred_table'] == 'orders' and fk['name']]
+
+
+def upgrade():
+    op.create_table('orders_archive',
+    sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('customer_id', sa.Integer(), nullable=False),
+    sa.Column('restaurant_id', sa.Integer(), nullable=False),
+    sa.Column('status', sa.String(), nullable=False),
+    sa.Column('total_amount', sa.Numeric(precision=10, scale=2), nullable=False),
+    sa.Column('platform_fee', sa.Numeric(precision=10, scale=2), nullable=False),
+    sa.Column('restaurant_amount', sa.Numeric(precision=10, scale=2), nullable=False),
+    sa.Column('notes', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.Column('archived_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['customer_id'], ['customers.id'], ),
+    sa.ForeignKeyConstraint(['restaurant_id'], ['restaurants.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('orders_archive', schema=None) as batch_op:
+        batch_op.create_index('ix_orders_archive_restaurant_created', ['restaurant_id', 'created_at', 'id'], unique=False)
+
+    op.create_table('order_items_archive',
+    sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('order_id', sa.Integer(), nullable=False),
+    sa.Column('menu_item_id', sa.Integer(), nullable=False),
+    sa.Column('quantity', sa.Integer(), nullable=False),
+    sa.Column('price_at_order', sa.Numeric(precision=10, scale=2), nullable=False),
+    sa.ForeignKeyConstraint(['menu_item_id'], ['menu_items.id'], ),
+    sa.ForeignKeyConstraint(['order_id'], ['orders_archive.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('order_items_archive', schema=None) as batch_op:
+        batch_op.create_index('ix_order_items_archive_order_id', ['order_id'], unique=False)
+
+    # Ledger entries outlive the hot row of their order. SQLite does not enforce
+    # foreign keys here, so only the other backends need the constraint dropped.
+    if op.get_bind().dialect.name != 'sqlite':
+        for name in ledger_order_foreign_keys():
+            op.drop_constraint(name, 'balance_ledger', type_='foreignkey')
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'sqlite':
+        op.create_foreign_key('balance_ledger_order_id_fkey', 'balance_ledger', 'orders', ['order_id'], ['id'])
+
+    with op.batch_alter_table('order_items_archive', schema=None) as batch_op:
+        batch_op.drop_index('ix_order_items_archive_order_id')
+
+    op.drop_table('order_items_archive')
+    with op.batch_alter_table('orders_archive', schema=None) as batch_op:
+        batch_op.drop_index('ix_orders_archive_restaurant_created')
+
+    op.drop_table('orders_archive')
@@ -0,0 +1,45 @@
+"""Add sales_hourly and item_sales_daily rollups
+
+Revision ID: e7a4c19b5d20
+Revises: d62f0a8b15e3
+Create Date: 2026-10-18 14:10:52.604817
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e7a4c19b5d20'
+down_revision = 'd62f0a8b15e3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Existing history is loaded with `flask backfill-analytics`
+    op.create_table('sales_hourly',
+    sa.Column('restaurant_id', sa.Integer(), nullable=False),
+    sa.Column('hour', sa.DateTime(), nullable=False),
+    sa.Column('orders_completed', sa.Integer(), nullable=False),
+    sa.Column('orders_cancelled', sa.Integer(), nullable=False),
+    sa.Column('revenue', sa.Numeric(precision=12, scale=2), nullable=False),
+    sa.Column('payout', sa.Numeric(precision=12, scale=2), nullable=False),
+    sa.ForeignKeyConstraint(['restaurant_id'], ['restaurants.id'], ),
+    sa.PrimaryKeyConstraint('restaurant_id', 'hour')
+    )
+    op.create_table('item_sales_daily',
+    sa.Column('restaurant_id', sa.Integer(), nullable=False),
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('menu_item_id', sa.Integer(), nullable=False),
+    sa.Column('quantity', sa.Integer(), nullable=False),
+    sa.Column('revenue', sa.Numeric(precision=12, scale=2), nullable=False),
+    sa.ForeignKeyConstraint(['menu_item_id'], ['menu_items.id'], ),
+    sa.ForeignKeyConstraint(['restaurant_id'], ['restaurants.id'], ),
+    sa.PrimaryKeyConstraint('restaurant_id', 'day', 'menu_item_id')
+    )
+
+
+def downgrade():
+    op.drop_table('item_sales_daily')
+    op.drop_table('sales_hourly')
@@ -0,0 +1,64 @@
+"""Add full-text search over menu items (FTS5 on SQLite, GIN on PostgreSQL)
+
+Revision ID: f41c8e2d9a63
+Revises: e7a4c19b5d20
+Create Date: 2026-10-18 15:02:18.339460
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f41c8e2d9a63'
+down_revision = 'e7a4c19b5d20'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute(
+            "CREATE INDEX ix_menu_items_search ON menu_items USING gin (("
+            "setweight(to_tsvector('simple'::regconfig, name), 'A') || "
+            "setweight(to_tsvector('simple'::regconfig, category), 'B') || "
+            "setweight(to_tsvector('simple'::regconfig, description), 'C')))"
+        )
+        return
+
+    # External-content FTS5 index; the triggers keep it in step with menu_items
+    op.execute(
+        "CREATE VIRTUAL TABLE menu_items_fts USING fts5("
+        "name, description, category, content='menu_items', content_rowid='id', "
+        "tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+    )
+    op.execute(
+        "CREATE TRIGGER menu_items_fts_ai AFTER INSERT ON menu_items BEGIN "
+        "INSERT INTO menu_items_fts(rowid, name, description, category) "
+        "VALUES (new.id, new.name, new.description, new.category); END"
+    )
+    op.execute(
+        "CREATE TRIGGER menu_items_fts_ad AFTER DELETE ON menu_items BEGIN "
+        "INSERT INTO menu_items_fts(menu_items_fts, rowid, name, description, category) "
+        "VALUES ('delete', old.id, old.name, old.description, old.category); END"
+    )
+    op.execute(
+        "CREATE TRIGGER menu_items_fts_au AFTER UPDATE OF name, description, category ON menu_items BEGIN "
+        "INSERT INTO menu_items_fts(menu_items_fts, rowid, name, description, category) "
+        "VALUES ('delete', old.id, old.name, old.description, old.category); "
+        "INSERT INTO menu_items_fts(rowid, name, description, category) "
+        "VALUES (new.id, new.name, new.description, new.category); END"
+    )
+    # Index the menu items that already exist
+    op.execute("INSERT INTO menu_items_fts(menu_items_fts) VALUES ('rebuild')")
+
+
+def downgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute("DROP INDEX ix_menu_items_search")
+        return
+
+    op.execute("DROP TRIGGER menu_items_fts_au")
+    op.execute("DROP TRIGGER menu_items_fts_ad")
+    op.execute("DROP TRIGGER menu_items_fts_ai")
+    op.execute("DROP TABLE menu_items_fts")
@@ -1,8 +1,16 @@
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy.dialects import sqlite
 from datetime import datetime
 
 db = SQLAlchemy()
 
+# SQLite's CURRENT_TIMESTAMP has second precision, so bind values the same way
+# to keep (created_at, id) cursor comparisons consistent with server defaults
+Timestamp = db.DateTime().with_variant(
+    sqlite.DATETIME(storage_format='%(year)04d-%(month)02d-%(day)02d %(hour)02d:%(minute)02d:%(second)02d'),
+    'sqlite'
+)
+
 #saving the action logs for restaurant registration
 class ActionLog(db.Model):
     __tablename__ = 'action_logs'
@@ -14,6 +22,9 @@ class ActionLog(db.Model):
 
 class Restaurant(db.Model):
     __tablename__ = 'restaurants'  # Explicitly match the table name in init.sql
+    __table_args__ = (
+        db.Index('ix_restaurants_username', 'username', unique=True),  # login lookups
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String, nullable=False)
@@ -23,10 +34,14 @@ class Restaurant(db.Model):
     description = db.Column(db.Text, nullable=True)
     image_url = db.Column(db.String, nullable=True)  # Matches `image_url` column
     password_hash = db.Column(db.String, nullable=False)
-    balance = db.Column(db.Numeric(10, 2), default=0.00)  # Matches DECIMAL(10,2)
+    balance = db.Column(db.Numeric(10, 2), default=0.00)  # Unused: the ledger (RestaurantBalance) is the restaurant's balance
+    menu_version = db.Column(db.Integer, nullable=False, default=0, server_default='0')  # Bumped on every menu change
 
 class MenuItem(db.Model):
     __tablename__ = 'menu_items'
+    __table_args__ = (
+        db.Index('ix_menu_items_restaurant_id', 'restaurant_id'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     restaurant_id = db.Column(db.Integer, db.ForeignKey('restaurants.id'), nullable=False)
@@ -48,6 +63,9 @@ class OpeningHour(db.Model):
 
 class DeliveryArea(db.Model):
     __tablename__ = 'delivery_areas'
+    __table_args__ = (
+        db.Index('ix_delivery_areas_postal_code', 'postal_code', 'restaurant_id'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     restaurant_id = db.Column(db.Integer, db.ForeignKey('restaurants.id'), nullable=False)
@@ -55,6 +73,9 @@ class DeliveryArea(db.Model):
 
 class Customer(db.Model):
     __tablename__ = 'customers'
+    __table_args__ = (
+        db.Index('ix_customers_username', 'username', unique=True),  # login lookups
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String, nullable=False)
@@ -65,8 +86,15 @@ class Customer(db.Model):
     password_hash = db.Column(db.String, nullable=False)
     balance = db.Column(db.Numeric(10, 2), default=100.00)
 
+    orders = db.relationship('Order', back_populates='customer', lazy='dynamic')
+
 class Order(db.Model):
     __tablename__ = 'orders'
+    __table_args__ = (
+        db.Index('ix_orders_restaurant_created', 'restaurant_id', 'created_at', 'id'),  # order feed cursor
+        db.Index('ix_orders_restaurant_status', 'restaurant_id', 'status'),  # balance and status filters
+        db.Index('ix_orders_status_created', 'status', 'created_at'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     customer_id = db.Column(db.Integer, db.ForeignKey('customers.id'), nullable=False)
@@ -76,11 +104,17 @@ class Order(db.Model):
     platform_fee = db.Column(db.Numeric(10, 2), nullable=False)
     restaurant_amount = db.Column(db.Numeric(10, 2), nullable=False)
     notes = db.Column(db.Text, nullable=True)
-    created_at = db.Column(db.DateTime, default=db.func.current_timestamp())
-    updated_at = db.Column(db.DateTime, default=db.func.current_timestamp(), onupdate=db.func.current_timestamp())
+    created_at = db.Column(Timestamp, default=db.func.current_timestamp())
+    updated_at = db.Column(Timestamp, default=db.func.current_timestamp(), onupdate=db.func.current_timestamp())
+
+    customer = db.relationship('Customer', back_populates='orders')
+    items = db.relationship('OrderItem', back_populates='order')
     
 class OrderItem(db.Model):
     __tablename__ = 'order_items'
+    __table_args__ = (
+        db.Index('ix_order_items_order_id', 'order_id'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     order_id = db.Column(db.Integer, db.ForeignKey('orders.id'), nullable=False)
@@ -88,8 +122,131 @@ class OrderItem(db.Model):
     quantity = db.Column(db.Integer, nullable=False)
     price_at_order = db.Column(db.Numeric(10, 2), nullable=False)
 
+    order = db.relationship('Order', back_populates='items')
+    menu_item = db.relationship('MenuItem')
+
 class Platform(db.Model):
     __tablename__ = 'platform'
 
     id = db.Column(db.Integer, primary_key=True)
-    balance = db.Column(db.Numeric(10, 2), default=0.00)
\ No newline at end of file
+    balance = db.Column(db.Numeric(10, 2), default=0.00)
+
+class ArchivedOrder(db.Model):
+    __tablename__ = 'orders_archive'  # Old completed/cancelled orders, moved here by `flask archive-orders`
+    __table_args__ = (
+        db.Index('ix_orders_archive_restaurant_created', 'restaurant_id', 'created_at', 'id'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)  # Keeps the id it had in orders
+    customer_id = db.Column(db.Integer, db.ForeignKey('customers.id'), nullable=False)
+    restaurant_id = db.Column(db.Integer, db.ForeignKey('restaurants.id'), nullable=False)
+    status = db.Column(db.String, nullable=False)
+    total_amount = db.Column(db.Numeric(10, 2), nullable=False)
+    platform_fee = db.Column(db.Numeric(10, 2), nullable=False)
+    restaurant_amount = db.Column(db.Numeric(10, 2), nullable=False)
+    notes = db.Column(db.Text, nullable=True)
+    created_at = db.Column(Timestamp)
+    updated_at = db.Column(Timestamp)
+    archived_at = db.Column(Timestamp, default=db.func.current_timestamp())
+
+    customer = db.relationship('Customer')
+    items = db.relationship('ArchivedOrderItem', back_populates='order')
+
+class ArchivedOrderItem(db.Model):
+    __tablename__ = 'order_items_archive'
+    __table_args__ = (
+        db.Index('ix_order_items_archive_order_id', 'order_id'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    order_id = db.Column(db.Integer, db.ForeignKey('orders_archive.id'), nullable=False)
+    menu_item_id = db.Column(db.Integer, db.ForeignKey('menu_items.id'), nullable=False)
+    quantity = db.Column(db.Integer, nullable=False)
+    price_at_order = db.Column(db.Numeric(10, 2), nullable=False)
+
+    order = db.relationship('ArchivedOrder', back_populates='items')
+    menu_item = db.relationship('MenuItem')
+
+class RestaurantBalance(db.Model):
+    __tablename__ = 'restaurant_balances'
+
+    restaurant_id = db.Column(db.Integer, db.ForeignKey('restaurants.id'), primary_key=True)
+    balance = db.Column(db.Numeric(10, 2), nullable=False, default=0.00)  # Running total of the ledger
+    updated_at = db.Column(Timestamp, default=db.func.current_timestamp(), onupdate=db.func.current_timestamp())
+
+class BalanceLedgerEntry(db.Model):
+    __tablename__ = 'balance_ledger'  # Append-only, one row per payment, refund or adjustment
+    __table_args__ = (
+        db.Index('ix_balance_ledger_restaurant_id', 'restaurant_id', 'id'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    restaurant_id = db.Column(db.Integer, db.ForeignKey('restaurants.id'), nullable=False)
+    order_id = db.Column(db.Integer, nullable=True)  # orders or orders_archive id; null for reconciliation adjustments
+    amount = db.Column(db.Numeric(10, 2), nullable=False)  # Signed change to the balance
+    from_status = db.Column(db.String, nullable=True)
+    to_status = db.Column(db.String, nullable=False)
+    created_at = db.Column(Timestamp, default=db.func.current_timestamp())
+
+class Payment(db.Model):
+    __tablename__ = 'payments'  # One row per order charged at checkout; cancelling refunds it once
+    __table_args__ = (
+        db.Index('ix_payments_order_id', 'order_id', unique=True),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    order_id = db.Column(db.Integer, nullable=False)  # orders or orders_archive id
+    customer_id = db.Column(db.Integer, db.ForeignKey('customers.id'), nullable=False)
+    restaurant_id = db.Column(db.Integer, db.ForeignKey('restaurants.id'), nullable=False)
+    total_amount = db.Column(db.Numeric(10, 2), nullable=False)  # Debited from the customer
+    platform_fee = db.Column(db.Numeric(10, 2), nullable=False)  # Paid to the platform
+    restaurant_amount = db.Column(db.Numeric(10, 2), nullable=False)  # Credited to the restaurant's ledger
+    created_at = db.Column(Timestamp, default=db.func.current_timestamp())
+    refunded_at = db.Column(Timestamp, nullable=True)
+
+class OrderEvent(db.Model):
+    __tablename__ = 'order_events'  # Feed for the SSE stream, pruned by `flask prune-order-events`
+    __table_args__ = (
+        db.Index('ix_order_events_restaurant_id', 'restaurant_id', 'id'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)  # Doubles as the SSE event id
+    restaurant_id = db.Column(db.Integer, db.ForeignKey('restaurants.id'), nullable=False)
+    order_id = db.Column(db.Integer, db.ForeignKey('orders.id'), nullable=False)
+    event_type = db.Column(db.String, nullable=False)  # "order-created" or "status-changed"
+    payload = db.Column(db.Text, nullable=False)  # JSON sent as the event data
+    created_at = db.Column(Timestamp, default=db.func.current_timestamp())
+
+class IdempotencyKey(db.Model):
+    __tablename__ = 'idempotency_keys'  # Stored checkout responses, pruned by `flask prune-idempotency-keys`
+    __table_args__ = (
+        db.Index('ix_idempotency_keys_customer_key', 'customer_id', 'key', unique=True),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    customer_id = db.Column(db.Integer, db.ForeignKey('customers.id'), nullable=False)
+    key = db.Column(db.String, nullable=False)  # Client-chosen Idempotency-Key header
+    request_hash = db.Column(db.String(64), nullable=False)  # Rejects reuse of a key for a different cart
+    order_id = db.Column(db.Integer, db.ForeignKey('orders.id'), nullable=True)
+    response_code = db.Column(db.Integer, nullable=True)
+    response_body = db.Column(db.Text, nullable=True)
+    created_at = db.Column(Timestamp, default=db.func.current_timestamp())
+
+class SalesHourly(db.Model):
+    __tablename__ = 'sales_hourly'  # Finished orders per restaurant and hour placed (UTC), kept by analytics.py
+
+    restaurant_id = db.Column(db.Integer, db.ForeignKey('restaurants.id'), primary_key=True)
+    hour = db.Column(Timestamp, primary_key=True)  # Start of the hour
+    orders_completed = db.Column(db.Integer, nullable=False, default=0)
+    orders_cancelled = db.Column(db.Integer, nullable=False, default=0)
+    revenue = db.Column(db.Numeric(12, 2), nullable=False, default=0)  # total_amount of completed orders
+    payout = db.Column(db.Numeric(12, 2), nullable=False, default=0)  # restaurant_amount of completed orders
+
+class ItemSalesDaily(db.Model):
+    __tablename__ = 'item_sales_daily'  # Completed order lines per restaurant, day placed (UTC) and menu item
+
+    restaurant_id = db.Column(db.Integer, db.ForeignKey('restaurants.id'), primary_key=True)
+    day = db.Column(db.Date, primary_key=True)
+    menu_item_id = db.Column(db.Integer, db.ForeignKey('menu_items.id'), primary_key=True)
+    quantity = db.Column(db.Integer, nullable=False, default=0)
+    revenue = db.Column(db.Numeric(12, 2), nullable=False, default=0)  # quantity * price_at_order
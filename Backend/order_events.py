@@ -0,0 +1,136 @@
+import json
+import time
+from threading import BoundedSemaphore, Condition
+from sqlalchemy import event
+from models import db, OrderEvent
+
+ORDER_CREATED = 'order-created'
+STATUS_CHANGED = 'status-changed'
+
+DEFAULT_POLL_INTERVAL = 1.0  # seconds; picks up events committed by other processes
+DEFAULT_HEARTBEAT_INTERVAL = 15.0  # seconds between keepalive comments
+DEFAULT_STREAM_MAX_SECONDS = 300  # then the stream ends and the browser reconnects after RETRY_MS
+DEFAULT_MAX_STREAMS = 4  # open streams per process; keep it below gunicorn's threads
+RETRY_MS = 2000
+MAX_EVENTS_PER_POLL = 100
+
+# Wakes streams in this process as soon as an event is committed
+_new_events = Condition()
+# Every open stream holds a server thread, so only some of them may be streams
+_stream_slots = BoundedSemaphore(DEFAULT_MAX_STREAMS)
+
+
+def init_order_events(app):
+    global _stream_slots
+    app.config.setdefault('ORDER_STREAM_POLL_INTERVAL', DEFAULT_POLL_INTERVAL)
+    app.config.setdefault('ORDER_STREAM_HEARTBEAT_INTERVAL', DEFAULT_HEARTBEAT_INTERVAL)
+    app.config.setdefault('ORDER_STREAM_MAX_SECONDS', DEFAULT_STREAM_MAX_SECONDS)
+    _stream_slots = BoundedSemaphore(app.config.setdefault('ORDER_STREAM_MAX_OPEN', DEFAULT_MAX_STREAMS))
+
+
+def open_stream():
+    """:return: a function that gives the slot back, or None if every stream slot is taken"""
+    slots = _stream_slots
+    if not slots.acquire(blocking=False):
+        return None
+    return slots.release
+
+
+def record(order, event_type, **data):
+    """Add an event for the order to the current session; it is published on commit."""
+    if order.id is None:
+        db.session.flush()
+    payload = dict(order_id=order.id, status=order.status, **data)
+    db.session.add(OrderEvent(
+        restaurant_id=order.restaurant_id,
+        order_id=order.id,
+        event_type=event_type,
+        payload=json.dumps(payload, separators=(',', ':'))
+    ))
+    db.session.info['order_events_pending'] = True
+
+
+def record_many(restaurant_id, events):
+    """
+    Insert several events with one executemany; published on commit like record().
+    :param events: list of (order_id, event_type, payload dict) tuples
+    """
+    if not events:
+        return
+    db.session.execute(db.insert(OrderEvent), [
+        {
+            'restaurant_id': restaurant_id,
+            'order_id': order_id,
+            'event_type': event_type,
+            'payload': json.dumps(payload, separators=(',', ':'))
+        }
+        for order_id, event_type, payload in events
+    ])
+    db.session.info['order_events_pending'] = True
+
+
+def record_order_created(order):
+    record(order, ORDER_CREATED, total_amount=float(order.total_amount))
+
+
+@event.listens_for(db.session, 'after_commit')
+def _notify_streams(session):
+    if session.info.pop('order_events_pending', False):
+        with _new_events:
+            _new_events.notify_all()
+
+
+@event.listens_for(db.session, 'after_rollback')
+def _discard_pending(session):
+    session.info.pop('order_events_pending', None)
+
+
+def latest_event_id(restaurant_id):
+    with db.engine.connect() as conn:
+        return conn.execute(
+            db.select(db.func.max(OrderEvent.id)).where(OrderEvent.restaurant_id == restaurant_id)
+        ).scalar() or 0
+
+
+def fetch_events(restaurant_id, after_id):
+    # Short-lived connection so an open stream never pins a transaction
+    with db.engine.connect() as conn:
+        return conn.execute(
+            db.select(OrderEvent.id, OrderEvent.event_type, OrderEvent.payload)
+            .where(OrderEvent.restaurant_id == restaurant_id, OrderEvent.id > after_id)
+            .order_by(OrderEvent.id)
+            .limit(MAX_EVENTS_PER_POLL)
+        ).all()
+
+
+def event_stream(app, restaurant_id, last_event_id):
+    """
+    Yield server-sent events for the restaurant after last_event_id for up to
+    ORDER_STREAM_MAX_SECONDS; the client then reconnects with Last-Event-ID.
+    Emits a keepalive comment whenever nothing was sent for the heartbeat interval.
+    """
+    poll_interval = app.config['ORDER_STREAM_POLL_INTERVAL']
+    heartbeat_interval = app.config['ORDER_STREAM_HEARTBEAT_INTERVAL']
+    deadline = time.monotonic() + app.config['ORDER_STREAM_MAX_SECONDS']
+
+    yield f'retry: {RETRY_MS}\n\n'
+    last_sent = time.monotonic()
+    while True:
+        with app.app_context():
+            rows = fetch_events(restaurant_id, last_event_id)
+        for row in rows:
+            last_event_id = row.id
+            yield f'id: {row.id}\nevent: {row.event_type}\ndata: {row.payload}\n\n'
+        if rows:
+            last_sent = time.monotonic()
+            if len(rows) == MAX_EVENTS_PER_POLL:
+                continue
+        elif time.monotonic() - last_sent >= heartbeat_interval:
+            yield ': keepalive\n\n'
+            last_sent = time.monotonic()
+
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return
+        with _new_events:
+            _new_events.wait(min(poll_interval, remaining))
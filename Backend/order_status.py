@@ -0,0 +1,92 @@
+from models import db, Order
+import analytics
+import order_events
+import payments
+
+# Allowed moves; completed and cancelled are final
+TRANSITIONS = {
+    'processing': ('preparing', 'cancelled'),
+    'preparing': ('completed', 'cancelled'),
+}
+
+UPDATED = 'updated'
+UNCHANGED = 'unchanged'  # Already in the requested status
+NOT_FOUND = 'not_found'  # Unknown id or another restaurant's order
+INVALID_TRANSITION = 'invalid_transition'
+CONFLICT = 'conflict'  # Changed by a concurrent request between our read and update
+
+
+def is_allowed(current, target):
+    return target in TRANSITIONS.get(current, ())
+
+
+def update_statuses(restaurant_id, order_ids, current, target):
+    """
+    Move the orders still in `current` to `target` with one UPDATE.
+    :return: ids of the orders that were updated
+    """
+    def statement(ids):
+        return (
+            db.update(Order)
+            .where(Order.id.in_(ids), Order.restaurant_id == restaurant_id, Order.status == current)
+            .values(status=target)
+            .execution_options(synchronize_session=False)
+        )
+
+    if db.engine.dialect.update_returning:
+        return set(db.session.execute(statement(order_ids).returning(Order.id)).scalars())
+
+    # No UPDATE ... RETURNING (SQLite < 3.35): one UPDATE per order, so each rowcount
+    # says whether this request moved it. Re-reading which orders are in `target`
+    # would also claim orders a concurrent request moved there after our read.
+    return {order_id for order_id in order_ids if db.session.execute(statement([order_id])).rowcount}
+
+
+def apply_status_changes(restaurant_id, requested):
+    """
+    Validate and apply status changes for one restaurant's orders, one UPDATE per
+    (current, target) pair, plus refunds for cancelled orders that checkout
+    charged, stream events and sales rollups.
+    Nothing is committed; the caller commits once.
+    :param requested: dict of order_id -> target status
+    :return: dict of order_id -> (result, status after the call)
+    """
+    rows = db.session.execute(
+        db.select(Order.id, Order.status, Order.total_amount, Order.restaurant_amount, Order.created_at)
+        .where(Order.id.in_(requested), Order.restaurant_id == restaurant_id)
+    ).all()
+    found = {row.id: row for row in rows}
+
+    results = {}
+    groups = {}
+    for order_id, target in requested.items():
+        row = found.get(order_id)
+        if row is None:
+            results[order_id] = (NOT_FOUND, None)
+        elif row.status == target:
+            results[order_id] = (UNCHANGED, row.status)
+        elif not is_allowed(row.status, target):
+            results[order_id] = (INVALID_TRANSITION, row.status)
+        else:
+            groups.setdefault((row.status, target), []).append(order_id)
+
+    cancelled, events, finished = {}, [], []
+    for (current, target), order_ids in groups.items():
+        updated = update_statuses(restaurant_id, order_ids, current, target)
+        for order_id in order_ids:
+            if order_id not in updated:
+                results[order_id] = (CONFLICT, None)
+                continue
+            results[order_id] = (UPDATED, target)
+            row = found[order_id]
+            if target == 'cancelled':
+                cancelled[order_id] = current
+            events.append((order_id, order_events.STATUS_CHANGED,
+                           {'order_id': order_id, 'status': target, 'previous_status': current}))
+            if target not in TRANSITIONS:
+                finished.append((order_id, target, row.created_at, row.total_amount, row.restaurant_amount))
+
+    payments.refund(restaurant_id, cancelled)
+    order_events.record_many(restaurant_id, events)
+    analytics.record_finished_orders(restaurant_id, finished)
+    return results
@@ -0,0 +1,144 @@
+import bcrypt
+import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from threading import BoundedSemaphore, Lock
+
+DEFAULT_LOG_ROUNDS = 12
+DEFAULT_QUEUE_TIMEOUT = 2.0  # seconds a request may wait for a free slot
+# Pool workers are started from a clean server process: forking a gunicorn gthread
+# worker that already runs threads can leave a lock held forever in the child
+POOL_CONTEXT = multiprocessing.get_context(
+    'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+)
+
+
+class PasswordServiceBusy(Exception):
+    """Raised when every hashing slot stays taken for longer than the queue timeout."""
+
+
+def _hash_password(password, rounds):
+    started = time.time()
+    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds)).decode('utf-8'), started
+
+
+def _check_password(password_hash, password):
+    started = time.time()
+    return bcrypt.checkpw(password.encode('utf-8'), password_hash.encode('utf-8')), started
+
+
+class PasswordHasher:
+    """
+    Runs bcrypt in a shared process pool so hashing never blocks request threads
+    for CPU. At most max_pending calls are in flight; callers beyond that wait up
+    to queue_timeout and then get PasswordServiceBusy.
+    """
+
+    def __init__(self):
+        self.rounds = DEFAULT_LOG_ROUNDS
+        self.workers = os.cpu_count() or 1
+        self.queue_timeout = DEFAULT_QUEUE_TIMEOUT
+        self._slots = BoundedSemaphore(self.workers * 2)
+        self._executor = None
+        self._lock = Lock()
+        self._stats = {
+            'hashes': 0,
+            'checks': 0,
+            'rehashes': 0,
+            'rejected': 0,
+            'queue_seconds_total': 0.0,
+            'queue_seconds_max': 0.0,
+        }
+
+    def init_app(self, app):
+        self.rounds = app.config.setdefault('BCRYPT_LOG_ROUNDS', DEFAULT_LOG_ROUNDS)
+        self.workers = app.config.setdefault('BCRYPT_WORKERS', os.cpu_count() or 1)  # 0 runs bcrypt inline
+        self.queue_timeout = app.config.setdefault('BCRYPT_QUEUE_TIMEOUT', DEFAULT_QUEUE_TIMEOUT)
+        max_pending = app.config.setdefault('BCRYPT_MAX_PENDING', max(self.workers, 1) * 2)
+        self._slots = BoundedSemaphore(max_pending)
+        self.shutdown()
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=POOL_CONTEXT)
+            return self._executor
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+    def after_fork(self):
+        """In a forked worker: forget the parent's pool without touching it; its pipes belong to the parent."""
+        self._lock = Lock()
+        self._executor = None
+
+    def _run(self, func, *args):
+        if not self._slots.acquire(timeout=self.queue_timeout):
+            with self._lock:
+                self._stats['rejected'] += 1
+            raise PasswordServiceBusy('Too many concurrent password operations')
+        try:
+            submitted = time.time()
+            if not self.workers:
+                result, started = func(*args)
+            else:
+                try:
+                    result, started = self._get_executor().submit(func, *args).result()
+                except BrokenProcessPool:
+                    logging.warning('Password worker pool broke, restarting it')
+                    self.shutdown()
+                    result, started = self._get_executor().submit(func, *args).result()
+            queued = max(started - submitted, 0.0)
+            with self._lock:
+                self._stats['queue_seconds_total'] += queued
+                self._stats['queue_seconds_max'] = max(self._stats['queue_seconds_max'], queued)
+            return result
+        finally:
+            self._slots.release()
+
+    def generate_password_hash(self, password):
+        """:return: bcrypt hash (str) at the configured cost"""
+        with self._lock:
+            self._stats['hashes'] += 1
+        return self._run(_hash_password, password, self.rounds)
+
+    def check_password_hash(self, password_hash, password):
+        with self._lock:
+            self._stats['checks'] += 1
+        return self._run(_check_password, password_hash, password)
+
+    def needs_rehash(self, password_hash):
+        """True if the hash was made with a different cost than the configured one."""
+        try:
+            return int(password_hash.split('$')[2]) != self.rounds
+        except (IndexError, ValueError):
+            return True
+
+    def rehash_if_needed(self, account, password):
+        """
+        Upgrade account.password_hash after a successful login.
+        :return: True if the hash changed; the caller commits
+        """
+        if not self.needs_rehash(account.password_hash):
+            return False
+        account.password_hash = self.generate_password_hash(password)
+        with self._lock:
+            self._stats['rehashes'] += 1
+        return True
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats)
+
+
+hasher = PasswordHasher()
+
+
+def init_passwords(app):
+    hasher.init_app(app)
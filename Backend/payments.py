@@ -0,0 +1,81 @@
+from models import db, Customer, Payment, Platform
+import ledger
+
+PLATFORM_ID = 1  # The platform table holds a single row
+
+
+def charge(order):
+    """
+    Charge a new order with conditional, relative UPDATEs so concurrent checkouts
+    never read-modify-write a balance: debit the customer, pay the platform fee,
+    credit the restaurant's share to its ledger and record the payment that a
+    cancellation refunds. Rows are always locked in the order customer, platform,
+    restaurant balance.
+    :param order: the flushed Order
+    :return: False if the customer can't cover the total; nothing has been changed then
+    """
+    debited = db.session.execute(
+        db.update(Customer)
+        .where(Customer.id == order.customer_id, Customer.balance >= order.total_amount)
+        .values(balance=db.func.round(Customer.balance - order.total_amount, 2))
+    ).rowcount
+    if not debited:
+        return False
+    db.session.execute(
+        db.update(Platform)
+        .where(Platform.id == PLATFORM_ID)
+        .values(balance=db.func.round(Platform.balance + order.platform_fee, 2))
+    )
+    db.session.add(Payment(
+        order_id=order.id,
+        customer_id=order.customer_id,
+        restaurant_id=order.restaurant_id,
+        total_amount=order.total_amount,
+        platform_fee=order.platform_fee,
+        restaurant_amount=order.restaurant_amount
+    ))
+    ledger.record_entries(order.restaurant_id, [(order.id, order.restaurant_amount, None, order.status)])
+    return True
+
+
+def refund(restaurant_id, cancelled):
+    """
+    Undo charge for orders that were just cancelled, in charge's lock order.
+    Only orders with a payment that hasn't been refunded get money back: orders
+    from before checkout existed were never charged.
+    :param cancelled: dict of order_id -> status the order was cancelled from
+    :return: ids of the refunded orders
+    """
+    if not cancelled:
+        return set()
+    payments = db.session.execute(
+        db.select(Payment.id, Payment.order_id, Payment.customer_id, Payment.total_amount,
+                  Payment.platform_fee, Payment.restaurant_amount)
+        .where(Payment.order_id.in_(cancelled), Payment.restaurant_id == restaurant_id, Payment.refunded_at.is_(None))
+    ).all()
+    if not payments:
+        return set()
+
+    customers = Customer.__table__  # Core table: executemany with WHERE isn't an ORM bulk update
+    db.session.execute(
+        db.update(customers)
+        .where(customers.c.id == db.bindparam('customer_id'))
+        .values(balance=db.func.round(customers.c.balance + db.bindparam('total'), 2)),
+        [{'customer_id': payment.customer_id, 'total': payment.total_amount} for payment in payments]
+    )
+    db.session.execute(
+        db.update(Platform)
+        .where(Platform.id == PLATFORM_ID)
+        .values(balance=db.func.round(Platform.balance - sum(payment.platform_fee for payment in payments), 2))
+    )
+    db.session.execute(
+        db.update(Payment)
+        .where(Payment.id.in_([payment.id for payment in payments]))
+        .values(refunded_at=db.func.current_timestamp())
+        .execution_options(synchronize_session=False)
+    )
+    ledger.record_entries(restaurant_id, [
+        (payment.order_id, -payment.restaurant_amount, cancelled[payment.order_id], 'cancelled')
+        for payment in payments
+    ])
+    return {payment.order_id for payment in payments}
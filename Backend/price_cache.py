@@ -0,0 +1,64 @@
+import time
+from collections import OrderedDict
+from threading import Lock
+
+DEFAULT_TTL = 30.0  # seconds a restaurant's cached prices are trusted
+DEFAULT_MAX_ENTRIES = 1024
+DEFAULT_QUOTE_TTL = 600  # seconds a signed cart quote can be used at checkout
+
+
+class PriceCache:
+    """
+    Bounded LRU of menu prices that cart quotes have looked up, one entry per
+    restaurant. An entry is tagged with the restaurant's menu_version, so menu
+    changes made through the API take effect at once; the TTL also limits how
+    long a change made outside the API can go unnoticed.
+    """
+
+    def __init__(self, ttl=DEFAULT_TTL, max_entries=DEFAULT_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # restaurant_id -> (menu_version, expires_at, {menu_item_id: (price, available)})
+        self._lock = Lock()
+
+    def get(self, restaurant_id, version, item_ids):
+        """:return: {menu_item_id: (unit_price, is_available)} for the item_ids that are cached"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(restaurant_id)
+            if entry is None or entry[0] != version or entry[1] <= now:
+                return {}
+            self._entries.move_to_end(restaurant_id)
+            prices = entry[2]
+            return {item_id: prices[item_id] for item_id in item_ids if item_id in prices}
+
+    def put(self, restaurant_id, version, prices):
+        """Add prices to the restaurant's entry; a new version or an expired entry starts over."""
+        if not self.ttl:
+            return
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(restaurant_id)
+            if entry is None or entry[0] != version or entry[1] <= now:
+                entry = (version, now + self.ttl, {})
+                self._entries[restaurant_id] = entry
+            entry[2].update(prices)
+            self._entries.move_to_end(restaurant_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+price_cache = PriceCache()
+
+
+def init_price_cache(app):
+    price_cache.ttl = app.config.setdefault('CART_PRICE_CACHE_TTL', DEFAULT_TTL)  # 0 disables the cache
+    price_cache.max_entries = app.config.setdefault('CART_PRICE_CACHE_MAX_ENTRIES', DEFAULT_MAX_ENTRIES)
+    app.config.setdefault('CART_QUOTE_TTL', DEFAULT_QUOTE_TTL)
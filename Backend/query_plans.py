@@ -0,0 +1,164 @@
+import click
+from datetime import date, datetime
+from flask.cli import with_appcontext
+from sqlalchemy import event, select
+from sqlalchemy.orm import joinedload, selectinload
+from models import db, Restaurant, Customer, MenuItem, Order, ArchivedOrder
+from delivery_index import load_delivery_data
+from Res_orders import orders_statement, load_order_details
+from Res_analytics import hourly_statement, top_items_statement
+import ledger
+
+SAMPLE_CURSOR = (datetime(2024, 1, 1), 1)
+SAMPLE_RANGE = (date(2024, 1, 1), date(2024, 1, 31))
+
+
+def endpoint_queries():
+    """
+    The statements the endpoints build, keyed by a readable label. Where an
+    endpoint calls a statement builder the check calls the same builder; only
+    one-line lookups written inline in a view are repeated here.
+    """
+    return {
+        'restaurant_login.login': select(Restaurant).where(Restaurant.username == 'user'),
+        'customer_registration.login': select(Customer).where(Customer.username == 'user'),
+        'menu.get_menu_items': select(MenuItem).where(MenuItem.restaurant_id == 1),
+        # Without a status filter, or with a final status, these are unions with orders_archive
+        'Res_orders.get_orders': orders_statement(1, limit=50),
+        'Res_orders.get_orders (cursor)': orders_statement(1, after=SAMPLE_CURSOR, limit=50),
+        'Res_orders.get_orders (active statuses)': orders_statement(1, statuses=['processing', 'preparing'], limit=50),
+        'Res_orders.get_orders (final status, cursor)': orders_statement(
+            1, statuses=['preparing', 'completed'], after=SAMPLE_CURSOR, limit=50
+        ),
+        'Res_orders.get_orders (from/to, no limit)': orders_statement(
+            1, created_from=SAMPLE_CURSOR[0], created_to=datetime(2024, 2, 1)
+        ),
+        'Res_analytics.get_analytics (hours)': hourly_statement(1, *SAMPLE_RANGE),
+        'Res_analytics.get_analytics (items)': top_items_statement(1, *SAMPLE_RANGE, 10),
+    }
+
+
+def sample_orders():
+    """:return: (restaurant_id, up to three of its order ids) to run the order loaders with"""
+    row = db.session.execute(select(Order.restaurant_id).order_by(Order.id).limit(1)).first()
+    if row is None:
+        row = db.session.execute(select(ArchivedOrder.restaurant_id).order_by(ArchivedOrder.id).limit(1)).first()
+    restaurant_id = row.restaurant_id if row else 1
+    order_ids = list(db.session.execute(
+        select(Order.id).where(Order.restaurant_id == restaurant_id).order_by(Order.id).limit(3)
+    ).scalars())
+    return restaurant_id, order_ids
+
+
+def endpoint_calls():
+    """
+    Functions the endpoints call that run their own queries, keyed by label. They
+    are run for real and every query they send is checked. The id 0 never exists,
+    so the order loaders always go on to the archive as well.
+    """
+    restaurant_id, order_ids = sample_orders()
+
+    def refresh_delivery_index():
+        with db.engine.connect() as conn:
+            load_delivery_data(conn, [restaurant_id])
+
+    return {
+        'Res_balance.get_balance': lambda: ledger.get_balance(restaurant_id),
+        'Res_orders.get_order_details': lambda: load_order_details(restaurant_id, order_ids[:1] + [0], joinedload),
+        'Res_orders.get_orders_details': lambda: load_order_details(restaurant_id, order_ids + [0], selectinload),
+        'delivery_index refresh': refresh_delivery_index,
+    }
+
+
+def captured_queries(run):
+    """
+    Call run() in a fresh session and record the queries it sends.
+    :return: list of (sql, parameters); the session is rolled back afterwards
+    """
+    captured = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        captured.append((statement, parameters))
+
+    db.session.expunge_all()  # So lookups by primary key reach the database
+    event.listen(db.engine, 'before_cursor_execute', record)
+    try:
+        run()
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', record)
+        db.session.rollback()
+    return captured
+
+
+def explain(conn, statement):
+    """
+    Return the EXPLAIN QUERY PLAN detail lines for a statement.
+    :param statement: a SQLAlchemy statement, or (sql, parameters) from captured_queries()
+    """
+    if isinstance(statement, tuple):
+        sql, parameters = statement
+        return [row[-1] for row in conn.exec_driver_sql('EXPLAIN QUERY PLAN ' + sql, parameters)]
+
+    def prefix(conn, cursor, sql, parameters, context, executemany):
+        return 'EXPLAIN QUERY PLAN ' + sql, parameters
+
+    event.listen(conn, 'before_cursor_execute', prefix, retval=True)
+    try:
+        result = conn.execute(statement)
+        # Straight from the DBAPI cursor: the statement's column types don't fit plan rows
+        rows = result.cursor.fetchall()
+        result.close()
+        return [row[-1] for row in rows]
+    finally:
+        event.remove(conn, 'before_cursor_execute', prefix)
+
+
+def all_queries():
+    """:return: label -> statement for endpoint_queries() plus every query endpoint_calls() sends"""
+    queries = endpoint_queries()
+    for label, run in endpoint_calls().items():
+        for number, query in enumerate(captured_queries(run), 1):
+            queries[f'{label} #{number}'] = query
+    return queries
+
+
+def scans_table(plan):
+    """
+    True if a plan from explain() reads a whole table instead of using an index.
+    Scanning the rows of a subquery (a CO-ROUTINE or MATERIALIZE step) is fine:
+    the plan lines of the subquery itself show how it reads its table.
+    """
+    subqueries = {line.split()[1] for line in plan if line.startswith(('CO-ROUTINE', 'MATERIALIZE'))}
+    return any(line.startswith('SCAN') and line.split()[1] not in subqueries for line in plan)
+
+
+def find_table_scans(queries=None):
+    """
+    Run every endpoint query through EXPLAIN QUERY PLAN.
+    :param queries: label -> statement; default all_queries()
+    :return: dict of label -> plan lines for queries that scan a whole table
+    """
+    failures = {}
+    queries = all_queries() if queries is None else queries
+    with db.engine.connect() as conn:
+        for label, statement in queries.items():
+            plan = explain(conn, statement)
+            if scans_table(plan):
+                failures[label] = plan
+    return failures
+
+
+@click.command('check-query-plans')
+@with_appcontext
+def check_query_plans_command():
+    """Fail if any endpoint query falls back to a full table scan (SQLite only)."""
+    if db.engine.dialect.name != 'sqlite':
+        raise click.ClickException('EXPLAIN QUERY PLAN checks only run against SQLite')
+
+    queries = all_queries()
+    failures = find_table_scans(queries)
+    for label, plan in failures.items():
+        click.echo(f"{label}: {'; '.join(plan)}", err=True)
+    if failures:
+        raise click.ClickException(f'{len(failures)} queries fall back to a full table scan')
+    click.echo(f'All {len(queries)} endpoint queries use an index.')
@@ -1,14 +1,9 @@
 from flask import Blueprint, request, jsonify, session
-from flask_bcrypt import Bcrypt
 from models import db, Restaurant
 from utils import validate_request
+from passwords import hasher, PasswordServiceBusy
 import logging
 
-# Set up logging
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
-
-bcrypt = Bcrypt()
-
 # Blueprint for login
 login_bp = Blueprint('login', __name__, url_prefix='/api')
 
@@ -16,32 +11,34 @@ login_bp = Blueprint('login', __name__, url_prefix='/api')
 def login():
     try:
         data = request.get_json()
-        logging.info(f"Received login data: {data}")
 
         # Validate input fields
         validation_error = validate_request(data, ['username', 'password'])
         if validation_error:
-            logging.warning(f"Validation failed: {validation_error}")
+            logging.warning('Validation failed: %s', validation_error)
             return jsonify(validation_error), 400
 
         # Query the restaurant by username
         restaurant = Restaurant.query.filter_by(username=data['username']).first()
 
         # Verify password
-        if restaurant and bcrypt.check_password_hash(restaurant.password_hash, data['password']):
+        if restaurant and hasher.check_password_hash(restaurant.password_hash, data['password']):
+            # Upgrade hashes made with an outdated cost factor
+            if hasher.rehash_if_needed(restaurant, data['password']):
+                db.session.commit()
             session['username'] = restaurant.username
             session['restaurant_id'] = restaurant.id
-            logging.info(f"Login successful for user: {restaurant.username}, Session Data: {dict(session)}")
-             # Log the session cookie value
-            session_cookie = request.cookies.get('app_session')
-            logging.info(f"Session cookie set: {session_cookie}")
+            logging.info('Login successful for user: %s', restaurant.username)
             return jsonify({'message': 'Login successful', 'restaurant_id': restaurant.id}), 200
 
         logging.warning("Invalid username or password")
         return jsonify({'error': 'Invalid username or password'}), 401
 
+    except PasswordServiceBusy:
+        logging.warning("Password hashing pool is saturated")
+        return jsonify({'error': 'Server busy, please try again'}), 503, {'Retry-After': '1'}
     except Exception as e:
-        logging.error(f"Error during login: {e}")
+        logging.error('Error during login: %s', e)
         return jsonify({'error': 'Internal server error'}), 500
 
 @login_bp.route('/session', methods=['GET'])
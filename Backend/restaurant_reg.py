@@ -1,14 +1,10 @@
 from flask import Blueprint, request, jsonify, session
-from flask_bcrypt import Bcrypt
-from models import db, Restaurant, ActionLog
+from models import db, Restaurant
+from audit_log import audit_log
 from utils import validate_request
+from passwords import hasher, PasswordServiceBusy
 import logging
 
-# Set up logging
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
-
-bcrypt = Bcrypt()
-
 # Blueprint for registration
 register_bp = Blueprint('register', __name__, url_prefix='/api')
 
@@ -16,12 +12,11 @@ register_bp = Blueprint('register', __name__, url_prefix='/api')
 def register():
     try:
         data = request.get_json()
-        logging.info(f"Received registration data: {data}")
 
         # Validate input fields
         validation_error = validate_request(data, ['username', 'password', 'name', 'street', 'postalCode', 'description'])
         if validation_error:
-            logging.warning(f"Validation failed: {validation_error}")
+            logging.warning('Validation failed: %s', validation_error)
             return jsonify(validation_error), 400
 
         # Check if the username already exists
@@ -30,7 +25,7 @@ def register():
             return jsonify({'error': 'Username already exists'}), 400
 
         # Hash the password
-        hashed_password = bcrypt.generate_password_hash(data['password']).decode('utf-8')
+        hashed_password = hasher.generate_password_hash(data['password'])
 
         # Create and save the new restaurant
         new_restaurant = Restaurant(
@@ -43,22 +38,19 @@ def register():
             balance=100.00
         )
         db.session.add(new_restaurant)
-
-        # Log the registration action
-        log = ActionLog(
-            action="registration",
-            description=f"Registered restaurant: {new_restaurant.name} (username: {new_restaurant.username})"
-        )
-        db.session.add(log)
         db.session.commit()
 
+        # Audit record is written in the background, outside the registration transaction
+        audit_log.record("registration", f"Registered restaurant: {data['name']} (username: {data['username']})")
+
         session['username'] = new_restaurant.username
         session['restaurant_id'] = new_restaurant.id
-        logging.info(f"Session data: {dict(session)}")
-        session_cookie = request.cookies.get('app_session')
-        logging.info(f"Session cookie set: {session_cookie}")
+        logging.info('Registered restaurant: %s', new_restaurant.username)
         return jsonify({'message': 'User registered successfully'}), 201
 
+    except PasswordServiceBusy:
+        logging.warning("Password hashing pool is saturated")
+        return jsonify({'error': 'Server busy, please try again'}), 503, {'Retry-After': '1'}
     except Exception as e:
-        logging.error(f"Error during registration: {e}")
+        logging.error('Error during registration: %s', e)
         return jsonify({'error': 'Internal server error'}), 500
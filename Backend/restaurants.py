@@ -0,0 +1,31 @@
+from datetime import datetime
+from flask import Blueprint, jsonify, request, session
+from models import db, Customer
+from delivery_index import delivery_index
+import logging
+
+restaurants_bp = Blueprint('restaurants', __name__, url_prefix='/api')
+
+
+@restaurants_bp.route('/restaurants', methods=['GET'])
+def list_restaurants():
+    """
+    Restaurants that deliver to ?postal_code= (default: the logged-in customer's)
+    and are open right now. ?include_closed=true also lists closed ones.
+    """
+    try:
+        postal_code = request.args.get('postal_code', '').strip()
+        if not postal_code and session.get('customer_id'):
+            postal_code = db.session.execute(
+                db.select(Customer.postal_code).where(Customer.id == session['customer_id'])
+            ).scalar() or ''
+        if not postal_code:
+            return jsonify({'error': 'postal_code is required'}), 400
+
+        include_closed = request.args.get('include_closed', '').lower() in ('1', 'true', 'yes')
+        restaurants = delivery_index.lookup(postal_code, datetime.now(), include_closed)
+        return jsonify(restaurants), 200
+
+    except Exception as e:
+        logging.error('Error listing restaurants for %s: %s', request.args.get('postal_code'), e)
+        return jsonify({'error': 'Failed to fetch restaurants'}), 500
@@ -0,0 +1,201 @@
+import html
+import logging
+import re
+from datetime import datetime
+from flask import Blueprint, jsonify, request, session
+from sqlalchemy import DDL, bindparam, event, text
+from models import db, Customer, MenuItem
+from delivery_index import delivery_index
+
+search_bp = Blueprint('search', __name__, url_prefix='/api')
+
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 100
+MAX_TERMS = 8
+HIGHLIGHT = ('<mark>', '</mark>')  # Around matched terms in snippets; the rest is escaped menu text
+# What the database puts around matches: control characters that can't appear
+# in escaped text, swapped for HIGHLIGHT once the snippet has been escaped
+MARKERS = ('\x02', '\x03')
+SNIPPET_TOKENS = 12
+
+# Kept in sync with menu_items by triggers; the migration creates the same objects.
+# External content: the index stores only tokens and reads the text back from menu_items.
+SQLITE_FTS_DDL = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS menu_items_fts USING fts5("
+    "name, description, category, content='menu_items', content_rowid='id', "
+    "tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+    "CREATE TRIGGER IF NOT EXISTS menu_items_fts_ai AFTER INSERT ON menu_items BEGIN "
+    "INSERT INTO menu_items_fts(rowid, name, description, category) "
+    "VALUES (new.id, new.name, new.description, new.category); END",
+    "CREATE TRIGGER IF NOT EXISTS menu_items_fts_ad AFTER DELETE ON menu_items BEGIN "
+    "INSERT INTO menu_items_fts(menu_items_fts, rowid, name, description, category) "
+    "VALUES ('delete', old.id, old.name, old.description, old.category); END",
+    "CREATE TRIGGER IF NOT EXISTS menu_items_fts_au AFTER UPDATE OF name, description, category ON menu_items BEGIN "
+    "INSERT INTO menu_items_fts(menu_items_fts, rowid, name, description, category) "
+    "VALUES ('delete', old.id, old.name, old.description, old.category); "
+    "INSERT INTO menu_items_fts(rowid, name, description, category) "
+    "VALUES (new.id, new.name, new.description, new.category); END",
+)
+
+# PostgreSQL: a GIN expression index over the same weighted document the query uses
+PG_DOCUMENT = (
+    "setweight(to_tsvector('simple'::regconfig, {prefix}name), 'A') || "
+    "setweight(to_tsvector('simple'::regconfig, {prefix}category), 'B') || "
+    "setweight(to_tsvector('simple'::regconfig, {prefix}description), 'C')"
+)
+PG_SEARCH_DDL = (
+    f"CREATE INDEX IF NOT EXISTS ix_menu_items_search ON menu_items USING gin (({PG_DOCUMENT.format(prefix='')}))",
+)
+
+# bm25 weights for name, description, category: a hit in the name counts most
+SQLITE_SEARCH = text(f"""
+    SELECT m.id, m.restaurant_id, m.name, m.category, m.price, m.image_url,
+           snippet(menu_items_fts, -1, :open, :close, '…', {SNIPPET_TOKENS}) AS snippet,
+           bm25(menu_items_fts, 10.0, 1.0, 4.0) AS rank
+    FROM menu_items_fts
+    JOIN menu_items m ON m.id = menu_items_fts.rowid
+    WHERE menu_items_fts MATCH :query
+      AND m.restaurant_id IN :restaurant_ids
+      AND m.is_available
+    ORDER BY rank, m.id
+    LIMIT :limit
+""").bindparams(bindparam('restaurant_ids', expanding=True))
+
+PG_SEARCH = text(f"""
+    SELECT m.id, m.restaurant_id, m.name, m.category, m.price, m.image_url,
+           ts_headline('simple', m.name || ' – ' || m.description, q,
+                       'StartSel=' || :open || ', StopSel=' || :close || ', MaxWords={SNIPPET_TOKENS}, MinWords=4') AS snippet,
+           -ts_rank({PG_DOCUMENT.format(prefix='m.')}, q) AS rank
+    FROM menu_items m, to_tsquery('simple', :query) q
+    WHERE ({PG_DOCUMENT.format(prefix='m.')}) @@ q
+      AND m.restaurant_id IN :restaurant_ids
+      AND m.is_available
+    ORDER BY rank, m.id
+    LIMIT :limit
+""").bindparams(bindparam('restaurant_ids', expanding=True))
+
+SEARCH_STATEMENTS = {'sqlite': SQLITE_SEARCH, 'postgresql': PG_SEARCH}
+# Weights of a LIKE hit in each column where there is no full-text index, as for bm25 above
+LIKE_WEIGHTS = ((MenuItem.name, 10), (MenuItem.description, 1), (MenuItem.category, 4))
+
+for statement in SQLITE_FTS_DDL:
+    event.listen(MenuItem.__table__, 'after_create', DDL(statement).execute_if(dialect='sqlite'))
+for statement in PG_SEARCH_DDL:
+    event.listen(MenuItem.__table__, 'after_create', DDL(statement).execute_if(dialect='postgresql'))
+event.listen(MenuItem.__table__, 'before_drop', DDL('DROP TABLE IF EXISTS menu_items_fts').execute_if(dialect='sqlite'))
+
+
+def search_terms(q):
+    """Words of the user's query, lowercased; punctuation and FTS operators are dropped."""
+    return re.findall(r'\w+', q.lower())[:MAX_TERMS]
+
+
+def match_query(terms, dialect):
+    """Every term must match, each as a prefix so 'piz' finds 'pizza'."""
+    if dialect == 'postgresql':
+        return ' & '.join(f'{term}:*' for term in terms)
+    return ' '.join(f'"{term}"*' for term in terms)
+
+
+def render_snippet(snippet):
+    """
+    HTML for a snippet from the database: menu text is written by restaurants,
+    so everything is escaped and only the match markers become HIGHLIGHT tags.
+    """
+    if snippet is None:
+        return None
+    escaped = html.escape(snippet)
+    return escaped.replace(MARKERS[0], HIGHLIGHT[0]).replace(MARKERS[1], HIGHLIGHT[1])
+
+
+def search_menu_items(terms, restaurant_ids, limit=DEFAULT_LIMIT):
+    """
+    Rank available menu items of the given restaurants against terms.
+    :return: rows with id, restaurant_id, name, category, price, image_url, snippet and rank (lower is better)
+    """
+    if not terms or not restaurant_ids:
+        return []
+    dialect = db.engine.dialect.name
+    statement = SEARCH_STATEMENTS.get(dialect)
+    if statement is None:
+        return like_search(terms, restaurant_ids, limit)
+    return db.session.execute(statement, {
+        'query': match_query(terms, dialect),
+        'restaurant_ids': list(restaurant_ids),
+        'open': MARKERS[0],
+        'close': MARKERS[1],
+        'limit': limit,
+    }).all()
+
+
+def like_search(terms, restaurant_ids, limit):
+    """
+    search_menu_items for databases without a full-text index: every term must
+    occur in the name, description or category, and the snippet is the plain
+    description. Scans the restaurants' menu items.
+    """
+    def contains(column, term):
+        return db.func.lower(column).contains(term, autoescape=True)
+
+    score = sum(db.case((contains(column, term), weight), else_=0) for term in terms for column, weight in LIKE_WEIGHTS)
+    rank = (-score).label('rank')
+    return db.session.execute(
+        db.select(MenuItem.id, MenuItem.restaurant_id, MenuItem.name, MenuItem.category, MenuItem.price,
+                  MenuItem.image_url, MenuItem.description.label('snippet'), rank)
+        .where(
+            *(db.or_(*(contains(column, term) for column, _ in LIKE_WEIGHTS)) for term in terms),
+            MenuItem.restaurant_id.in_(list(restaurant_ids)),
+            MenuItem.is_available
+        )
+        .order_by(rank, MenuItem.id)
+        .limit(limit)
+    ).all()
+
+
+@search_bp.route('/search', methods=['GET'])
+def search():
+    """
+    Search menu items by name, description and category across the restaurants
+    that deliver to ?postal_code= (default: the logged-in customer's) and are open
+    now; ?include_closed=true searches closed ones too. Best matches come first.
+    """
+    terms = search_terms(request.args.get('q', ''))
+    if not terms:
+        return jsonify({'error': 'q is required'}), 400
+    limit = request.args.get('limit', DEFAULT_LIMIT, type=int)
+    if limit is None or not 1 <= limit <= MAX_LIMIT:
+        return jsonify({'error': f'limit must be between 1 and {MAX_LIMIT}'}), 400
+
+    try:
+        postal_code = request.args.get('postal_code', '').strip()
+        if not postal_code and session.get('customer_id'):
+            postal_code = db.session.execute(
+                db.select(Customer.postal_code).where(Customer.id == session['customer_id'])
+            ).scalar() or ''
+        if not postal_code:
+            return jsonify({'error': 'postal_code is required'}), 400
+
+        include_closed = request.args.get('include_closed', '').lower() in ('1', 'true', 'yes')
+        restaurants = {
+            summary['id']: summary
+            for summary in delivery_index.lookup(postal_code, datetime.now(), include_closed)
+        }
+        rows = search_menu_items(terms, restaurants, limit)
+        return jsonify([
+            {
+                'id': row.id,
+                'name': row.name,
+                'category': row.category,
+                'price': float(row.price),
+                'image_url': row.image_url,
+                'snippet': render_snippet(row.snippet),
+                'score': round(-row.rank, 4),
+                'restaurant_id': row.restaurant_id,
+                'restaurant_name': restaurants[row.restaurant_id]['name'],
+            }
+            for row in rows
+        ]), 200
+
+    except Exception as e:
+        logging.error('Menu search for %r in %s failed: %s', request.args.get('q'), request.args.get('postal_code'), e)
+        return jsonify({'error': 'Search failed'}), 500
@@ -0,0 +1,443 @@
+import click
+import random
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from decimal import Decimal
+from flask import current_app
+from flask.cli import with_appcontext
+from models import (
+    db, ArchivedOrder, ArchivedOrderItem, BalanceLedgerEntry, Customer, DeliveryArea, IdempotencyKey,
+    ItemSalesDaily, MenuItem, OpeningHour, Order, OrderEvent, OrderItem, Payment, Platform, Restaurant,
+    RestaurantBalance, SalesHourly
+)
+from checkout import PLATFORM_FEE_RATE
+from payments import PLATFORM_ID
+from analytics import backfill
+from passwords import hasher
+
+DEFAULT_COUNTS = {
+    'restaurants': 2000,
+    'menu_items': 40,  # per restaurant
+    'customers': 100000,
+    'orders': 2000000,
+    'items_per_order': 4,  # each order gets 1 to this many lines
+    'postal_codes': 400,
+    'areas': 6,  # postal codes each restaurant delivers to
+}
+BATCH_SIZE = 10000  # rows per executemany call
+ROWS_PER_TRANSACTION = 500000
+# Tables filled by the seeder, in insert order; reset deletes them in reverse
+SEEDED_TABLES = (
+    Platform.__table__, Restaurant.__table__, Customer.__table__, MenuItem.__table__,
+    OpeningHour.__table__, DeliveryArea.__table__, Order.__table__, OrderItem.__table__,
+    Payment.__table__, RestaurantBalance.__table__, BalanceLedgerEntry.__table__,
+)
+# Not seeded directly, but they reference seeded rows and go first on reset
+DEPENDENT_TABLES = (
+    OrderEvent.__table__, IdempotencyKey.__table__, ArchivedOrderItem.__table__, ArchivedOrder.__table__,
+    SalesHourly.__table__, ItemSalesDaily.__table__,
+)
+
+CUISINES = ('Pizzeria', 'Trattoria', 'Sushi Bar', 'Burger House', 'Curry House', 'Döner', 'Bistro', 'Taqueria', 'Noodle Bar')
+NAME_WORDS = ('Bella', 'Golden', 'Little', 'Royal', 'Green', 'Urban', 'Happy', 'Old Town', 'Corner', 'Lucky')
+STREETS = ('Hauptstraße', 'Bahnhofstraße', 'Gartenweg', 'Schillerstraße', 'Goethestraße', 'Lindenallee', 'Bergstraße')
+FIRST_NAMES = ('Max', 'Anna', 'Leon', 'Mia', 'Paul', 'Emma', 'Ben', 'Sofia', 'Finn', 'Lina', 'Noah', 'Marie')
+LAST_NAMES = ('Müller', 'Schmidt', 'Schneider', 'Fischer', 'Weber', 'Meyer', 'Wagner', 'Becker', 'Hoffmann')
+DISHES = {
+    'Starters': ('Bruschetta', 'Spring Rolls', 'Soup of the Day', 'Garlic Bread', 'Edamame'),
+    'Mains': ('Schnitzel', 'Green Curry', 'Cheeseburger', 'Falafel Plate', 'Ramen'),
+    'Pizza': ('Margherita', 'Diavola', 'Quattro Formaggi', 'Funghi', 'Hawaii'),
+    'Pasta': ('Carbonara', 'Arrabbiata', 'Bolognese', 'Pesto', 'Lasagne'),
+    'Desserts': ('Tiramisu', 'Panna Cotta', 'Cheesecake', 'Mochi', 'Brownie'),
+    'Drinks': ('Lemonade', 'Cola', 'Water', 'Iced Tea', 'Beer'),
+}
+CATEGORIES = tuple(DISHES)
+# Most orders are done; the newest ones are still open
+OLD_STATUSES = ('completed',) * 9 + ('cancelled',)
+RECENT_STATUSES = ('processing', 'preparing', 'preparing', 'completed')
+CENT = Decimal('0.01')
+FEE_PERCENT = int(PLATFORM_FEE_RATE * 100)
+
+
+def postal_code_pool(count):
+    return [f'{10115 + i * 3:05d}' for i in range(count)]
+
+
+def menu_item_ids(restaurant_id, per_restaurant):
+    """Menu items get consecutive ids per restaurant, starting at 1."""
+    first = (restaurant_id - 1) * per_restaurant + 1
+    return range(first, first + per_restaurant)
+
+
+class Generator:
+    """
+    Deterministic rows for a given seed and counts. Ids are assigned here, so
+    order lines can reference menu items without reading anything back.
+    """
+
+    def __init__(self, counts, seed, password_hash, days=365, always_open=False, customer_balance=5000):
+        self.counts = counts
+        self.rng = random.Random(seed)
+        self.password_hash = password_hash
+        self.days = days
+        self.always_open = always_open
+        self.customer_balance = customer_balance
+        self.postal_codes = postal_code_pool(counts['postal_codes'])
+        self.prices = []  # in cents, index menu_item_id - 1
+        self.now = datetime.utcnow().replace(microsecond=0)
+
+    def restaurants(self):
+        rng = self.rng
+        for restaurant_id in range(1, self.counts['restaurants'] + 1):
+            yield {
+                'id': restaurant_id,
+                'username': f'restaurant{restaurant_id}',
+                'name': f'{rng.choice(NAME_WORDS)} {rng.choice(CUISINES)} {restaurant_id}',
+                'street': f'{rng.choice(STREETS)} {rng.randint(1, 200)}',
+                'postal_code': rng.choice(self.postal_codes),
+                'description': 'Fresh food, delivered fast.',
+                'password_hash': self.password_hash,
+                'balance': 0,
+                'menu_version': 0,
+            }
+
+    def customers(self):
+        rng = self.rng
+        for customer_id in range(1, self.counts['customers'] + 1):
+            yield {
+                'id': customer_id,
+                'username': f'customer{customer_id}',
+                'first_name': rng.choice(FIRST_NAMES),
+                'last_name': rng.choice(LAST_NAMES),
+                'street': f'{rng.choice(STREETS)} {rng.randint(1, 200)}',
+                'postal_code': rng.choice(self.postal_codes),
+                'password_hash': self.password_hash,
+                'balance': self.customer_balance,
+            }
+
+    def menu_items(self):
+        rng = self.rng
+        for restaurant_id in range(1, self.counts['restaurants'] + 1):
+            for item_id in menu_item_ids(restaurant_id, self.counts['menu_items']):
+                category = rng.choice(CATEGORIES)
+                price = rng.randrange(250, 3000, 10)
+                self.prices.append(price)
+                yield {
+                    'id': item_id,
+                    'restaurant_id': restaurant_id,
+                    'name': rng.choice(DISHES[category]),
+                    'description': f'House {category.lower()} #{item_id}',
+                    'price': price / 100,
+                    'image_url': None,
+                    'is_available': rng.random() > 0.05,
+                    'category': category,
+                }
+
+    def opening_hours(self):
+        rng = self.rng
+        for restaurant_id in range(1, self.counts['restaurants'] + 1):
+            if self.always_open:
+                open_time, close_time = '00:00', '00:00'
+            else:
+                open_time = rng.choice(('10:00', '11:00', '11:30', '12:00'))
+                close_time = rng.choice(('21:00', '22:00', '23:00', '00:00', '02:00'))
+            for day in range(7):
+                yield {'restaurant_id': restaurant_id, 'day_of_week': day, 'open_time': open_time, 'close_time': close_time}
+
+    def delivery_areas(self):
+        rng = self.rng
+        per_restaurant = min(self.counts['areas'], len(self.postal_codes))
+        for restaurant_id in range(1, self.counts['restaurants'] + 1):
+            for postal_code in rng.sample(self.postal_codes, per_restaurant):
+                yield {'restaurant_id': restaurant_id, 'postal_code': postal_code}
+
+    def orders_and_items(self):
+        """
+        Yield ('order', row) and ('item', row) pairs, oldest order first.
+        Needs menu_items() to have run so prices are known.
+        """
+        random = self.rng.random  # randint/randrange cost several times more per call
+        count = self.counts['orders']
+        restaurants = self.counts['restaurants']
+        customers = self.counts['customers']
+        per_restaurant = self.counts['menu_items']
+        max_lines = self.counts['items_per_order']
+        prices = self.prices
+        step = self.days * 86400 / max(count, 1)
+        start = self.now - timedelta(days=self.days)
+        recent = self.now - timedelta(hours=2)
+
+        for order_id in range(1, count + 1):
+            restaurant_id = int(random() * restaurants) + 1
+            first_item = (restaurant_id - 1) * per_restaurant + 1
+            created_at = start + timedelta(seconds=int((order_id - 1 + random()) * step))
+            lines = {}
+            for _ in range(int(random() * max_lines) + 1):
+                item_id = first_item + int(random() * per_restaurant)
+                lines[item_id] = lines.get(item_id, 0) + int(random() * 3) + 1
+            # Money is kept in integer cents while generating; Decimal arithmetic dominated the run time
+            total = sum(prices[item_id - 1] * quantity for item_id, quantity in lines.items())
+            fee = (total * FEE_PERCENT + 50) // 100  # Rounded half up, like checkout
+            statuses = RECENT_STATUSES if created_at >= recent else OLD_STATUSES
+            yield 'order', {
+                'id': order_id,
+                'customer_id': int(random() * customers) + 1,
+                'restaurant_id': restaurant_id,
+                'status': statuses[int(random() * len(statuses))],
+                'total_amount': total / 100,
+                'platform_fee': fee / 100,
+                'restaurant_amount': (total - fee) / 100,
+                'notes': None,
+                'created_at': created_at,
+                'updated_at': created_at,
+            }
+            for item_id, quantity in lines.items():
+                yield 'item', {
+                    'order_id': order_id, 'menu_item_id': item_id,
+                    'quantity': quantity, 'price_at_order': prices[item_id - 1] / 100,
+                }
+
+
+@contextmanager
+def relaxed_durability(conn):
+    """
+    Trade crash safety for speed while loading: a crash mid-seed means reseeding anyway.
+    SQLite pragmas are per connection, so only the loader's connection is affected.
+    """
+    dialect = conn.dialect.name
+    if dialect == 'sqlite':
+        conn.exec_driver_sql('PRAGMA synchronous=OFF')
+        conn.exec_driver_sql('PRAGMA cache_size=-262144')  # 256 MB
+        conn.exec_driver_sql('PRAGMA temp_store=MEMORY')
+    elif dialect == 'postgresql':
+        conn.exec_driver_sql('SET synchronous_commit = off')
+    try:
+        yield
+    finally:
+        if dialect == 'sqlite':
+            pragmas = current_app.config.get('SQLITE_PRAGMAS', {})
+            conn.exec_driver_sql(f"PRAGMA synchronous={pragmas.get('synchronous', 'FULL')}")
+            conn.exec_driver_sql(f"PRAGMA cache_size={pragmas.get('cache_size', -2000)}")
+        elif dialect == 'postgresql':
+            conn.exec_driver_sql('RESET synchronous_commit')
+
+
+@contextmanager
+def indexes_dropped(conn, tables):
+    """Drop the models' secondary indexes during the load and build each once at the end."""
+    indexes = [index for table in tables for index in table.indexes if not index.unique]
+    for index in indexes:
+        index.drop(conn, checkfirst=True)
+    conn.commit()
+    try:
+        yield
+    finally:
+        for index in indexes:
+            index.create(conn, checkfirst=True)
+        conn.commit()
+
+
+class BulkLoader:
+    """
+    Buffer rows per table and write them with executemany, committing every
+    rows_per_transaction rows. A child table's batch is only written after its
+    parent's pending rows, so foreign keys hold on databases that enforce them.
+    """
+
+    def __init__(self, conn, batch_size=BATCH_SIZE, rows_per_transaction=ROWS_PER_TRANSACTION, parents=None):
+        self.conn = conn
+        self.parents = parents or {}
+        self.batch_size = batch_size
+        self.rows_per_transaction = rows_per_transaction
+        self.buffers = {}
+        self.counts = {}
+        self.uncommitted = 0
+
+    def add(self, table, row):
+        buffer = self.buffers.setdefault(table, [])
+        buffer.append(row)
+        if len(buffer) >= self.batch_size:
+            self.flush(table)
+
+    def load(self, table, rows):
+        for row in rows:
+            self.add(table, row)
+        self.flush(table)
+
+    def flush(self, table):
+        rows = self.buffers.get(table)
+        if not rows:
+            return
+        if table in self.parents:
+            self.flush(self.parents[table])
+        self.conn.execute(table.insert(), rows)
+        self.counts[table.name] = self.counts.get(table.name, 0) + len(rows)
+        self.uncommitted += len(rows)
+        self.buffers[table] = []
+        if self.uncommitted >= self.rows_per_transaction:
+            self.conn.commit()
+            self.uncommitted = 0
+
+    def finish(self):
+        for table in list(self.buffers):
+            self.flush(table)
+        self.conn.commit()
+
+
+def rebuild_balances(conn):
+    """
+    Settle the seeded orders as checkout and cancellation would have: a payment
+    per order (refunded if it was cancelled), customers debited, the platform
+    paid its fees and each restaurant's share credited to its ledger.
+    """
+    charged = Order.status != 'cancelled'
+    conn.execute(Payment.__table__.insert().from_select(
+        ['order_id', 'customer_id', 'restaurant_id', 'total_amount', 'platform_fee', 'restaurant_amount',
+         'created_at', 'refunded_at'],
+        db.select(Order.id, Order.customer_id, Order.restaurant_id, Order.total_amount, Order.platform_fee,
+                  Order.restaurant_amount, Order.created_at, db.case((charged, None), else_=Order.updated_at))
+    ))
+    # A charge and its refund add up to nothing, so cancelled orders get no entries
+    conn.execute(BalanceLedgerEntry.__table__.insert().from_select(
+        ['restaurant_id', 'order_id', 'amount', 'from_status', 'to_status', 'created_at'],
+        db.select(Order.restaurant_id, Order.id, Order.restaurant_amount, db.null(), db.literal('processing'),
+                  Order.created_at)
+        .where(charged)
+    ))
+    conn.execute(RestaurantBalance.__table__.insert().from_select(
+        ['restaurant_id', 'balance', 'updated_at'],
+        db.select(Order.restaurant_id, db.func.round(db.func.sum(Order.restaurant_amount), 2),
+                  db.func.current_timestamp())
+        .where(charged)
+        .group_by(Order.restaurant_id)
+    ))
+
+    spent = conn.execute(
+        db.select(Order.customer_id, db.func.sum(Order.total_amount)).where(charged).group_by(Order.customer_id)
+    ).all()
+    if spent:
+        customers = Customer.__table__
+        conn.execute(
+            db.update(customers)
+            .where(customers.c.id == db.bindparam('customer_id'))
+            .values(balance=db.func.round(customers.c.balance - db.bindparam('spent'), 2)),
+            [{'customer_id': customer_id, 'spent': Decimal(total).quantize(CENT)} for customer_id, total in spent]
+        )
+    platform_fees = conn.execute(db.select(db.func.sum(Order.platform_fee)).where(charged)).scalar()
+    conn.execute(db.update(Platform).where(Platform.id == PLATFORM_ID)
+                 .values(balance=Decimal(platform_fees or 0).quantize(CENT)))
+    conn.commit()
+
+
+def reset_sequences(conn):
+    """Seeded rows carry explicit ids, so PostgreSQL sequences have to be moved past them."""
+    if conn.dialect.name != 'postgresql':
+        return
+    for table in SEEDED_TABLES:
+        for column in table.primary_key.columns:
+            if column.autoincrement is True or (column.autoincrement == 'auto' and isinstance(column.type, db.Integer)):
+                conn.exec_driver_sql(
+                    f"SELECT setval(pg_get_serial_sequence('{table.name}', '{column.name}'), "
+                    f"COALESCE((SELECT MAX({column.name}) FROM {table.name}), 0) + 1, false)"
+                )
+    conn.commit()
+
+
+def seed_database(conn, counts, seed=0, password='password', days=365, always_open=False, customer_balance=5000,
+                  batch_size=BATCH_SIZE, progress=None):
+    """
+    Bulk-load a deterministic dataset into empty tables.
+    :param customer_balance: each customer's balance before their seeded orders are charged
+    :return: dict of table name -> rows inserted
+    """
+    generator = Generator(counts, seed, hasher.generate_password_hash(password), days, always_open, customer_balance)
+    loader = BulkLoader(conn, batch_size, parents={OrderItem.__table__: Order.__table__})
+
+    def step(label, table, rows):
+        started = time.perf_counter()
+        loader.load(table, rows)
+        if progress:
+            progress(label, loader.counts.get(table.name, 0), time.perf_counter() - started)
+
+    with relaxed_durability(conn), indexes_dropped(conn, SEEDED_TABLES):
+        step('platform', Platform.__table__, [{'id': PLATFORM_ID, 'balance': 0}])
+        step('restaurants', Restaurant.__table__, generator.restaurants())
+        step('customers', Customer.__table__, generator.customers())
+        step('menu_items', MenuItem.__table__, generator.menu_items())
+        step('opening_hours', OpeningHour.__table__, generator.opening_hours())
+        step('delivery_areas', DeliveryArea.__table__, generator.delivery_areas())
+
+        started = time.perf_counter()
+        tables = {'order': Order.__table__, 'item': OrderItem.__table__}
+        for kind, row in generator.orders_and_items():
+            loader.add(tables[kind], row)
+        loader.finish()
+        if progress:
+            progress('orders', loader.counts.get('orders', 0), time.perf_counter() - started)
+            progress('order_items', loader.counts.get('order_items', 0), time.perf_counter() - started)
+
+        started = time.perf_counter()
+        rebuild_balances(conn)
+        reset_sequences(conn)
+        if progress:
+            progress('balances', 0, time.perf_counter() - started)
+
+        started = time.perf_counter()
+        hourly_rows, item_rows = backfill(conn)
+        loader.counts[SalesHourly.__tablename__] = hourly_rows
+        loader.counts[ItemSalesDaily.__tablename__] = item_rows
+        if progress:
+            progress('sales rollups', hourly_rows + item_rows, time.perf_counter() - started)
+    return loader.counts
+
+
+def clear_tables(conn):
+    for table in DEPENDENT_TABLES + tuple(reversed(SEEDED_TABLES)):
+        conn.execute(table.delete())
+    conn.commit()
+
+
+def count_option(name, help_text):
+    return click.option(f"--{name.replace('_', '-')}", name, default=DEFAULT_COUNTS[name], show_default=True, help=help_text)
+
+
+@click.command('seed')
+@count_option('restaurants', 'Number of restaurants.')
+@count_option('menu_items', 'Menu items per restaurant.')
+@count_option('customers', 'Number of customers.')
+@count_option('orders', 'Number of orders.')
+@count_option('items_per_order', 'Maximum lines per order.')
+@count_option('postal_codes', 'Distinct postal codes.')
+@count_option('areas', 'Delivery postal codes per restaurant.')
+@click.option('--days', default=365, show_default=True, help='Spread orders over this many days up to now.')
+@click.option('--seed', 'seed_value', default=0, show_default=True, help='Random seed; the same seed gives the same data.')
+@click.option('--password', default='password', show_default=True, help='Password of every seeded account.')
+@click.option('--batch-size', default=BATCH_SIZE, show_default=True, help='Rows per executemany call.')
+@click.option('--reset', is_flag=True, help='Delete existing restaurants, customers, menus and orders first.')
+@with_appcontext
+def seed_command(restaurants, menu_items, customers, orders, items_per_order, postal_codes, areas,
+                 days, seed_value, password, batch_size, reset):
+    """Bulk-load deterministic synthetic data for local load testing."""
+    counts = {
+        'restaurants': restaurants, 'menu_items': menu_items, 'customers': customers, 'orders': orders,
+        'items_per_order': items_per_order, 'postal_codes': postal_codes, 'areas': areas,
+    }
+    if min(restaurants, menu_items, customers, items_per_order, postal_codes) < 1:
+        raise click.BadParameter('restaurants, menu items, customers, items per order and postal codes must be at least 1')
+
+    with db.engine.connect() as conn:
+        # Every install starts with the platform row, so it doesn't count as data
+        if not reset and any(conn.execute(db.select(db.func.count()).select_from(table)).scalar()
+                             for table in SEEDED_TABLES if table is not Platform.__table__):
+            raise click.ClickException('The database already has data; run with --reset to replace it')
+        clear_tables(conn)
+
+        started = time.perf_counter()
+        totals = seed_database(
+            conn, counts, seed_value, password, days, batch_size=batch_size,
+            progress=lambda label, rows, seconds: click.echo(f'{label:15} {rows:>12,} rows {seconds:8.1f}s', err=True)
+        )
+    elapsed = time.perf_counter() - started
+    rows = sum(totals.values())
+    click.echo(f'Seeded {rows:,} rows in {elapsed:.1f}s ({rows / elapsed:,.0f} rows/s).')
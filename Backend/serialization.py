@@ -0,0 +1,108 @@
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from flask.json.provider import DefaultJSONProvider
+
+
+class Projection:
+    """
+    The public fields of a table, by output name and source column. List endpoints
+    select only the requested columns as Core rows and hand them straight to the
+    JSON provider, without building ORM objects or per-row dicts.
+    """
+
+    def __init__(self, fields):
+        self.fields = dict(fields)  # output name -> column name
+        self.default = tuple(self.fields)
+
+    def parse_fields(self, value):
+        """
+        Parse a ``?fields=a,b`` sparse fieldset.
+        :return: tuple of output names; every field when value is empty
+        :raises ValueError: if a name isn't a field
+        """
+        names = tuple(dict.fromkeys(name.strip() for name in (value or '').split(',') if name.strip()))
+        unknown = [name for name in names if name not in self.fields]
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+        return names or self.default
+
+    def columns(self, table, names):
+        """Labeled columns of table (or any selectable with the same column names) for names."""
+        return [table.c[self.fields[name]].label(name) for name in names]
+
+
+def encode_default(value):
+    """Fallback for the stdlib and orjson backends; matches the float()/isoformat() the endpoints used."""
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f'Object of type {type(value).__name__} is not JSON serializable')
+
+
+class StdlibJSONProvider(DefaultJSONProvider):
+    """
+    Flask's json module, plus encode_rows for projected Core rows. The fast
+    providers below only change encode_rows, so jsonify and every other
+    response keep Flask's output byte for byte.
+    """
+
+    def encode_rows(self, names, rows):
+        """:return: bytes of a JSON array with one object per row, keyed by names"""
+        return json.dumps(
+            [dict(zip(names, row)) for row in rows], default=encode_default, separators=(',', ':'), ensure_ascii=False
+        ).encode('utf-8')
+
+
+class MsgspecJSONProvider(DefaultJSONProvider):
+    """
+    Encodes projected rows with msgspec, through a Struct type compiled once per
+    field list, which msgspec serializes without an intermediate dict.
+    """
+
+    def __init__(self, app):
+        super().__init__(app)
+        import msgspec
+        self._msgspec = msgspec
+        self._encoder = msgspec.json.Encoder(decimal_format='number')
+        self._row_types = {}
+
+    def row_type(self, names):
+        row_type = self._row_types.get(names)
+        if row_type is None:
+            row_type = self._row_types.setdefault(names, self._msgspec.defstruct('Row', names, gc=False))
+        return row_type
+
+    def encode_rows(self, names, rows):
+        row_type = self.row_type(tuple(names))
+        return self._encoder.encode([row_type(*row) for row in rows])
+
+
+class OrjsonJSONProvider(DefaultJSONProvider):
+    """Encodes projected rows with orjson, which handles datetimes natively; Decimals become floats."""
+
+    def __init__(self, app):
+        super().__init__(app)
+        import orjson
+        self._orjson = orjson
+
+    def encode_rows(self, names, rows):
+        return self._orjson.dumps([dict(zip(names, row)) for row in rows], default=encode_default)
+
+
+PROVIDERS = {
+    'stdlib': StdlibJSONProvider,
+    'msgspec': MsgspecJSONProvider,
+    'orjson': OrjsonJSONProvider,
+}
+
+
+def init_json(app):
+    backend = app.config.setdefault('JSON_BACKEND', 'msgspec')
+    if backend not in PROVIDERS:
+        raise ValueError(f"Unknown JSON_BACKEND '{backend}', expected one of {', '.join(PROVIDERS)}")
+    try:
+        app.json = PROVIDERS[backend](app)
+    except ImportError as e:
+        raise RuntimeError(f"JSON_BACKEND '{backend}' requires the '{backend}' package") from e
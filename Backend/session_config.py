@@ -1,19 +1,70 @@
-from flask_session import Session
 import os
 from datetime import timedelta
+from cachelib.file import FileSystemCache
+from cachelib.redis import RedisCache
+from session_stores import LRUCache, CacheSessionInterface, DatabaseSessionInterface
+
+SESSION_BACKENDS = ('memory', 'filesystem', 'redis', 'sqlalchemy')
+
+
+def make_redis_client(app):
+    """
+    Client for any Redis-protocol server at SESSION_REDIS_URL (redis-server or a
+    local stand-in). A ready client can be passed as SESSION_REDIS instead.
+    Needs the optional 'redis' package.
+    """
+    if app.config.get('SESSION_REDIS') is not None:
+        return app.config['SESSION_REDIS']
+    try:
+        import redis
+    except ImportError as e:
+        raise RuntimeError("SESSION_BACKEND 'redis' requires the 'redis' package") from e
+    return redis.Redis.from_url(app.config['SESSION_REDIS_URL'])
+
+
+def make_session_interface(app, db):
+    config = app.config
+    backend = config['SESSION_BACKEND']
+    lifetime = int(config['PERMANENT_SESSION_LIFETIME'].total_seconds())
+    common = {
+        'key_prefix': config['SESSION_KEY_PREFIX'],
+        'use_signer': config['SESSION_USE_SIGNER'],
+        'permanent': config['SESSION_PERMANENT'],
+    }
+
+    if backend == 'memory':
+        # Per-process store: only use with a single worker process
+        client = LRUCache(max_entries=config['SESSION_MEMORY_MAX_ENTRIES'], default_timeout=lifetime)
+        return CacheSessionInterface(app, client=client, **common)
+    if backend == 'filesystem':
+        client = FileSystemCache(config['SESSION_FILE_DIR'], threshold=config['SESSION_FILE_THRESHOLD'], default_timeout=lifetime)
+        return CacheSessionInterface(app, client=client, **common)
+    if backend == 'redis':
+        client = RedisCache(host=make_redis_client(app), default_timeout=lifetime)
+        return CacheSessionInterface(app, client=client, **common)
+    if backend == 'sqlalchemy':
+        return DatabaseSessionInterface(app, client=db, table='sessions', **common)
+    raise ValueError(f"Unknown SESSION_BACKEND '{backend}', expected one of {', '.join(SESSION_BACKENDS)}")
 
 
 def init_session(app, db):
-    app.config['SESSION_TYPE'] = 'sqlalchemy'  # Use SQLAlchemy for session management
-    app.config['SESSION_SQLALCHEMY'] = db  # Use the database instance for session management
+    basedir = os.path.abspath(os.path.dirname(__file__))
+    # Keep sessions out of the SQLite file that holds orders unless asked otherwise
+    app.config.setdefault('SESSION_BACKEND', os.environ.get('SESSION_BACKEND', 'filesystem'))
+    app.config.setdefault('SESSION_FILE_DIR', os.path.join(basedir, 'flask_session'))
+    app.config.setdefault('SESSION_FILE_THRESHOLD', 10000)
+    app.config.setdefault('SESSION_MEMORY_MAX_ENTRIES', 10000)
+    app.config.setdefault('SESSION_REDIS_URL', os.environ.get('SESSION_REDIS_URL', 'redis://localhost:6379/0'))
+    app.config.setdefault('SESSION_REFRESH_INTERVAL', 300)  # Seconds between expiry refreshes of unchanged sessions
     app.config['SESSION_PERMANENT'] = True
     app.config['PERMANENT_SESSION_LIFETIME'] = timedelta(minutes=30)
     app.config['SESSION_USE_SIGNER'] = False
     app.config['SESSION_KEY_PREFIX'] = 'session:'
     app.config['SESSION_COOKIE_NAME'] = 'app_session'
     app.config['SESSION_COOKIE_HTTPONLY'] = True
-    app.config['SESSION_COOKIE_SECURE'] = False  # Set to True in production
+    app.config.setdefault('SESSION_COOKIE_SECURE', False)  # True in the production profile
     app.config['SESSION_COOKIE_SAMESITE'] = 'Lax'
 
-    # Initialize Flask-Session
-    Session(app)
+    # Install the server-side session store
+    app.session_interface = make_session_interface(app, db)
+    app.session_interface.refresh_interval = app.config['SESSION_REFRESH_INTERVAL']
@@ -0,0 +1,107 @@
+import time
+from collections import OrderedDict
+from threading import Lock
+from cachelib.base import BaseCache
+from flask_session.cachelib import CacheLibSessionInterface
+from flask_session.sqlalchemy import SqlAlchemySessionInterface
+
+REFRESH_KEY = '_refreshed_at'  # Stored with the session data to decide when expiry needs extending
+
+
+class LRUCache(BaseCache):
+    """
+    In-process cachelib backend: bounded LRU with per-entry TTL.
+    Expired entries are dropped when read and swept at most once per sweep_interval.
+    Only suitable when a single process serves all requests.
+    """
+
+    def __init__(self, max_entries=10000, default_timeout=300, sweep_interval=60):
+        super().__init__(default_timeout)
+        self.max_entries = max_entries
+        self.sweep_interval = sweep_interval
+        self._entries = OrderedDict()  # key -> (expires_at or None, value)
+        self._lock = Lock()
+        self._next_sweep = time.monotonic() + sweep_interval
+
+    def _expires_at(self, timeout):
+        timeout = self._normalize_timeout(timeout)
+        return time.monotonic() + timeout if timeout else None
+
+    def _sweep(self, now):
+        expired = [key for key, (expires_at, _) in self._entries.items() if expires_at and expires_at <= now]
+        for key in expired:
+            del self._entries[key]
+        self._next_sweep = now + self.sweep_interval
+
+    def get(self, key):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] and entry[0] <= now:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key, value, timeout=None):
+        now = time.monotonic()
+        with self._lock:
+            self._entries[key] = (self._expires_at(timeout), value)
+            self._entries.move_to_end(key)
+            if now >= self._next_sweep:
+                self._sweep(now)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return True
+
+    def add(self, key, value, timeout=None):
+        if self.has(key):
+            return False
+        return self.set(key, value, timeout)
+
+    def delete(self, key):
+        with self._lock:
+            return self._entries.pop(key, None) is not None
+
+    def has(self, key):
+        return self.get(key) is not None
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+        return True
+
+
+class WriteOnChangeMixin:
+    """
+    Skip the storage write when a request leaves the session as it was loaded.
+    Unchanged sessions are still written once every refresh_interval seconds so
+    the stored expiry keeps sliding for active users.
+    """
+
+    refresh_interval = 300
+
+    def open_session(self, app, request):
+        session = super().open_session(app, request)
+        session.loaded_state = dict(session)
+        return session
+
+    def should_set_storage(self, app, session):
+        now = time.time()
+        changed = session.modified and dict(session) != getattr(session, 'loaded_state', None)
+        stale = now - dict.get(session, REFRESH_KEY, 0) >= self.refresh_interval
+        if not (changed or stale):
+            return False
+        # Bypass the session's on_update callback; this isn't a user change
+        dict.__setitem__(session, REFRESH_KEY, now)
+        return True
+
+
+class CacheSessionInterface(WriteOnChangeMixin, CacheLibSessionInterface):
+    """Sessions in any cachelib backend (in-process LRU, filesystem or Redis)."""
+
+
+class DatabaseSessionInterface(WriteOnChangeMixin, SqlAlchemySessionInterface):
+    """Sessions in the application database, written only when they change."""
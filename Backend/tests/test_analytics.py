@@ -0,0 +1,58 @@
+from datetime import datetime
+from decimal import Decimal
+import analytics
+from models import db, ItemSalesDaily, Order, OrderItem, SalesHourly
+
+
+def add_completed_order(restaurant, customer, created_at):
+    order = Order(customer_id=customer, restaurant_id=restaurant.id, status='completed', total_amount=Decimal('17.00'),
+                  platform_fee=Decimal('2.55'), restaurant_amount=Decimal('14.45'), created_at=created_at)
+    db.session.add(order)
+    db.session.flush()
+    db.session.add(OrderItem(order_id=order.id, menu_item_id=restaurant.items[0], quantity=2,
+                             price_at_order=Decimal('8.50')))
+    return order
+
+
+def rollups(restaurant):
+    hourly = db.session.execute(
+        db.select(SalesHourly.hour, SalesHourly.orders_completed, SalesHourly.revenue)
+        .where(SalesHourly.restaurant_id == restaurant.id).order_by(SalesHourly.hour)
+    ).all()
+    items = db.session.execute(
+        db.select(ItemSalesDaily.day, ItemSalesDaily.quantity, ItemSalesDaily.revenue)
+        .where(ItemSalesDaily.restaurant_id == restaurant.id)
+    ).all()
+    return [tuple(row) for row in hourly], [tuple(row) for row in items]
+
+
+def test_finished_orders_add_up_in_their_buckets(app, restaurant, customer):
+    with app.app_context():
+        placed = datetime(2026, 3, 2, 12, 15)
+        orders = [add_completed_order(restaurant, customer, placed.replace(minute=minute)) for minute in (15, 45)]
+        analytics.record_finished_orders(restaurant.id, [(orders[0].id, 'completed', orders[0].created_at, 17, 14.45)])
+        analytics.record_finished_orders(restaurant.id, [(orders[1].id, 'completed', orders[1].created_at, 17, 14.45)])
+        db.session.commit()
+        assert rollups(restaurant) == (
+            [(datetime(2026, 3, 2, 12), 2, Decimal('34.00'))],
+            [(placed.date(), 4, Decimal('34.00'))],
+        )
+
+
+def test_rollups_without_on_conflict_or_bucket_functions_match(app, restaurant, customer, monkeypatch):
+    with app.app_context():
+        placed = datetime(2026, 3, 3, 18, 5)
+        orders = [add_completed_order(restaurant, customer, placed) for _ in range(2)]
+        monkeypatch.setattr(analytics, 'DIALECT_INSERTS', {})
+        for order in orders:
+            analytics.record_finished_orders(restaurant.id, [(order.id, 'completed', order.created_at, 17, 14.45)])
+        db.session.commit()
+        recorded = rollups(restaurant)
+
+        monkeypatch.setattr(analytics, 'BUCKET_FUNCTIONS', {})
+        with db.engine.connect() as conn:
+            analytics.backfill(conn, [restaurant.id])
+        assert rollups(restaurant) == recorded == (
+            [(datetime(2026, 3, 3, 18), 2, Decimal('34.00'))],
+            [(placed.date(), 4, Decimal('34.00'))],
+        )
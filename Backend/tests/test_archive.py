@@ -0,0 +1,36 @@
+from datetime import datetime, timedelta
+from decimal import Decimal
+from archive import archive_orders
+from models import db, ArchivedOrder, ArchivedOrderItem, Order, OrderEvent, OrderItem
+
+
+def add_order(restaurant, customer, created_at, event_at):
+    order = Order(customer_id=customer, restaurant_id=restaurant.id, status='completed', total_amount=Decimal('8.50'),
+                  platform_fee=Decimal('1.28'), restaurant_amount=Decimal('7.22'), created_at=created_at,
+                  updated_at=created_at)
+    db.session.add(order)
+    db.session.flush()
+    db.session.add(OrderItem(order_id=order.id, menu_item_id=restaurant.items[0], quantity=1,
+                             price_at_order=Decimal('8.50')))
+    db.session.add(OrderEvent(restaurant_id=restaurant.id, order_id=order.id, event_type='status-changed',
+                              payload='{}', created_at=event_at))
+    return order.id
+
+
+def test_old_completed_order_is_archived_with_its_events(app, restaurant, customer):
+    now = datetime.utcnow()
+    with app.app_context():
+        old = add_order(restaurant, customer, now - timedelta(days=60), now - timedelta(days=59))
+        recently_streamed = add_order(restaurant, customer, now - timedelta(days=60), now - timedelta(minutes=5))
+        db.session.commit()
+
+        archive_orders(days=30, pause=0)
+
+        assert db.session.get(Order, old) is None
+        assert db.session.get(ArchivedOrder, old).status == 'completed'
+        assert db.session.scalar(db.select(db.func.count()).where(ArchivedOrderItem.order_id == old)) == 1
+        assert db.session.scalar(db.select(db.func.count()).where(OrderEvent.order_id == old)) == 0
+
+        # Its stream event is still resumable, so it waits for a later run
+        assert db.session.get(Order, recently_streamed) is not None
+        assert db.session.get(ArchivedOrder, recently_streamed) is None
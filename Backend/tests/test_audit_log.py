@@ -0,0 +1,48 @@
+import uuid
+from audit_log import AuditLogWriter, audit_log
+from models import db, ActionLog
+
+
+def audit_records(app, text):
+    with app.app_context():
+        return db.session.query(ActionLog.action).filter(ActionLog.description.contains(text)).all()
+
+
+def test_registration_is_audited_after_the_response(app, client):
+    username = f'c-{uuid.uuid4().hex}'
+    response = client.post('/api/customer/register', json={
+        'username': username, 'firstName': 'Erika', 'lastName': 'Muster', 'street': 'Nebenstr. 2',
+        'postalCode': '47057', 'password': 'secret',
+    })
+    assert response.status_code == 201
+    audit_log.stop()  # Flushes the queue
+    assert audit_records(app, username) == [('registration',)]
+
+
+def test_batches_are_written_together(app, monkeypatch):
+    monkeypatch.setitem(app.config, 'AUDIT_LOG_BATCH_SIZE', 3)
+    writer = AuditLogWriter()
+    writer.init_app(app)
+    marker = uuid.uuid4().hex
+    for number in range(5):
+        assert writer.record('test', f'{marker} {number}')
+    writer.stop()
+    assert len(audit_records(app, marker)) == 5
+    assert writer.stats() == {'queued': 5, 'written': 5, 'dropped': 0, 'failed': 0, 'pending': 0}
+
+
+def test_full_queue_drops_instead_of_blocking(app, monkeypatch):
+    monkeypatch.setitem(app.config, 'AUDIT_LOG_QUEUE_SIZE', 1)
+    writer = AuditLogWriter()
+    writer.init_app(app)
+    writer._queue.put_nowait({'action': 'test', 'description': None, 'timestamp': None})  # Writer not started yet
+    assert not writer.record('test', 'dropped')
+    assert writer.stats()['dropped'] == 1
+
+
+def test_failed_insert_is_counted(app, monkeypatch):
+    writer = AuditLogWriter()
+    writer.init_app(app)
+    writer.record(None, 'action is NOT NULL')
+    writer.stop()
+    assert writer.stats()['failed'] == 1 and writer.stats()['written'] == 0
@@ -0,0 +1,59 @@
+import json
+import os
+import subprocess
+import sys
+import pytest
+from benchmarks.__main__ import compare
+from benchmarks.runner import percentile, summarize
+from benchmarks.scenarios import select
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def result(p95, rps, errors=0):
+    return {'latency_ms': {'p95': p95}, 'throughput_rps': rps, 'errors': errors}
+
+
+def test_summary_uses_nearest_rank_percentiles():
+    summary = summarize([0.004, 0.001, 0.003, 0.002], [200, 200, 304, 200], 0, 2.0)
+    assert summary['latency_ms']['p50'] == 2.0 and summary['latency_ms']['max'] == 4.0
+    assert summary['status_codes'] == {'200': 3, '304': 1}
+    assert summary['throughput_rps'] == 2.0
+    assert percentile([], 0.5) is None
+
+
+def test_compare_flags_slower_or_failing_scenarios():
+    baseline = {'scenarios': {'menu.get': result(10.0, 100.0), 'orders.list': result(10.0, 100.0),
+                              'balance.get': result(10.0, 100.0)}}
+    lines, regressed = compare(baseline, {
+        'menu.get': result(11.0, 95.0),
+        'orders.list': result(20.0, 100.0),
+        'balance.get': result(10.0, 100.0, errors=1),
+        'search.menu': result(5.0, 200.0),
+    }, 0.25)
+    assert regressed == ['orders.list', 'balance.get']
+    assert lines[-1].split() == ['search.menu', 'new']
+
+
+def test_scenarios_are_selected_by_name_or_group():
+    assert [scenario.name for scenario in select(['menu.get'])] == ['menu.get']
+    assert {scenario.name.split('.')[0] for scenario in select(['menu', 'auth'])} == {'menu', 'auth'}
+    with pytest.raises(ValueError):
+        select(['menus'])
+
+
+def test_suite_runs_against_a_seeded_app(tmp_path):
+    out = tmp_path / 'results.json'
+    env = dict(os.environ, APP_BCRYPT_LOG_ROUNDS='4', APP_BCRYPT_WORKERS='0')
+    env.pop('DATABASE_URL', None)
+    subprocess.run(
+        [sys.executable, '-m', 'benchmarks', '--clients', '2', '--requests', '4', '--warmup', '0',
+         '--size', 'restaurants=2', '--size', 'customers=2', '--size', 'orders=10', '--size', 'menu_items=3',
+         '--size', 'postal_codes=1', '--size', 'areas=1', '--scenario', 'menu', '--scenario', 'checkout',
+         '--out', str(out)],
+        cwd=BACKEND_DIR, env=env, check=True, capture_output=True
+    )
+    report = json.loads(out.read_text())
+    assert set(report['scenarios']) == {scenario.name for scenario in select(['menu', 'checkout'])}
+    for name, summary in report['scenarios'].items():
+        assert summary['requests'] == 4 and summary['errors'] == 0, name
@@ -0,0 +1,203 @@
+from decimal import Decimal
+from itsdangerous import URLSafeTimedSerializer
+from checkout import QUOTE_SALT, sign_quote
+import ledger
+from models import db, Customer, Order, Platform, Restaurant
+from payments import PLATFORM_ID
+
+
+def login(client, customer):
+    with client.session_transaction() as s:
+        s['customer_id'] = customer
+
+
+def customer_balance(app, customer):
+    with app.app_context():
+        return db.session.get(Customer, customer).balance
+
+
+def platform_balance(app):
+    with app.app_context():
+        return db.session.get(Platform, PLATFORM_ID).balance
+
+
+def restaurant_balance(app, restaurant):
+    with app.app_context():
+        return ledger.get_balance(restaurant.id)
+
+
+def cart(restaurant, **extra):
+    return dict({'restaurant_id': restaurant.id, 'items': [
+        {'menu_item_id': restaurant.items[0], 'quantity': 2},
+        {'menu_item_id': restaurant.items[1], 'quantity': 1},
+    ]}, **extra)
+
+
+def get_quote(client, restaurant):
+    response = client.post('/api/cart/quote', json=cart(restaurant))
+    assert response.status_code == 200
+    assert response.get_json()['total_amount'] == 21.99
+    return response.get_json()['quote']
+
+
+def test_order_with_a_quote_charges_the_quoted_total(app, client, restaurant, customer):
+    login(client, customer)
+    response = client.post('/api/orders', json=cart(restaurant, quote=get_quote(client, restaurant)))
+    assert response.status_code == 201
+    assert customer_balance(app, customer) == Decimal('78.01')
+
+
+def test_quote_signed_with_another_key_is_rejected(app, client, restaurant, customer):
+    login(client, customer)
+    token = URLSafeTimedSerializer('not the secret key', salt=QUOTE_SALT).dumps(
+        {'restaurant_id': restaurant.id, 'menu_version': 0, 'items': []})
+    response = client.post('/api/orders', json=cart(restaurant, quote=token))
+    assert response.status_code == 400
+    assert customer_balance(app, customer) == Decimal('100.00')
+
+
+def test_quote_with_forged_prices_is_not_charged(app, client, restaurant, customer):
+    """A validly signed quote still has to match the menu, in case the key has leaked."""
+    login(client, customer)
+    with app.test_request_context():
+        version = db.session.get(Restaurant, restaurant.id).menu_version
+        token = sign_quote(restaurant.id, version, {restaurant.items[0]: 2, restaurant.items[1]: 1},
+                           {restaurant.items[0]: Decimal('0.01'), restaurant.items[1]: Decimal('0.01')})
+    response = client.post('/api/orders', json=cart(restaurant, quote=token))
+    assert response.status_code == 409
+    assert customer_balance(app, customer) == Decimal('100.00')
+
+
+def test_expired_quote_is_stale(app, client, restaurant, customer, monkeypatch):
+    login(client, customer)
+    token = get_quote(client, restaurant)
+    monkeypatch.setitem(app.config, 'CART_QUOTE_TTL', -1)
+    response = client.post('/api/orders', json=cart(restaurant, quote=token))
+    assert response.status_code == 409
+    assert 'expired' in response.get_json()['error']
+    assert customer_balance(app, customer) == Decimal('100.00')
+
+
+def test_quote_from_before_a_menu_change_is_stale(app, client, restaurant, customer):
+    login(client, customer)
+    token = get_quote(client, restaurant)
+    with app.app_context():
+        db.session.execute(db.update(Restaurant).where(Restaurant.id == restaurant.id)
+                           .values(menu_version=Restaurant.menu_version + 1))
+        db.session.commit()
+    response = client.post('/api/orders', json=cart(restaurant, quote=token))
+    assert response.status_code == 409
+    assert 'menu changed' in response.get_json()['error']
+    assert customer_balance(app, customer) == Decimal('100.00')
+
+
+def test_quote_for_another_cart_is_rejected(app, client, restaurant, customer):
+    login(client, customer)
+    token = get_quote(client, restaurant)
+    other = {'restaurant_id': restaurant.id, 'items': [{'menu_item_id': restaurant.items[0], 'quantity': 1}],
+             'quote': token}
+    assert client.post('/api/orders', json=other).status_code == 400
+
+
+def test_order_debits_the_customer_and_pays_the_platform_fee(app, client, restaurant, customer):
+    login(client, customer)
+    platform = platform_balance(app)
+    response = client.post('/api/orders', json=cart(restaurant))
+    assert response.status_code == 201
+    assert response.get_json()['order']['total_amount'] == 21.99
+    assert customer_balance(app, customer) == Decimal('78.01')
+    assert platform_balance(app) == platform + Decimal('3.30')
+    assert restaurant_balance(app, restaurant) == Decimal('18.69')
+
+
+def test_insufficient_balance_changes_nothing(app, client, restaurant, customer):
+    login(client, customer)
+    platform = platform_balance(app)
+    response = client.post('/api/orders', json={'restaurant_id': restaurant.id, 'items': [
+        {'menu_item_id': restaurant.items[0], 'quantity': 20}]})
+    assert response.status_code == 402
+    assert customer_balance(app, customer) == Decimal('100.00')
+    assert platform_balance(app) == platform
+
+
+def test_retry_with_the_same_key_is_charged_once(app, client, restaurant, customer):
+    login(client, customer)
+    headers = {'Idempotency-Key': 'retry-1'}
+    first = client.post('/api/orders', json=cart(restaurant), headers=headers)
+    second = client.post('/api/orders', json=cart(restaurant), headers=headers)
+    assert first.status_code == second.status_code == 201
+    assert second.headers['Idempotent-Replayed'] == 'true'
+    assert second.get_json() == first.get_json()
+    assert customer_balance(app, customer) == Decimal('78.01')
+
+
+def test_key_reused_for_another_cart_is_rejected(app, client, restaurant, customer):
+    login(client, customer)
+    headers = {'Idempotency-Key': 'reused-1'}
+    assert client.post('/api/orders', json=cart(restaurant), headers=headers).status_code == 201
+    other = {'restaurant_id': restaurant.id, 'items': [{'menu_item_id': restaurant.items[1], 'quantity': 1}]}
+    assert client.post('/api/orders', json=other, headers=headers).status_code == 422
+    assert customer_balance(app, customer) == Decimal('78.01')
+
+
+def place_order(app, client, restaurant, customer):
+    login(client, customer)
+    response = client.post('/api/orders', json=cart(restaurant))
+    assert response.status_code == 201
+    with client.session_transaction() as s:
+        s['restaurant_id'] = restaurant.id
+    return response.get_json()['order']['id']
+
+
+def test_rejected_order_is_refunded(app, client, restaurant, customer):
+    platform = platform_balance(app)
+    order_id = place_order(app, client, restaurant, customer)
+    assert client.post(f'/api/orders/{order_id}/reject').status_code == 200
+    assert customer_balance(app, customer) == Decimal('100.00')
+    assert platform_balance(app) == platform
+    assert restaurant_balance(app, restaurant) == Decimal('0.00')
+
+
+def test_order_cancelled_after_accepting_is_refunded(app, client, restaurant, customer):
+    platform = platform_balance(app)
+    order_id = place_order(app, client, restaurant, customer)
+    assert client.post(f'/api/orders/{order_id}/accept').status_code == 200
+    assert restaurant_balance(app, restaurant) == Decimal('18.69')
+
+    response = client.post('/api/orders/status', json={'changes': [{'order_id': order_id, 'status': 'cancelled'}]})
+    assert response.get_json()['updated'] == 1
+    assert customer_balance(app, customer) == Decimal('100.00')
+    assert platform_balance(app) == platform
+    assert restaurant_balance(app, restaurant) == Decimal('0.00')
+
+
+def test_completed_order_keeps_everyone_paid(app, client, restaurant, customer):
+    platform = platform_balance(app)
+    order_id = place_order(app, client, restaurant, customer)
+    assert client.post(f'/api/orders/{order_id}/accept').status_code == 200
+    assert client.post(f'/api/orders/{order_id}/complete').status_code == 200
+
+    debit = Decimal('100.00') - customer_balance(app, customer)
+    fee = platform_balance(app) - platform
+    assert debit == Decimal('21.99')
+    assert restaurant_balance(app, restaurant) == Decimal('18.69')
+    assert debit == restaurant_balance(app, restaurant) + fee
+    with app.app_context():
+        assert ledger.find_mismatches() == []
+
+
+def test_cancelling_an_order_that_was_never_charged_refunds_nothing(app, client, restaurant, customer):
+    """Orders from before checkout existed, or seeded ones, have no payment to refund."""
+    platform = platform_balance(app)
+    with app.app_context():
+        order = Order(customer_id=customer, restaurant_id=restaurant.id, status='processing',
+                      total_amount=Decimal('10.00'), platform_fee=Decimal('1.50'), restaurant_amount=Decimal('8.50'))
+        db.session.add(order)
+        db.session.commit()
+        order_id = order.id
+    with client.session_transaction() as s:
+        s['restaurant_id'] = restaurant.id
+    assert client.post(f'/api/orders/{order_id}/reject').status_code == 200
+    assert customer_balance(app, customer) == Decimal('100.00')
+    assert platform_balance(app) == platform
+    assert restaurant_balance(app, restaurant) == Decimal('0.00')
@@ -0,0 +1,34 @@
+import os
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+COMMAND_MODULES = ('seed', 'query_plans', 'maintenance')
+
+
+def loaded_modules(script, tmp_path):
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{tmp_path / 'cli.db'}", SECRET_KEY='0' * 64,
+               APP_SESSION_FILE_DIR=str(tmp_path / 'sessions'), APP_IMAGE_STORAGE_DIR=str(tmp_path / 'images'))
+    script += f'\nimport sys; print(",".join(m for m in {COMMAND_MODULES!r} if m in sys.modules))'
+    output = subprocess.run([sys.executable, '-c', script], cwd=BACKEND_DIR, env=env,
+                            capture_output=True, text=True, check=True).stdout
+    return output.strip().splitlines()[-1] if output.strip() else ''
+
+
+def test_commands_are_imported_only_when_used(tmp_path):
+    assert loaded_modules('import wsgi', tmp_path) == ''
+    assert loaded_modules('from FLASK_APP import create_app; create_app()', tmp_path) == ''
+
+
+def test_lazy_command_runs_the_real_one(app):
+    runner = app.test_cli_runner()
+    listing = runner.invoke(args=['--help'])
+    assert 'prune-order-events' in listing.output
+
+    result = runner.invoke(args=['prune-order-events', '--hours', '1'])
+    assert result.exit_code == 0, result.output
+    assert result.output.startswith('Deleted ')
+
+    result = runner.invoke(args=['archive-orders', '--days', 'soon'])
+    assert result.exit_code == 2
+    assert "'--days'" in result.output
@@ -0,0 +1,56 @@
+import pytest
+from flask import Flask
+from config import DEV_SECRET_KEY, load_config
+
+
+@pytest.mark.parametrize('secret_key', [None, '', DEV_SECRET_KEY])
+def test_production_needs_a_real_secret_key(monkeypatch, secret_key):
+    monkeypatch.delenv('APP_SECRET_KEY', raising=False)
+    if secret_key is None:
+        monkeypatch.setattr('config.ProductionConfig.SECRET_KEY', None)
+    else:
+        monkeypatch.setenv('APP_SECRET_KEY', secret_key)
+    with pytest.raises(ValueError, match='SECRET_KEY'):
+        load_config(Flask(__name__), 'production')
+
+
+def test_production_starts_with_a_secret_key(monkeypatch):
+    monkeypatch.setenv('APP_SECRET_KEY', 'f' * 64)
+    app = Flask(__name__)
+    load_config(app, 'production')
+    assert app.config['SECRET_KEY'] == 'f' * 64
+
+
+def test_development_keeps_its_default_key(monkeypatch):
+    monkeypatch.delenv('APP_SECRET_KEY', raising=False)
+    app = Flask(__name__)
+    load_config(app, 'development')
+    assert app.config['SECRET_KEY']
+
+
+def configured(monkeypatch, database_url, profile='development'):
+    monkeypatch.setenv('DATABASE_URL', database_url)
+    monkeypatch.setenv('APP_SECRET_KEY', 'f' * 64)
+    app = Flask(__name__)
+    load_config(app, profile)
+    return app.config
+
+
+def test_pool_settings_follow_the_database(monkeypatch):
+    config = configured(monkeypatch, 'postgres://user:secret@db/lieferspatz', 'production')
+    assert config['SQLALCHEMY_DATABASE_URI'] == 'postgresql://user:secret@db/lieferspatz'
+    assert config['SQLALCHEMY_ENGINE_OPTIONS']['pool_size'] == 20
+    assert config['SQLALCHEMY_ENGINE_OPTIONS']['pool_pre_ping'] is True
+
+    assert configured(monkeypatch, 'sqlite:////tmp/app.db')['SQLALCHEMY_ENGINE_OPTIONS']['pool_size'] == 10
+    assert configured(monkeypatch, 'sqlite:///:memory:')['SQLALCHEMY_ENGINE_OPTIONS'] == {}
+
+
+def test_sqlite_connections_use_wal(app):
+    from models import db
+    with app.app_context(), db.engine.connect() as conn:
+        if conn.dialect.name != 'sqlite':
+            pytest.skip('SQLite only')
+        assert conn.exec_driver_sql('PRAGMA journal_mode').scalar() == 'wal'
+        assert conn.exec_driver_sql('PRAGMA busy_timeout').scalar() == 5000
+        assert conn.exec_driver_sql('PRAGMA synchronous').scalar() == 1  # NORMAL
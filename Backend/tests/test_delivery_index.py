@@ -0,0 +1,48 @@
+import threading
+from datetime import datetime
+import delivery_index as delivery_index_module
+from delivery_index import DeliveryIndex, open_window
+from models import db, DeliveryArea
+
+
+def test_open_window_runs_past_midnight():
+    hours = {5: ('18:00', '02:00')}  # Friday evening into Saturday
+    assert open_window(hours, datetime(2026, 10, 16, 23, 0)) == ('18:00', '02:00')
+    assert open_window(hours, datetime(2026, 10, 17, 1, 30)) == ('18:00', '02:00')
+    assert open_window(hours, datetime(2026, 10, 17, 2, 0)) is None
+
+
+def test_lookups_do_not_wait_for_a_periodic_rebuild(app, restaurant, monkeypatch):
+    index = DeliveryIndex()
+    with app.app_context():
+        db.session.add(DeliveryArea(restaurant_id=restaurant.id, postal_code='47058'))
+        db.session.commit()
+        index.rebuild()
+        assert [summary['id'] for summary in index.lookup('47058', datetime.now(), include_closed=True)] == [restaurant.id]
+
+        loading, release = threading.Event(), threading.Event()
+        load = delivery_index_module.load_delivery_data
+
+        def slow_load(conn, restaurant_ids=None):
+            loading.set()
+            release.wait(10)
+            return load(conn, restaurant_ids)
+
+        monkeypatch.setattr(delivery_index_module, 'load_delivery_data', slow_load)
+        index.invalidate()
+
+        def rebuild():
+            with app.app_context():
+                index.ensure_fresh()
+
+        rebuilding = threading.Thread(target=rebuild)
+        rebuilding.start()
+        try:
+            assert loading.wait(5)
+            # Served from the current index while the rebuild is blocked on the database
+            assert [summary['id'] for summary in index.lookup('47058', datetime.now(), include_closed=True)] == [restaurant.id]
+            assert rebuilding.is_alive()
+        finally:
+            release.set()
+            rebuilding.join(5)
+        assert not rebuilding.is_alive()
@@ -0,0 +1,64 @@
+import io
+import os
+import subprocess
+import sys
+import pytest
+from PIL import Image
+from images import identify
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def save(tmp_path, size, format='PNG'):
+    path = tmp_path / f'upload.{format.lower()}'
+    Image.new('L', size).save(path, format=format)
+    return str(path)
+
+
+def test_identify_reads_the_header(tmp_path):
+    assert identify(save(tmp_path, (640, 480), 'JPEG')) == ('jpg', 640, 480)
+
+
+def test_identify_rejects_images_over_the_pixel_budget(tmp_path):
+    path = save(tmp_path, (1000, 1000))
+    assert identify(path, max_pixels=1_000_000)[1:] == (1000, 1000)
+    with pytest.raises(ValueError, match='megapixels'):
+        identify(path, max_pixels=999_999)
+
+
+def test_images_pillow_only_warns_about_are_refused(tmp_path, monkeypatch):
+    path = save(tmp_path, (1000, 1000))
+    # Between MAX_IMAGE_PIXELS and twice that, Pillow only warns; identify checks the size itself
+    monkeypatch.setattr(Image, 'MAX_IMAGE_PIXELS', 600_000)
+    with pytest.warns(Image.DecompressionBombWarning), pytest.raises(ValueError, match='megapixels'):
+        identify(path, max_pixels=10_000_000)
+
+
+def test_importing_images_leaves_warning_filters_alone():
+    script = 'import warnings; filters = list(warnings.filters); import images; assert warnings.filters == filters'
+    subprocess.run([sys.executable, '-c', script], cwd=BACKEND_DIR, check=True)
+
+
+def test_upload_over_the_pixel_budget_is_refused(app, client, tmp_path, monkeypatch):
+    from images import image_store
+    monkeypatch.setattr(image_store, 'max_pixels', 100 * 100)
+    with client.session_transaction() as s:
+        s['restaurant_id'] = 1
+    with open(save(tmp_path, (101, 100)), 'rb') as f:
+        response = client.post('/api/images/', data={'file': (f, 'big.png')})
+    assert response.status_code == 400
+    assert 'megapixels' in response.get_json()['error']
+
+
+def test_chunked_upload_is_cut_off_at_the_size_limit(app, client, monkeypatch):
+    from images import image_store
+    monkeypatch.setattr(image_store, 'max_bytes', 64 * 1024)
+    with client.session_transaction() as s:
+        s['restaurant_id'] = 1
+    body = (b'--x\r\nContent-Disposition: form-data; name="file"; filename="big.png"\r\n'
+            b'Content-Type: image/png\r\n\r\n' + b'\0' * (1024 * 1024) + b'\r\n--x--\r\n')
+    response = client.post('/api/images/', input_stream=io.BytesIO(body),
+                           headers={'Content-Type': 'multipart/form-data; boundary=x', 'Transfer-Encoding': 'chunked'},
+                           environ_overrides={'wsgi.input_terminated': True})  # As gunicorn sets for chunked bodies
+    assert response.status_code == 413
+    assert 'MB' in response.get_json()['error']
@@ -0,0 +1,47 @@
+from decimal import Decimal
+import ledger
+from models import db, BalanceLedgerEntry
+
+
+def mismatches(app, restaurant):
+    with app.app_context():
+        return [row for row in ledger.find_mismatches() if row[0] == restaurant.id]
+
+
+def test_entries_move_the_running_total(app, client, restaurant):
+    with app.app_context():
+        ledger.record_entries(restaurant.id, [(None, Decimal('8.50'), None, 'processing'),
+                                              (None, Decimal('4.99'), None, 'processing')])
+        ledger.record_entries(restaurant.id, [(None, Decimal('-4.99'), 'processing', 'cancelled')])
+        db.session.commit()
+        assert ledger.get_balance(restaurant.id) == Decimal('8.50')
+        assert db.session.query(BalanceLedgerEntry).filter_by(restaurant_id=restaurant.id).count() == 3
+
+    with client.session_transaction() as s:
+        s['restaurant_id'] = restaurant.id
+    assert client.get('/api/restaurant/balance').get_json() == {'balance': 8.5}
+
+    with app.app_context():
+        # No payment backs these entries; close them so the ledger stays consistent for other tests
+        ledger.record_entries(restaurant.id, [(None, Decimal('-8.50'), None, ledger.ADJUSTMENT)])
+        db.session.commit()
+
+
+def test_reconcile_closes_totals_that_no_payment_backs(app, restaurant):
+    with app.app_context():
+        ledger.record_entries(restaurant.id, [(None, Decimal('8.50'), None, 'processing')])
+        db.session.commit()
+    assert mismatches(app, restaurant) == [(restaurant.id, Decimal('8.50'), Decimal('8.50'), Decimal('0.00'))]
+
+    runner = app.test_cli_runner()
+    result = runner.invoke(args=['reconcile-ledger'])
+    assert result.exit_code != 0
+    assert f'restaurant {restaurant.id}: running total 8.50' in result.output
+
+    assert runner.invoke(args=['reconcile-ledger', '--fix']).exit_code == 0
+    assert mismatches(app, restaurant) == []
+    with app.app_context():
+        assert ledger.get_balance(restaurant.id) == Decimal('0.00')
+        adjustment = db.session.query(BalanceLedgerEntry).filter_by(restaurant_id=restaurant.id,
+                                                                    to_status=ledger.ADJUSTMENT).one()
+        assert adjustment.amount == Decimal('-8.50')
@@ -0,0 +1,57 @@
+import json
+import logging
+import pytest
+from logging_config import JsonFormatter, redact
+
+
+class Capture(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(record)
+
+
+@pytest.fixture
+def access_log(monkeypatch):
+    """Access log records, kept off the queue so the test can read them."""
+    logger, capture = logging.getLogger('access'), Capture()
+    monkeypatch.setattr(logger, 'propagate', False)
+    monkeypatch.setattr(logger, 'disabled', False)  # The migrations' fileConfig disabled it in the app fixture
+    level = logger.level
+    logger.setLevel(logging.INFO)
+    logger.addHandler(capture)
+    yield capture.records
+    logger.removeHandler(capture)
+    logger.setLevel(level)
+
+
+def test_json_lines_carry_request_id_and_extra_fields():
+    record = logging.LogRecord('access', logging.INFO, __file__, 1, 'GET %s %d', ('/api/menu/', 200), None)
+    record.request_id, record.duration_ms = 'abc', 1.5
+    entry = json.loads(JsonFormatter().format(record))
+    assert entry['msg'] == 'GET /api/menu/ 200'
+    assert (entry['level'], entry['request_id'], entry['duration_ms']) == ('INFO', 'abc', 1.5)
+
+
+def test_redact_hides_secrets_at_any_depth():
+    data = {'username': 'erika', 'password': 'secret', 'accounts': [{'token': 't', 'id': 1}]}
+    assert redact(data, {'password', 'token'}) == {
+        'username': 'erika', 'password': '***', 'accounts': [{'token': '***', 'id': 1}]
+    }
+
+
+def test_access_log_follows_route_rules(app, client, access_log, monkeypatch):
+    monkeypatch.setitem(app.config, 'LOG_ROUTES', {
+        'customer_auth.login': {'log_body': True},
+        'menu.get_menu_items': {'sample_rate': 0.0},
+    })
+    response = client.post('/api/customer/login', json={'username': 'nobody', 'password': 'secret'},
+                           headers={'X-Request-ID': 'req-1'})
+    assert response.headers['X-Request-ID'] == 'req-1'
+    client.get('/api/menu/')  # Unsampled, and neither slow nor an error
+
+    [record] = access_log
+    assert (record.path, record.status) == ('/api/customer/login', 401)
+    assert record.body == {'username': 'nobody', 'password': '***'}
@@ -0,0 +1,87 @@
+from menu_cache import MenuSnapshotCache
+
+
+def login(client, restaurant):
+    with client.session_transaction() as s:
+        s['restaurant_id'] = restaurant.id
+
+
+def test_unchanged_menu_is_answered_with_304(client, restaurant):
+    login(client, restaurant)
+    response = client.get('/api/menu/')
+    assert response.status_code == 200
+    assert [item['name'] for item in response.get_json()] == ['Pizza Margherita', 'Tiramisu']
+    etag = response.headers['ETag']
+
+    response = client.get('/api/menu/', headers={'If-None-Match': etag})
+    assert response.status_code == 304 and response.data == b''
+
+    sparse = client.get('/api/menu/', query_string={'fields': 'id,price'}, headers={'If-None-Match': etag})
+    assert sparse.status_code == 200
+    assert sparse.get_json()[0] == {'id': restaurant.items[0], 'price': 8.5}
+
+
+def test_menu_change_invalidates_the_snapshot(client, restaurant):
+    login(client, restaurant)
+    etag = client.get('/api/menu/').headers['ETag']
+    response = client.post('/api/menu/', json={'name': 'Calzone', 'description': 'Folded', 'price': '9.50',
+                                               'category': 'Pizza'})
+    assert response.status_code == 201
+
+    response = client.get('/api/menu/', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
+    assert 'Calzone' in [item['name'] for item in response.get_json()]
+
+
+def test_cache_evicts_the_least_recently_used_menu():
+    cache = MenuSnapshotCache(max_entries=2)
+    cache.put(1, 0, 'menu-1-0', b'[]')
+    cache.put(2, 0, 'menu-2-0', b'[]')
+    assert cache.get(1, 0) == ('menu-1-0', b'[]')
+    cache.put(3, 0, 'menu-3-0', b'[]')
+    assert cache.get(2, 0) is None
+    assert cache.get(1, 0) and cache.get(3, 0)
+    assert cache.get(1, 1) is None  # a bumped version misses
+
+
+def menu(client):
+    return {item['name']: item for item in client.get('/api/menu/').get_json()}
+
+
+def test_bulk_upload_updates_by_id_or_name_and_inserts_the_rest(client, restaurant):
+    login(client, restaurant)
+    response = client.post('/api/menu/bulk', json=[
+        {'name': 'Pizza Margherita', 'description': 'Tomato and mozzarella', 'price': '9.00', 'category': 'Pizza'},
+        {'id': restaurant.items[1], 'name': 'Tiramisu', 'description': 'Classic', 'price': 5, 'category': 'Dessert',
+         'is_available': 'no'},
+        {'name': 'Panna Cotta', 'description': 'Vanilla', 'price': '4.50', 'category': 'Dessert'},
+    ])
+    assert response.status_code == 200
+    assert response.get_json()['inserted'] == 1 and response.get_json()['updated'] == 2
+
+    items = menu(client)
+    assert items['Pizza Margherita']['price'] == 9.0
+    assert items['Tiramisu']['description'] == 'Classic' and items['Tiramisu']['is_available'] is False
+    assert items['Panna Cotta']['price'] == 4.5
+
+
+def test_bulk_csv_upload(client, restaurant):
+    login(client, restaurant)
+    body = 'name,description,price,category,is_available\nLasagne,Baked,11.20,Pasta,yes\nRisotto,Mushroom,10,Rice,0\n'
+    response = client.post('/api/menu/bulk', data=body, content_type='text/csv')
+    assert response.status_code == 200 and response.get_json()['inserted'] == 2
+    assert menu(client)['Risotto']['is_available'] is False
+
+
+def test_bulk_upload_with_an_invalid_row_saves_nothing(client, restaurant):
+    login(client, restaurant)
+    response = client.post('/api/menu/bulk', json=[
+        {'name': 'Gnocchi', 'description': 'Sage butter', 'price': '9.80', 'category': 'Pasta'},
+        {'name': 'Gnocchi', 'description': 'Again', 'price': '9.80', 'category': 'Pasta'},
+        {'name': 'Soup', 'description': 'Of the day', 'price': 'cheap', 'category': 'Starter'},
+        {'id': restaurant.items[0] + 1000, 'name': 'Ghost', 'description': '', 'price': '1', 'category': 'x'},
+    ])
+    assert response.status_code == 400
+    assert [row['row'] for row in response.get_json()['rows']] == [2, 3, 4]
+    assert 'Gnocchi' not in menu(client)
@@ -0,0 +1,44 @@
+import os
+from metrics import ProcessMetricsFiles, merge_snapshots, request_status, snapshot
+
+
+def test_metrics_sum_every_worker_and_keep_exited_ones(tmp_path):
+    files = ProcessMetricsFiles()
+    files.directory = str(tmp_path)
+    labels = ('menu.get_menu', 'GET', '200')
+    before = snapshot()['registry'][request_status.name].get(labels, 0)
+
+    # Two other workers that served 3 and 4 requests, one with queued audit records
+    for pid, count, pending in ((101, 3, 2), (102, 4, 0)):
+        data = merge_snapshots([snapshot()], gauges=False)
+        data['registry'][request_status.name] = {labels: count}
+        data['stats']['audit_log']['pending'] = pending
+        files._write_file(files.worker_file(pid), data)
+
+    merged = files.collect()
+    assert merged['registry'][request_status.name][labels] == before + 7
+
+    files.retire(101)
+    assert not os.path.exists(files.worker_file(101))
+    merged = files.collect()
+    assert merged['registry'][request_status.name][labels] == before + 7
+    assert merged['stats']['audit_log']['pending'] == snapshot()['stats']['audit_log']['pending']
+
+    files.clear()
+    assert files.collect()['registry'][request_status.name].get(labels, 0) == before
+
+
+def test_metrics_endpoint_reports_other_workers(app, client, tmp_path):
+    from metrics import metrics_files
+    labels = ('restaurants.get_restaurants', 'GET', '200')
+    data = merge_snapshots([snapshot()], gauges=False)
+    data['registry'] = {request_status.name: {labels: 1000}}
+    metrics_files.directory = str(tmp_path)
+    try:
+        metrics_files._write_file(metrics_files.worker_file(os.getpid() + 1), data)
+        body = client.get('/metrics').get_data(as_text=True)
+    finally:
+        metrics_files.stop()
+        metrics_files.directory = None
+    line = next(line for line in body.splitlines() if line.startswith('http_requests_total{endpoint="restaurants.get_restaurants"'))
+    assert int(line.split()[-1]) >= 1000
@@ -0,0 +1,70 @@
+from decimal import Decimal
+from sqlalchemy import event
+from sqlalchemy.orm import joinedload, selectinload
+from models import db, Order, OrderItem
+from Res_orders import load_order_details
+
+
+def add_order(app, restaurant, customer, quantities):
+    with app.app_context():
+        order = Order(customer_id=customer, restaurant_id=restaurant.id, status='processing', notes='Ring twice',
+                      total_amount=Decimal('10.00'), platform_fee=Decimal('1.50'), restaurant_amount=Decimal('8.50'))
+        db.session.add(order)
+        db.session.flush()
+        db.session.add_all([
+            OrderItem(order_id=order.id, menu_item_id=item_id, quantity=quantity, price_at_order=Decimal('4.99'))
+            for item_id, quantity in zip(restaurant.items, quantities)
+        ])
+        db.session.commit()
+        return order.id
+
+
+def count_queries(app, run):
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    with app.app_context():
+        event.listen(db.engine, 'before_cursor_execute', record)
+        try:
+            run()
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', record)
+            db.session.rollback()
+    return len(statements)
+
+
+def login(client, restaurant):
+    with client.session_transaction() as s:
+        s['restaurant_id'] = restaurant.id
+
+
+def test_details_include_customer_and_items(app, client, restaurant, customer):
+    order_id = add_order(app, restaurant, customer, [2, 1])
+    login(client, restaurant)
+    response = client.get(f'/api/orders/{order_id}/details')
+    assert response.status_code == 200
+    details = response.get_json()
+    assert details['notes'] == 'Ring twice'
+    assert details['customer'] == {'first_name': 'Erika', 'last_name': 'Muster', 'address': 'Nebenstr. 2, 47057'}
+    assert details['items'] == [{'name': 'Pizza Margherita', 'quantity': 2, 'price_at_order': 4.99},
+                                {'name': 'Tiramisu', 'quantity': 1, 'price_at_order': 4.99}]
+    assert client.get(f'/api/orders/{order_id + 1000}/details').status_code == 404
+
+
+def test_batch_keeps_request_order_and_skips_other_restaurants(app, client, restaurant, customer):
+    first, second = add_order(app, restaurant, customer, [1]), add_order(app, restaurant, customer, [1, 3])
+    login(client, restaurant)
+    response = client.get('/api/orders/details', query_string={'ids': f'{second},{first + 1000},{first},{second}'})
+    assert response.status_code == 200
+    assert [order['id'] for order in response.get_json()] == [second, first]
+    assert client.get('/api/orders/details', query_string={'ids': 'one,two'}).status_code == 400
+    assert client.get('/api/orders/details').status_code == 400
+
+
+def test_query_count_does_not_grow_with_the_orders(app, restaurant, customer):
+    ids = [add_order(app, restaurant, customer, [1, 2]) for _ in range(5)]
+    assert count_queries(app, lambda: load_order_details(restaurant.id, ids[:1], joinedload)) == 1
+    batch = count_queries(app, lambda: load_order_details(restaurant.id, ids[:1], selectinload))
+    assert count_queries(app, lambda: load_order_details(restaurant.id, ids, selectinload)) == batch
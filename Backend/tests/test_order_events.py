@@ -0,0 +1,41 @@
+import time
+from decimal import Decimal
+from threading import BoundedSemaphore
+from models import db, Order
+import order_events
+
+
+def test_stream_sends_events_and_ends_after_its_lifetime(app, restaurant, customer, monkeypatch):
+    with app.app_context():
+        last_event_id = order_events.latest_event_id(restaurant.id)
+        order = Order(customer_id=customer, restaurant_id=restaurant.id, status='processing',
+                      total_amount=Decimal('10.00'), platform_fee=Decimal('1.50'), restaurant_amount=Decimal('8.50'))
+        db.session.add(order)
+        order_events.record_order_created(order)
+        db.session.commit()
+        order_id = order.id
+
+    monkeypatch.setitem(app.config, 'ORDER_STREAM_POLL_INTERVAL', 0.05)
+    monkeypatch.setitem(app.config, 'ORDER_STREAM_MAX_SECONDS', 0.3)
+    started = time.monotonic()
+    chunks = list(order_events.event_stream(app, restaurant.id, last_event_id))
+    assert time.monotonic() - started < 2
+    assert chunks[0] == f'retry: {order_events.RETRY_MS}\n\n'
+    assert any(f'event: order-created\ndata: {{"order_id":{order_id},' in chunk for chunk in chunks[1:])
+
+
+def test_streams_beyond_the_limit_are_refused(app, client, restaurant, monkeypatch):
+    monkeypatch.setattr(order_events, '_stream_slots', BoundedSemaphore(1))
+    with client.session_transaction() as s:
+        s['restaurant_id'] = restaurant.id
+
+    first = client.get('/api/orders/stream', buffered=False)
+    assert first.status_code == 200
+    second = client.get('/api/orders/stream', buffered=False)
+    assert second.status_code == 503
+    assert second.headers['Retry-After']
+
+    first.close()  # The slot comes back when the stream is closed
+    third = client.get('/api/orders/stream', buffered=False)
+    assert third.status_code == 200
+    third.close()
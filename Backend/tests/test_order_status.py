@@ -0,0 +1,44 @@
+from decimal import Decimal
+import pytest
+from models import db, Order
+import order_status
+
+
+def add_orders(app, restaurant, customer, *statuses):
+    with app.app_context():
+        orders = [
+            Order(customer_id=customer, restaurant_id=restaurant.id, status=status, total_amount=Decimal('10.00'),
+                  platform_fee=Decimal('1.50'), restaurant_amount=Decimal('8.50'))
+            for status in statuses
+        ]
+        db.session.add_all(orders)
+        db.session.commit()
+        return [order.id for order in orders]
+
+
+@pytest.mark.parametrize('returning', [True, False])
+def test_update_claims_only_the_orders_it_moved(app, restaurant, customer, monkeypatch, returning):
+    ours, theirs = add_orders(app, restaurant, customer, 'processing', 'processing')
+    with app.app_context():
+        monkeypatch.setattr(db.engine.dialect, 'update_returning', returning)
+        # Another request accepts `theirs` between our status read and our UPDATE
+        db.session.execute(db.update(Order).where(Order.id == theirs).values(status='preparing'))
+        updated = order_status.update_statuses(restaurant.id, [ours, theirs], 'processing', 'preparing')
+        db.session.commit()
+    assert updated == {ours}
+
+
+def test_batch_reports_each_order(app, client, restaurant, customer):
+    processing, completed = add_orders(app, restaurant, customer, 'processing', 'completed')
+    with client.session_transaction() as s:
+        s['restaurant_id'] = restaurant.id
+    response = client.post('/api/orders/status', json={'changes': [
+        {'order_id': processing, 'status': 'preparing'},
+        {'order_id': completed, 'status': 'preparing'},
+        {'order_id': completed + 1000, 'status': 'cancelled'},
+    ]})
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body['updated'] == 1
+    assert [(r['result'], r['status']) for r in body['results']] == [
+        ('updated', 'preparing'), ('invalid_transition', 'completed'), ('not_found', None)]
@@ -0,0 +1,66 @@
+from datetime import datetime, timedelta
+from decimal import Decimal
+from models import db, Order
+
+START = datetime(2026, 1, 5, 12, 0)
+
+
+def add_orders(app, restaurant, customer, statuses, created_at):
+    with app.app_context():
+        orders = [
+            Order(customer_id=customer, restaurant_id=restaurant.id, status=status, total_amount=Decimal('10.00'),
+                  platform_fee=Decimal('1.50'), restaurant_amount=Decimal('8.50'), created_at=created)
+            for status, created in zip(statuses, created_at)
+        ]
+        db.session.add_all(orders)
+        db.session.commit()
+        return [order.id for order in orders]
+
+
+def login(client, restaurant):
+    with client.session_transaction() as s:
+        s['restaurant_id'] = restaurant.id
+
+
+def test_pages_follow_the_cursor_through_every_order(app, client, restaurant, customer):
+    # Two orders share a timestamp, so the cursor has to break the tie by id
+    created_at = [START, START + timedelta(minutes=1), START + timedelta(minutes=1), START + timedelta(minutes=2),
+                  START + timedelta(minutes=3)]
+    ids = add_orders(app, restaurant, customer, ['completed'] * 5, created_at)
+    login(client, restaurant)
+
+    seen, after = [], None
+    while True:
+        response = client.get('/api/orders/', query_string={'limit': 2, 'fields': 'id,created_at',
+                                                            **({'after': after} if after else {})})
+        assert response.status_code == 200
+        page = response.get_json()
+        if not page:
+            break
+        assert len(page) <= 2 and set(page[0]) == {'id', 'created_at'}
+        seen += [order['id'] for order in page]
+        after = f"{page[-1]['created_at']},{page[-1]['id']}"
+    assert seen == ids
+
+
+def test_filters_by_status_and_creation_time(app, client, restaurant, customer):
+    processing, completed, late = add_orders(app, restaurant, customer, ['processing', 'completed', 'processing'],
+                                             [START, START, START + timedelta(days=1)])
+    login(client, restaurant)
+
+    to = (START + timedelta(hours=1)).isoformat()
+    response = client.get('/api/orders/', query_string={'status': 'processing', 'to': to})
+    assert [order['id'] for order in response.get_json()] == [processing]
+    order = response.get_json()[0]
+    assert order['status'] == 'processing' and order['total_amount'] == 10.0
+
+    response = client.get('/api/orders/', query_string={'status': 'completed,processing',
+                                                        'from': START.isoformat(), 'to': START.isoformat()})
+    assert response.get_json() == []
+
+
+def test_rejects_bad_parameters(client, restaurant):
+    assert client.get('/api/orders/').status_code == 401
+    login(client, restaurant)
+    for query in ({'limit': 0}, {'limit': 'ten'}, {'status': 'lost'}, {'after': 'yesterday'}, {'fields': 'password'}):
+        assert client.get('/api/orders/', query_string=query).status_code == 400
@@ -0,0 +1,50 @@
+from threading import BoundedSemaphore
+import bcrypt
+import pytest
+from models import db, Customer
+from passwords import PasswordHasher, PasswordServiceBusy, hasher
+
+
+def test_pool_does_not_fork_the_server_process():
+    hasher = PasswordHasher()
+    hasher.rounds, hasher.workers = 4, 1
+    try:
+        password_hash = hasher.generate_password_hash('secret')
+        assert hasher.check_password_hash(password_hash, 'secret')
+        assert not hasher.check_password_hash(password_hash, 'wrong')
+        assert hasher._executor._mp_context.get_start_method() != 'fork'
+    finally:
+        hasher.shutdown()
+
+
+def test_saturated_pool_rejects_instead_of_queueing(app, client, customer, monkeypatch):
+    with app.app_context():
+        username = db.session.get(Customer, customer).username
+    slots = BoundedSemaphore(1)
+    monkeypatch.setattr(hasher, '_slots', slots)
+    monkeypatch.setattr(hasher, 'queue_timeout', 0.01)
+    rejected = hasher.stats()['rejected']
+    slots.acquire()  # Another request is hashing
+    try:
+        with pytest.raises(PasswordServiceBusy):
+            hasher.generate_password_hash('secret')
+        response = client.post('/api/customer/login', json={'username': username, 'password': 'secret'})
+        assert response.status_code == 503 and response.headers['Retry-After'] == '1'
+    finally:
+        slots.release()
+    assert hasher.stats()['rejected'] == rejected + 2
+
+
+def test_login_upgrades_hashes_made_at_another_cost(app, client, customer):
+    with app.app_context():
+        account = db.session.get(Customer, customer)
+        account.password_hash = bcrypt.hashpw(b'secret', bcrypt.gensalt(5)).decode('utf-8')
+        db.session.commit()
+        username = account.username
+
+    assert client.post('/api/customer/login', json={'username': username, 'password': 'wrong'}).status_code == 401
+    assert client.post('/api/customer/login', json={'username': username, 'password': 'secret'}).status_code == 200
+    with app.app_context():
+        password_hash = db.session.get(Customer, customer).password_hash
+    assert password_hash.startswith(f'$2b${hasher.rounds:02d}$')
+    assert hasher.check_password_hash(password_hash, 'secret')
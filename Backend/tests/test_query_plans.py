@@ -0,0 +1,34 @@
+from decimal import Decimal
+from models import db, Order, OrderItem
+from query_plans import all_queries, explain, find_table_scans, scans_table
+
+
+def test_scans_are_detected(app):
+    with app.app_context(), db.engine.connect() as conn:
+        plan = explain(conn, db.select(Order).where(Order.notes == 'x'))  # notes has no index
+    assert scans_table(plan)
+
+
+def test_checks_cover_what_the_endpoints_run(app, restaurant, customer):
+    with app.app_context():
+        order = Order(customer_id=customer, restaurant_id=restaurant.id, status='processing',
+                      total_amount=Decimal('8.50'), platform_fee=Decimal('1.28'), restaurant_amount=Decimal('7.22'))
+        db.session.add(order)
+        db.session.flush()
+        db.session.add(OrderItem(order_id=order.id, menu_item_id=restaurant.items[0], quantity=1,
+                                 price_at_order=Decimal('8.50')))
+        db.session.commit()
+        queries = all_queries()
+
+    sql = {label: query[0] if isinstance(query, tuple) else str(query) for label, query in queries.items()}
+    assert 'restaurant_balances' in sql['Res_balance.get_balance #1']
+    assert 'orders_archive' in sql['Res_orders.get_orders']
+    assert 'orders_archive' not in sql['Res_orders.get_orders (active statuses)']
+    details = [query for label, query in sql.items() if label.startswith('Res_orders.get_orders_details #')]
+    assert any('orders_archive' in query for query in details)
+    assert any('FROM order_items' in query for query in details)  # selectinload's second query
+
+
+def test_find_table_scans_is_empty_on_the_migrated_schema(app):
+    with app.app_context():
+        assert find_table_scans() == {}
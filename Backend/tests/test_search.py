@@ -0,0 +1,37 @@
+from models import db, MenuItem
+import search
+from search import render_snippet, search_menu_items
+
+
+def test_snippet_escapes_menu_text():
+    assert render_snippet('<b>\x02Pizza\x03</b> & more') == '&lt;b&gt;<mark>Pizza</mark>&lt;/b&gt; &amp; more'
+    assert render_snippet(None) is None
+
+
+def test_search_highlights_matches_without_trusting_menu_html(app, restaurant):
+    with app.app_context():
+        db.session.execute(
+            db.update(MenuItem).where(MenuItem.id == restaurant.items[0])
+            .values(description='<img src=x onerror=alert(1)> stone oven')
+        )
+        db.session.commit()
+        rows = search_menu_items(['stone'], [restaurant.id])
+
+    assert [row.id for row in rows] == [restaurant.items[0]]
+    snippet = render_snippet(rows[0].snippet)
+    assert '<mark>stone</mark>' in snippet
+    assert '<img' not in snippet
+    assert '&lt;img src=x onerror=alert(1)&gt;' in snippet
+
+
+def test_databases_without_full_text_search_fall_back_to_like(app, restaurant, monkeypatch):
+    monkeypatch.setattr(search, 'SEARCH_STATEMENTS', {})
+    with app.app_context():
+        rows = search_menu_items(['mascarpone'], [restaurant.id])
+        assert [row.id for row in rows] == [restaurant.items[1]]
+        assert render_snippet(rows[0].snippet) == 'Coffee and mascarpone'
+
+        # A hit in the name ranks above one in the description
+        rows = search_menu_items(['tiramisu'], [restaurant.id]) + search_menu_items(['coffee'], [restaurant.id])
+        assert rows[0].rank < rows[1].rank
+        assert search_menu_items(['pizza', 'coffee'], [restaurant.id]) == []
@@ -0,0 +1,59 @@
+import os
+import sqlite3
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+INIT_SQL = os.path.join(BACKEND_DIR, os.pardir, 'src', 'db', 'init.sql')
+SIZES = ['--restaurants', '3', '--menu-items', '4', '--customers', '5', '--orders', '60', '--postal-codes', '2',
+         '--areas', '1', '--days', '30', '--seed', '7']
+
+
+def flask(tmp_path, path, *command):
+    env = dict(os.environ, FLASK_APP='FLASK_APP:create_app', PYTHONPATH=BACKEND_DIR, DATABASE_URL=f'sqlite:///{path}',
+               APP_SESSION_FILE_DIR=str(tmp_path / 'sessions'), APP_IMAGE_STORAGE_DIR=str(tmp_path / 'images'),
+               APP_BCRYPT_LOG_ROUNDS='4', APP_BCRYPT_WORKERS='0', APP_LOG_LEVEL='WARNING')
+    return subprocess.run([sys.executable, '-m', 'flask', *command], cwd=BACKEND_DIR, env=env,
+                          capture_output=True, text=True)
+
+
+def seeded_database(tmp_path, name):
+    """A fresh database built like a real install, then seeded with `flask seed`."""
+    path = tmp_path / f'{name}.db'
+    with open(INIT_SQL) as f:
+        conn = sqlite3.connect(path)
+        conn.executescript(f.read())
+        conn.close()
+    for command in (['db', 'upgrade'], ['seed', *SIZES]):
+        assert flask(tmp_path, path, *command).returncode == 0
+    return path
+
+
+def snapshot(path):
+    conn = sqlite3.connect(path)
+    try:
+        return (
+            conn.execute('SELECT id, name, postal_code FROM restaurants ORDER BY id').fetchall(),
+            conn.execute('SELECT id, restaurant_id, name, price FROM menu_items ORDER BY id').fetchall(),
+            conn.execute('SELECT id, customer_id, restaurant_id, status, total_amount FROM orders ORDER BY id').fetchall(),
+            conn.execute('SELECT order_id, menu_item_id, quantity FROM order_items ORDER BY id').fetchall(),
+        )
+    finally:
+        conn.close()
+
+
+def test_same_seed_gives_the_same_consistent_data(tmp_path):
+    first, second = seeded_database(tmp_path, 'first'), seeded_database(tmp_path, 'second')
+    assert snapshot(first) == snapshot(second)
+
+    restaurants, items, orders, lines = snapshot(first)
+    assert (len(restaurants), len(items), len(orders)) == (3, 12, 60)
+    assert {order[2] for order in orders} <= {restaurant[0] for restaurant in restaurants}
+    assert {line[0] for line in lines} == {order[0] for order in orders}
+    # Payments, ledger and running balances add up
+    assert flask(tmp_path, first, 'reconcile-ledger').returncode == 0
+
+    refused = flask(tmp_path, first, 'seed', *SIZES)
+    assert refused.returncode != 0 and '--reset' in refused.stderr
+    assert flask(tmp_path, first, 'seed', *SIZES, '--reset').returncode == 0
+    assert snapshot(first) == snapshot(second)
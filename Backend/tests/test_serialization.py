@@ -0,0 +1,38 @@
+from datetime import datetime
+from decimal import Decimal
+
+import pytest
+from flask import Flask, jsonify
+from flask.json.provider import DefaultJSONProvider
+
+from serialization import PROVIDERS, init_json
+
+BODY = {'order': {'total_amount': Decimal('12.50'), 'created_at': datetime(2026, 10, 18, 12, 30)},
+        'name': 'Crème brûlée', 'items': [3, 1], 'error': None}
+ROWS = [(1, 'Crème brûlée', Decimal('4.99'), datetime(2026, 10, 18, 12, 30))]
+NAMES = ('id', 'name', 'price', 'created_at')
+
+
+def json_app(backend):
+    app = Flask(__name__)
+    app.config['JSON_BACKEND'] = backend
+    init_json(app)
+    return app
+
+
+@pytest.mark.parametrize('backend', PROVIDERS)
+def test_responses_are_unchanged_by_the_backend(backend):
+    app, plain = json_app(backend), Flask(__name__)
+    assert type(plain.json) is DefaultJSONProvider
+    with app.app_context():
+        body, dumped = jsonify(BODY).get_data(), app.json.dumps(BODY)
+    with plain.app_context():
+        assert body == jsonify(BODY).get_data()
+        assert dumped == plain.json.dumps(BODY)
+
+
+@pytest.mark.parametrize('backend', PROVIDERS)
+def test_projected_rows_encode_the_same_on_every_backend(backend):
+    encoded = json_app(backend).json.encode_rows(NAMES, ROWS)
+    assert encoded == json_app('stdlib').json.encode_rows(NAMES, ROWS)
+    assert encoded == '[{"id":1,"name":"Crème brûlée","price":4.99,"created_at":"2026-10-18T12:30:00"}]'.encode('utf-8')
@@ -0,0 +1,63 @@
+import time
+import pytest
+from flask import Flask, session
+from session_config import init_session
+from session_stores import LRUCache
+
+
+def session_app(**config):
+    app = Flask(__name__)
+    app.config.update(dict({'SESSION_BACKEND': 'memory'}, **config))
+    init_session(app, None)
+
+    @app.route('/login')
+    def login():
+        session['customer_id'] = 1
+        return ''
+
+    @app.route('/read')
+    def read():
+        return str(session.get('customer_id'))
+
+    return app
+
+
+def test_unchanged_sessions_are_not_written_again(monkeypatch):
+    app = session_app()
+    store = app.session_interface.cache
+    writes = []
+    set_entry = store.set
+
+    def counting_set(key, value, timeout=None):
+        writes.append(key)
+        return set_entry(key, value, timeout)
+
+    monkeypatch.setattr(store, 'set', counting_set)
+
+    client = app.test_client()
+    client.get('/login')
+    assert client.get('/read').data == b'1'
+    client.get('/login')  # Same value again
+    assert len(writes) == 1
+
+    app.session_interface.refresh_interval = 0  # Expiry is due, so the next request extends it
+    assert client.get('/read').data == b'1'
+    assert len(writes) == 2
+
+
+def test_unknown_backend_is_rejected():
+    with pytest.raises(ValueError):
+        session_app(SESSION_BACKEND='punchcards')
+
+
+def test_memory_store_expires_and_evicts():
+    cache = LRUCache(max_entries=2, default_timeout=300)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    cache.get('a')
+    cache.set('c', 3)
+    assert (cache.get('a'), cache.get('b'), cache.get('c')) == (1, None, 3)
+
+    cache.set('short', 4, timeout=0.01)
+    time.sleep(0.02)
+    assert cache.get('short') is None and not cache.has('short')
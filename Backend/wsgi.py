@@ -0,0 +1,63 @@
+"""
+Production entry point, served by gunicorn with the settings in gunicorn.conf.py:
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+The app is built once in the master (preload_app) and every worker is forked
+from it, so workers skip the imports and setup. after_fork() and before_exit()
+are the worker hooks that gunicorn.conf.py calls; before_start() and
+worker_exited() run in the master.
+"""
+import logging
+import os
+from FLASK_APP import create_app
+from models import db
+from logging_config import start_listener, stop_listener
+from passwords import hasher
+from images import image_store
+from audit_log import audit_log
+from archive import archiver
+from metrics import metrics_files
+from config import check_secret_key
+
+app = create_app(os.environ.get('APP_PROFILE', 'production'), with_cli=False)
+check_secret_key(app.config)  # Whatever the profile, a served app never signs with the development key
+
+if app.config['SESSION_BACKEND'] == 'memory':
+    logging.warning("SESSION_BACKEND 'memory' keeps sessions per worker; use filesystem, redis or sqlalchemy")
+
+
+def after_fork():
+    """
+    Give a new worker its own connections, pools and threads. Whatever the
+    master created belongs to the master: its sockets and pipes must not be
+    used from two processes, and threads do not survive fork.
+    """
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose(close=False)  # Forget inherited connections without closing the master's
+    hasher.after_fork()
+    image_store.after_fork()
+    audit_log.after_fork()
+    metrics_files.after_fork()
+    start_listener(app)
+
+
+def before_exit():
+    """Flush queued audit records and log lines while a worker shuts down."""
+    archiver.stop()
+    audit_log.stop()
+    hasher.shutdown()
+    image_store.shutdown()
+    metrics_files.stop()
+    stop_listener()
+
+
+def before_start():
+    """Forget the metrics of a previous server run before the first worker starts."""
+    metrics_files.clear()
+
+
+def worker_exited(pid):
+    """Keep an exited worker's counters in the server-wide /metrics totals."""
+    metrics_files.retire(pid)